@@ -1,3 +1,4 @@
+from .bans import GlobalBansController
 from .miniverses import MiniversesController
 from .mods import ModsController
 from .users import UsersController
@@ -0,0 +1,34 @@
+from litestar import Controller, get, post, delete
+from litestar.di import Provide
+from litestar.exceptions import NotFoundException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db_session
+from app.models import GlobalBan, User
+from app.schemas import GlobalBanCreate
+from app.services.auth_service import get_current_user, moderator_user_guard
+from app.services.ban_service import get_global_bans, add_global_bans, remove_global_ban
+
+
+class GlobalBansController(Controller):
+    path = "/api/bans"
+    tags = ["Bans"]
+    dependencies = {
+        "db": Provide(get_db_session),
+        "current_user": Provide(get_current_user),
+    }
+    guards = [moderator_user_guard]
+
+    @get("/")
+    async def list_global_bans(self, db: AsyncSession) -> list[GlobalBan]:
+        return await get_global_bans(db)
+
+    @post("/")
+    async def add_global_bans(self, current_user: User, data: list[GlobalBanCreate],
+                              db: AsyncSession) -> list[GlobalBan]:
+        return await add_global_bans(data, current_user, db)
+
+    @delete("/{player_id:str}")
+    async def remove_global_ban(self, player_id: str, db: AsyncSession) -> None:
+        if not await remove_global_ban(player_id, db):
+            raise NotFoundException("Player is not globally banned")
@@ -1,21 +1,25 @@
 from pathlib import Path
-from typing import Any
+from typing import Any, Annotated
 
 from litestar import Controller, get, post, Response, MediaType
 from litestar.di import Provide
 from litestar.exceptions import NotAuthorizedException, NotFoundException
+from litestar.params import Parameter
 from litestar.response import File
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import get_db_session
 from app.core import settings
 from app.enums import Role
+from app.managers import job_manager
 from app.models import User
-from app.schemas.fileinfo import FileInfo, FilesRequest, RenameFileRequest, HookRequest, HookType
+from app.schemas import Job
+from app.schemas.fileinfo import FileInfo, FilesRequest, RenameFileRequest, HookRequest, HookType, FileSort, \
+    DiskUsage, ArchiveFormat
 from app.services.auth_service import get_current_user
 from app.services.files_service import list_miniverse_files, delete_miniverse_files, copy_miniverse_files, \
     transform_safe_miniverse_files, download_files, upload_miniverse_file, extract_miniverse_archive, rename_file, \
-    compress_miniverse_files, get_file_content, set_file_content
+    compress_miniverse_files, get_file_content, set_file_content, get_miniverse_disk_usage
 from app.services.miniverse_service import get_miniverse
 
 
@@ -29,33 +33,52 @@ class FilesController(Controller):
 
     @get("/{miniverse_id:str}")
     async def list_miniverse_files(self, current_user: User, miniverse_id: str, db: AsyncSession,
-                                   path: Path = Path("/")) -> list[FileInfo] | None:
+                                   path: Path = Path("/"), sort: FileSort = FileSort.NAME, descending: bool = False,
+                                   limit: Annotated[int | None, Parameter(ge=1)] = None,
+                                   cursor: str | None = None) -> Response[list[FileInfo] | None]:
         if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
             raise NotAuthorizedException("You are not authorized to view files in this miniverse")
 
         miniverse = await get_miniverse(miniverse_id, db)
 
-        return list_miniverse_files(miniverse, path)
+        page = await list_miniverse_files(miniverse, path, sort=sort, descending=descending, limit=limit,
+                                          cursor=cursor)
+        if page is None:
+            return Response(None)
+        # Large folders should be listed with a limit, the cursor of the next page is sent in a header to keep
+        # the array shape
+        headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor is not None else None
+        return Response(page.files, headers=headers)
+
+    @get("/{miniverse_id:str}/usage")
+    async def get_miniverse_disk_usage(self, current_user: User, miniverse_id: str, db: AsyncSession,
+                                       path: Path = Path("/")) -> DiskUsage:
+        if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
+            raise NotAuthorizedException("You are not authorized to view files in this miniverse")
+
+        miniverse = await get_miniverse(miniverse_id, db)
+
+        return await get_miniverse_disk_usage(miniverse, path)
 
     @post("/{miniverse_id:str}/delete")
     async def delete_miniverse_files(self, current_user: User, miniverse_id: str, db: AsyncSession,
-                                     data: FilesRequest) -> None:
+                                     data: FilesRequest) -> Job:
         if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
             raise NotAuthorizedException("You are not authorized to delete files in this miniverse")
 
         miniverse = await get_miniverse(miniverse_id, db)
 
-        return delete_miniverse_files(miniverse, data.paths)
+        return await delete_miniverse_files(miniverse, data.paths)
 
     @post("/{miniverse_id:str}/copy")
     async def copy_miniverse_files(self, current_user: User, miniverse_id: str, db: AsyncSession, data: FilesRequest,
-                                   destination: Path) -> None:
+                                   destination: Path) -> Job:
         if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
             raise NotAuthorizedException("You are not authorized to copy files in this miniverse")
 
         miniverse = await get_miniverse(miniverse_id, db)
 
-        return copy_miniverse_files(miniverse, data.paths, destination)
+        return await copy_miniverse_files(miniverse, data.paths, destination)
 
     @get("/{miniverse_id:str}/download")
     async def download_files(
@@ -77,7 +100,7 @@ class FilesController(Controller):
         if len(safe_paths) <= 0:
             raise NotFoundException("Dossier vide")
 
-        return download_files(safe_paths)
+        return await download_files(miniverse, safe_paths)
 
     @post("/tus-hooks")
     async def confirm_upload(
@@ -141,7 +164,7 @@ class FilesController(Controller):
             miniverse_id: str,
             db: AsyncSession,
             path: Path = Path("/"),
-    ) -> None:
+    ) -> Job:
         if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
             raise NotAuthorizedException("You are not authorized to upload files in this miniverse")
 
@@ -155,14 +178,42 @@ class FilesController(Controller):
             current_user: User,
             miniverse_id: str,
             data: FilesRequest,
-            db: AsyncSession
-    ) -> None:
+            db: AsyncSession,
+            archive_format: Annotated[ArchiveFormat, Parameter(query="format")] = ArchiveFormat.ZIP
+    ) -> Job:
         if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
             raise NotAuthorizedException("You are not authorized to compress files in this miniverse")
 
         miniverse = await get_miniverse(miniverse_id, db)
 
-        return await compress_miniverse_files(miniverse, data.paths)
+        return await compress_miniverse_files(miniverse, data.paths, archive_format)
+
+    @get("/{miniverse_id:str}/jobs")
+    async def list_miniverse_jobs(self, current_user: User, miniverse_id: str) -> list[Job]:
+        if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
+            raise NotAuthorizedException("You are not authorized to view files in this miniverse")
+
+        return await job_manager.list_jobs(miniverse_id)
+
+    @get("/{miniverse_id:str}/jobs/{job_id:str}")
+    async def get_miniverse_job(self, current_user: User, miniverse_id: str, job_id: str) -> Job:
+        if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
+            raise NotAuthorizedException("You are not authorized to view files in this miniverse")
+
+        job = await job_manager.get(job_id)
+        if job is None or job.miniverse_id != miniverse_id:
+            raise NotFoundException(f"Job {job_id} not found")
+        return job
+
+    @post("/{miniverse_id:str}/jobs/{job_id:str}/cancel")
+    async def cancel_miniverse_job(self, current_user: User, miniverse_id: str, job_id: str) -> Job:
+        if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
+            raise NotAuthorizedException("You are not authorized to manage files in this miniverse")
+
+        job = await job_manager.get(job_id)
+        if job is None or job.miniverse_id != miniverse_id:
+            raise NotFoundException(f"Job {job_id} not found")
+        return await job_manager.cancel(job_id)
 
     @post("/{miniverse_id:str}/rename")
     async def rename_miniverse_file(self, current_user: User, miniverse_id: str, db: AsyncSession,
@@ -172,7 +223,7 @@ class FilesController(Controller):
 
         miniverse = await get_miniverse(miniverse_id, db)
 
-        rename_file(miniverse, data.path, data.new_name)
+        await rename_file(miniverse, data.path, data.new_name)
 
     @get("/{miniverse_id:str}/content")
     async def get_file_content(self, current_user: User, miniverse_id: str, path: Path, db: AsyncSession) -> File:
@@ -181,7 +232,7 @@ class FilesController(Controller):
 
         miniverse = await get_miniverse(miniverse_id, db)
 
-        return get_file_content(miniverse, path)
+        return await get_file_content(miniverse, path)
 
     @post("/{miniverse_id:str}/content")
     async def set_file_content(self, current_user: User, miniverse_id: str, path: Path, db: AsyncSession,
@@ -194,4 +245,4 @@ class FilesController(Controller):
         if not "content" in data:
             raise ValueError("Missing 'content' field")
 
-        return set_file_content(miniverse, path, data["content"])
+        return await set_file_content(miniverse, path, data["content"])
@@ -2,7 +2,7 @@ from litestar import Controller, get
 from litestar.exceptions import NotFoundException
 
 from app.schemas.minecraft import MinecraftVersion
-from app.services.minecraft_service import get_minecraft_versions
+from app.services.minecraft_service import get_minecraft_versions, minecraft_versions
 
 
 class MinecraftController(Controller):
@@ -14,8 +14,7 @@ class MinecraftController(Controller):
         all_versions = await get_minecraft_versions()
         if min_version is None:
             return all_versions
-        min_version = min_version.lower().strip()
-        min_version_index = next((i for i, v in enumerate(all_versions) if v.version == min_version), None)
+        min_version_index = minecraft_versions.get_position(min_version.lower().strip())
         if min_version_index is not None:
             return all_versions[:min_version_index + 1]
 
@@ -1,24 +1,33 @@
 import re
+from datetime import datetime, date, timedelta
 
 from litestar import get, post, Controller, delete, put
 from litestar.di import Provide
 from litestar.exceptions import NotFoundException, NotAuthorizedException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.utils import utc_now
 from app.db.session import get_db_session
 from app.enums import Role
 from app.events.miniverse_event import publish_miniverse_updated_event
+from app.managers import mod_update_scanner
 from app.managers.ServerStatusManager import miniverses_manager
 from app.models import Miniverse, Mod, User, MiniverseUserRole
-from app.schemas import MiniverseCreate, ModUpdateInfo, AutomaticInstallMod, \
-    MSMPPlayerBan, MSMPPlayer
+from app.schemas import MiniverseCreate, ModUpdateInfo, AutomaticInstallMod, ModpackInstall, ModsReconcileResult, \
+    MSMPPlayerBan, MSMPPlayer, PlayerModerationOperation, PlayerModerationResult, OnlinePlayer
+from app.schemas.player_stats import HourlyPlayerStats, PeakHourStats, PlayerPlaytime
 from app.schemas.user import RoleSchema
 from app.services.auth_service import get_current_user
+from app.services.connexion.player_index import player_index
 from app.services.miniverse_service import create_miniverse, get_miniverses, delete_miniverse, get_miniverse, \
     start_miniverse, stop_miniverse, restart_miniverse, update_miniverse, miniverse_set_player_operator, \
-    miniverse_kick_player, miniverse_ban_player, miniverse_unban_player, list_miniverse_users, get_miniverse_user_role
-from app.services.mods_service import get_mod, install_mod, uninstall_mod, update_mod, list_possible_mod_updates, \
-    automatic_mod_install
+    miniverse_kick_player, miniverse_ban_player, miniverse_unban_player, list_miniverse_users, get_miniverse_user_role, \
+    miniverses_bulk_moderation
+from app.services.mods_service import get_mod, install_mod, uninstall_mod, update_mod, automatic_mod_install
+from app.services.modpack_service import install_modpack
+from app.services.mods_reconcile_service import reconcile_mods
+from app.services.player_session_service import get_miniverse_player_curve, get_miniverse_peak_hours, \
+    get_player_playtime
 from app.services.user_service import get_user, get_user_by_username
 
 UUID4_REGEX = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$', re.IGNORECASE)
@@ -120,6 +129,15 @@ class MiniversesController(Controller):
         miniverse = await get_miniverse(miniverse_id, db)
         return await install_mod(mod_version_id, miniverse, db)
 
+    @post("/{miniverse_id:str}/install/modpack")
+    async def install_modpack(self, current_user: User, miniverse_id: str, data: ModpackInstall,
+                              db: AsyncSession) -> list[Mod]:
+        if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
+            raise NotAuthorizedException("You are not authorized to install mods in this miniverse")
+
+        miniverse = await get_miniverse(miniverse_id, db)
+        return await install_modpack(miniverse, data.path, db)
+
     @delete("/mods/{mod_id:str}")
     async def uninstall_mod(self, current_user: User, mod_id: str, db: AsyncSession) -> None:
         if (mod := await get_mod(mod_id, db)) is None:
@@ -141,15 +159,43 @@ class MiniversesController(Controller):
 
         return await update_mod(mod, new_version_id, db)
 
+    @post("/{miniverse_id:str}/mods/reconcile")
+    async def reconcile_mods(self, current_user: User, miniverse_id: str, db: AsyncSession) -> ModsReconcileResult:
+        if current_user.get_miniverse_role(miniverse_id) < Role.MODERATOR:
+            raise NotAuthorizedException("You are not authorized to manage mods in this miniverse")
+
+        miniverse = await get_miniverse(miniverse_id, db)
+        return await reconcile_mods(miniverse, db)
+
     @get("/{miniverse_id:str}/mods/updates")
-    async def list_mod_updates(self, current_user: User, miniverse_id: str, db: AsyncSession) -> dict[
-        str, ModUpdateInfo]:
+    async def list_mod_updates(self, current_user: User, miniverse_id: str, db: AsyncSession,
+                               refresh: bool = False) -> dict[str, ModUpdateInfo]:
         if current_user.get_miniverse_role(miniverse_id) < Role.USER:
             raise NotAuthorizedException("You are not authorized to view mod updates in this miniverse")
 
         miniverse = await get_miniverse(miniverse_id, db)
 
-        return await list_possible_mod_updates(miniverse)
+        return await mod_update_scanner.get_updates(miniverse, refresh=refresh)
+
+    @get("/{miniverse_id:str}/stats/players")
+    async def get_player_curve(self, current_user: User, miniverse_id: str, db: AsyncSession,
+                               start: datetime | None = None, end: datetime | None = None) -> list[HourlyPlayerStats]:
+        if current_user.get_miniverse_role(miniverse_id) < Role.USER:
+            raise NotAuthorizedException("You are not authorized to view stats of this miniverse")
+
+        end = end or utc_now()
+        start = start or end - timedelta(days=7)
+        return await get_miniverse_player_curve(miniverse_id, start, end, db)
+
+    @get("/{miniverse_id:str}/stats/peak-hours")
+    async def get_peak_hours(self, current_user: User, miniverse_id: str, db: AsyncSession,
+                             start: datetime | None = None, end: datetime | None = None) -> list[PeakHourStats]:
+        if current_user.get_miniverse_role(miniverse_id) < Role.USER:
+            raise NotAuthorizedException("You are not authorized to view stats of this miniverse")
+
+        end = end or utc_now()
+        start = start or end - timedelta(days=30)
+        return await get_miniverse_peak_hours(miniverse_id, start, end, db)
 
     @get("/{miniverse_id:str}/users")
     async def list_miniverse_users(self, current_user: User, miniverse_id: str, db: AsyncSession) -> list[User]:
@@ -213,6 +259,26 @@ class MiniversesController(Controller):
 
         return result
 
+    @get("/players/online")
+    async def search_online_players(self, current_user: User, prefix: str, limit: int = 20) -> list[OnlinePlayer]:
+        players = await player_index.search(prefix, limit)
+        return [p for p in players if current_user.get_miniverse_role(p.miniverse_id) >= Role.USER]
+
+    @get("/players/online/{player_id_or_name:str}")
+    async def find_online_player(self, current_user: User, player_id_or_name: str) -> OnlinePlayer:
+        player = await player_index.find(player_id_or_name)
+        if player is None or current_user.get_miniverse_role(player.miniverse_id) < Role.USER:
+            raise NotFoundException("Player is not online")
+        return player
+
+    @get("/players/{player_id:str}/playtime")
+    async def get_player_playtime(self, current_user: User, player_id: str, db: AsyncSession,
+                                  start: date | None = None, end: date | None = None) -> list[PlayerPlaytime]:
+        end = end or utc_now().date()
+        start = start or end - timedelta(days=30)
+        playtimes = await get_player_playtime(player_id, start, end, db)
+        return [p for p in playtimes if current_user.get_miniverse_role(p.miniverse_id) >= Role.USER]
+
     @get("/players/banned")
     async def list_all_banned_players(self, current_user: User, db: AsyncSession) -> dict[str, list[MSMPPlayerBan]]:
         miniverses = await get_miniverses(db)
@@ -229,6 +295,12 @@ class MiniversesController(Controller):
 
         return result
 
+    @post("/players/moderation")
+    async def bulk_moderate_players(self, current_user: User, data: list[PlayerModerationOperation],
+                                    db: AsyncSession) -> list[PlayerModerationResult]:
+        # Each operation is checked individually, failures are reported per item instead of failing the whole batch
+        return await miniverses_bulk_moderation(data, current_user, db)
+
     @post("/{miniverse_id:str}/operator")
     async def set_operator(self, current_user: User, miniverse_id: str, player_id: str, db: AsyncSession,
                            value: bool = True) -> None:
@@ -7,11 +7,10 @@ from litestar.params import Parameter
 
 from app.db.session import get_db_session
 from app.enums import MiniverseType
-from app.schemas import ModrinthSearchResults, ModrinthSearchFacets, ModrinthProjectType, ModrinthProjectVersion, \
-    ModrinthProject
+from app.managers import mod_search_index
+from app.schemas import ModrinthSearchResults, ModrinthProjectVersion, ModrinthProject
 from app.services.auth_service import get_current_user
-from app.services.mods_service import search_modrinth_projects, get_project_details, list_project_versions, \
-    get_version_details
+from app.services.mods_service import get_project_details, list_project_versions, get_version_details
 
 
 class ModsController(Controller):
@@ -24,15 +23,9 @@ class ModsController(Controller):
 
     @get("/search", cache=600)
     async def search_mods(self, query_search: Annotated[str, Parameter(query="query")], limit: int = 20,
-                          offset: int = 0) -> ModrinthSearchResults:
-        return await search_modrinth_projects(
-            query_search,
-            facets=ModrinthSearchFacets(
-                project_type=ModrinthProjectType.MOD,
-            ),
-            limit=limit,
-            offset=offset
-        )
+                          offset: int = 0, loader: MiniverseType | None = None,
+                          game_version: str | None = None) -> ModrinthSearchResults:
+        return await mod_search_index.search(query_search, limit, offset, loader=loader, game_version=game_version)
 
     @get("{project_id:str}/details", cache=600)
     async def get_mod_details(self, project_id: str) -> ModrinthProject:
@@ -19,6 +19,35 @@ class Settings(BaseSettings):
     KEYCLOAK_REALM: str = "miniverse"
     KEYCLOAK_CLIENT_ID: str = "miniverse-client"
     DOMAIN_NAME: str = "miniverse.fr"
+    BULK_MODERATION_CONCURRENCY: int = 16
+    MODRINTH_MAX_CONNECTIONS: int = 20
+    MODRINTH_MAX_RETRIES: int = 4
+    MODRINTH_TIMEOUT: float = 15.0
+    MODRINTH_CACHE_TTL: int = 600
+    MODRINTH_CACHE_STALE_TTL: int = 7 * 24 * 3600
+    MOD_UPDATE_CHECK_CONCURRENCY: int = 8
+    MOD_DOWNLOAD_CONCURRENCY: int = 6
+    MOD_UPDATE_SCAN_INTERVAL: int = 6 * 3600
+    MOD_SEARCH_INDEX_SIZE: int = 5000
+    MOD_SEARCH_INDEX_SYNC_INTERVAL: int = 24 * 3600
+    MOD_SEARCH_FALLBACK_TIMEOUT: float = 3.0
+    MINECRAFT_VERSIONS_REFRESH_INTERVAL: int = 3600
+    HASH_WORKERS: int | None = None  # Defaults to the number of CPUs
+    FILE_WORKERS: int = 8
+    FILE_OPERATIONS_PER_MINIVERSE: int = 2
+    JOB_WORKERS: int = 4
+    JOBS_PER_MINIVERSE: int = 2
+    COPY_WORKERS: int = 8
+    COMPRESS_WORKERS: int | None = None  # Defaults to the number of CPUs
+    ZIP_COMPRESSION_LEVEL: int = 6
+    ARCHIVE_ZSTD_LEVEL: int = 3
+    EXTRACT_MAX_SIZE: int = 50 * 1024 ** 3
+    EXTRACT_MAX_ENTRIES: int = 500_000
+    EXTRACT_MAX_RATIO: int = 100
+    CRC_CACHE_TTL: int = 30 * 24 * 3600
+    JOB_RETENTION: int = 24 * 3600
+    SIZE_INDEX_REFRESH_INTERVAL: int = 60
+    SIZE_INDEX_MAX_AGE: int = 600
 
 
 settings = Settings()
@@ -1,5 +1,6 @@
 import random
 import string
+from datetime import datetime, timezone
 from pathlib import Path
 
 import yaml
@@ -25,3 +26,8 @@ def write_yaml_safe(data: dict, path: Path) -> None:
 
 def websocket_uri_from_miniverse_id(miniverse_id: str) -> str:
     return f"ws://miniverse-{miniverse_id}:25585"
+
+
+def utc_now() -> datetime:
+    # Naive UTC datetime, as stored by MySQL DATETIME columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
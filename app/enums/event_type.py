@@ -11,3 +11,6 @@ class EventType(str, Enum):
     CREATED = "miniverse:created"
     DELETED = "miniverse:deleted"
     UPDATED = "miniverse:updated"
+    MODPACK_PROGRESS = "miniverse:modpack-progress"
+    MOD_UPDATES = "miniverse:mod-updates"
+    JOB = "miniverse:job"
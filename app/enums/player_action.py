@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class PlayerAction(str, Enum):
+    BAN = "ban"
+    UNBAN = "unban"
+    KICK = "kick"
+    OP = "op"
+    DEOP = "deop"
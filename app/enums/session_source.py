@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class SessionSource(str, Enum):
+    MSMP = "msmp"
+    MC_ROUTER = "mc-router"
@@ -11,17 +11,24 @@ from litestar.types import HTTPScope
 
 from app import logger
 from app.api.internal.mcrouter import MCRouterController
-from app.api.v1 import UsersController, MiniversesController, ModsController
+from app.api.v1 import UsersController, MiniversesController, ModsController, GlobalBansController
 from app.api.v1.files import FilesController
 from app.api.v1.minecraft import MinecraftController
 from app.api.v1.users import SelfUserController
 from app.api.v1.websockets import websocket_miniverse_updates_handler, websocket_miniverse_logs_handler
 from app.core.channels import channels_plugin
 from app.db.session import session_config
-from app.managers import miniverses_manager
+from app.managers import miniverses_manager, mod_update_scanner, mod_search_index, job_manager
 from app.services.auth_service import jwtAuth
 from app.services.docker_service import dockerctl
+from app.services.file_compress import shutdown_compress_executor
+from app.services.file_copy import shutdown_copy_executor
+from app.services.file_executor import shutdown_file_executor
 from app.services.miniverse_service import get_miniverses, start_miniverse, stop_miniverse_container
+from app.services.minecraft_service import minecraft_versions
+from app.services.modrinth_client import modrinth_client
+from app.services.mods_reconcile_service import shutdown_hash_pool
+from app.services.mods_service import collect_mod_blobs
 from app.services.proxy_service import start_proxy_containers, update_proxy_config, stop_proxy_containers
 
 
@@ -30,6 +37,14 @@ async def proxy_startup():
         await update_proxy_config(session)
 
 
+async def minecraft_versions_startup():
+    try:
+        await minecraft_versions.load()
+    except Exception as e:
+        logger.error(f"Could not load Minecraft versions: {e}")
+    minecraft_versions.start()
+
+
 async def miniverse_controller_manager_startup():
     async with session_config.get_session() as session:
         miniverses = await get_miniverses(session)
@@ -39,6 +54,23 @@ async def miniverse_controller_manager_startup():
                 control.start()
 
 
+async def blob_store_startup():
+    async with session_config.get_session() as session:
+        await collect_mod_blobs(session)
+
+
+async def mod_update_scanner_startup():
+    mod_update_scanner.start()
+
+
+async def mod_search_index_startup():
+    mod_search_index.start()
+
+
+async def job_manager_startup():
+    job_manager.start()
+
+
 async def docker_startup():
     await start_proxy_containers()
     async with session_config.get_session() as session:
@@ -71,16 +103,19 @@ def custom_cache_response_filter(_: HTTPScope, status_code: int) -> bool:
 
 response_cache_config = ResponseCacheConfig(cache_response_filter=custom_cache_response_filter)
 
-cors_config = CORSConfig(allow_origins=["*"], allow_credentials=True)  # TODO: do cleaner CORS config
+cors_config = CORSConfig(allow_origins=["*"], allow_credentials=True, expose_headers=["X-Next-Cursor"])  # TODO: do cleaner CORS config
 
 app = Litestar(
     cors_config=cors_config,
     response_cache_config=response_cache_config,
     route_handlers=[UsersController, SelfUserController, MiniversesController, FilesController, ModsController,
-                    MinecraftController, MCRouterController,
+                    MinecraftController, MCRouterController, GlobalBansController,
                     websocket_miniverse_updates_handler, websocket_miniverse_logs_handler],
-    on_startup=[proxy_startup, miniverse_controller_manager_startup, docker_startup],
-    on_shutdown=[],
+    on_startup=[proxy_startup, minecraft_versions_startup, miniverse_controller_manager_startup, blob_store_startup,
+                docker_startup, mod_update_scanner_startup, mod_search_index_startup, job_manager_startup],
+    on_shutdown=[minecraft_versions.stop, mod_update_scanner.stop, mod_search_index.stop, job_manager.stop,
+                 modrinth_client.close, shutdown_hash_pool, shutdown_file_executor,
+                 shutdown_copy_executor, shutdown_compress_executor],
     on_app_init=[jwtAuth.on_app_init],
     openapi_config=OpenAPIConfig(
         title="Miniverse API",
@@ -0,0 +1,184 @@
+import asyncio
+import time
+import uuid
+from typing import Callable
+
+from redis.asyncio import Redis
+
+from app import logger
+from app.core import settings
+from app.core.channels import redis_async_client
+from app.enums.event_type import EventType
+from app.events.miniverse_event import publish_miniverse_control_event
+from app.schemas import Job, JobType, JobStatus
+from app.services.file_executor import OperationProgress, OperationCancelled, run_job_operation
+
+INTERRUPTED_ERROR = "Interrupted by a restart of the API"
+
+
+class JobManager:
+    """
+    Long file operations (copy, delete, compress, extract) run as background jobs instead of inside the request.
+    Jobs are shared by all API workers through Redis:
+        - jobs: job id -> Job json
+        - miniverse:{id}: set of the job ids of a miniverse
+        - cancelled: set of the job ids to cancel, polled by the worker running the job
+
+    The worker running a job saves its progress (and publishes it on the miniverse channel) every progress_interval,
+    this also serves as a heartbeat: unfinished jobs not updated for stale_after seconds belong to a stopped worker
+    and are marked as failed. Finished jobs are kept for JOB_RETENTION seconds.
+    """
+
+    def __init__(self, redis: Redis, namespace: str, progress_interval: float = 0.5, stale_after: float = 30.0):
+        self.redis = redis
+        self.namespace = namespace
+        self.progress_interval = progress_interval
+        self.stale_after = stale_after
+        self._running: dict[str, tuple[asyncio.Task, OperationProgress]] = {}
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.namespace, *parts))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Jobs of this worker cannot be resumed after a restart: interrupt them so they clean up their partial
+        # output and fail. Jobs still running after the timeout are failed by the cleanup of the next worker.
+        self._stopping = True
+        for _, progress in self._running.values():
+            progress.cancel()
+        if self._running:
+            await asyncio.wait([task for task, _ in self._running.values()], timeout=self.stale_after / 3)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.cleanup()
+            except Exception as e:
+                logger.error(f"Job cleanup failed: {e}")
+            await asyncio.sleep(self.stale_after)
+
+    async def cleanup(self) -> None:
+        """Fail the unfinished jobs of stopped workers and forget finished jobs past their retention."""
+        now = time.time()
+        for raw_job in (await self.redis.hgetall(self._key("jobs"))).values():
+            job = Job.model_validate_json(raw_job)
+            if job.status.finished and now - job.updated_at > settings.JOB_RETENTION:
+                await self._delete(job)
+            elif not job.status.finished and job.id not in self._running and now - job.updated_at > self.stale_after:
+                logger.warning(f"Job {job.id} of miniverse {job.miniverse_id} was interrupted, marking it as failed")
+                await self._finish(job, JobStatus.FAILED, INTERRUPTED_ERROR)
+
+    async def _save(self, job: Job, publish: bool = True) -> None:
+        job.updated_at = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key("jobs"), job.id, job.model_dump_json())
+            pipe.sadd(self._key("miniverse", job.miniverse_id), job.id)
+            await pipe.execute()
+        if publish:
+            publish_miniverse_control_event(job.miniverse_id, EventType.JOB, job.model_dump(mode="json"))
+
+    async def _delete(self, job: Job) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self._key("jobs"), job.id)
+            pipe.srem(self._key("miniverse", job.miniverse_id), job.id)
+            pipe.srem(self._key("cancelled"), job.id)
+            await pipe.execute()
+
+    async def _finish(self, job: Job, status: JobStatus, error: str | None = None) -> None:
+        job.status = status
+        job.error = error
+        await self._save(job)
+        await self.redis.srem(self._key("cancelled"), job.id)
+
+    async def get(self, job_id: str) -> Job | None:
+        raw_job = await self.redis.hget(self._key("jobs"), job_id)
+        if raw_job is None:
+            return None
+        return Job.model_validate_json(raw_job)
+
+    async def list_jobs(self, miniverse_id: str) -> list[Job]:
+        job_ids = list(await self.redis.smembers(self._key("miniverse", miniverse_id)))
+        if not job_ids:
+            return []
+        raw_jobs = await self.redis.hmget(self._key("jobs"), job_ids)
+        jobs = [Job.model_validate_json(raw_job) for raw_job in raw_jobs if raw_job is not None]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    async def submit(self, miniverse_id: str, job_type: JobType, func: Callable[..., object], *args) -> Job:
+        """
+        Run func(*args, progress=...) on the job executor as a job of the miniverse and return the job right away.
+        func reports its progress and is interrupted through the OperationProgress it receives, a dict it returns is
+        saved as the result of the job.
+        """
+        now = time.time()
+        job = Job(id=uuid.uuid4().hex, miniverse_id=miniverse_id, type=job_type, created_at=now, updated_at=now)
+        await self._save(job)
+
+        progress = OperationProgress()
+        task = asyncio.create_task(self._execute(job, progress, func, args))
+        self._running[job.id] = (task, progress)
+        task.add_done_callback(lambda _: self._running.pop(job.id, None))
+        return job
+
+    async def cancel(self, job_id: str) -> Job | None:
+        job = await self.get(job_id)
+        if job is None or job.status.finished:
+            return job
+        # The job may run on another worker, which polls the cancelled set
+        await self.redis.sadd(self._key("cancelled"), job_id)
+        if job_id in self._running:
+            self._running[job_id][1].cancel()
+        return job
+
+    async def _execute(self, job: Job, progress: OperationProgress, func: Callable[..., object], args: tuple) -> None:
+        def run():
+            progress.started = True
+            progress.check_cancelled()
+            return func(*args, progress=progress)
+
+        future = asyncio.ensure_future(run_job_operation(job.miniverse_id, run))
+        while not future.done():
+            await asyncio.wait({future}, timeout=self.progress_interval)
+            if not progress.cancelled and await self.redis.sismember(self._key("cancelled"), job.id):
+                progress.cancel()
+            if not future.done():
+                previous = (job.status, job.files_done, job.files_total, job.bytes_done, job.bytes_total)
+                job.status = JobStatus.RUNNING if progress.started else JobStatus.PENDING
+                job.files_done, job.files_total = progress.files_done, progress.files_total
+                job.bytes_done, job.bytes_total = progress.bytes_done, progress.bytes_total
+                # Saved on every tick as a heartbeat, only published when it progressed
+                changed = previous != (job.status, job.files_done, job.files_total, job.bytes_done, job.bytes_total)
+                await self._save(job, publish=changed)
+
+        job.files_done, job.files_total = progress.files_done, progress.files_total
+        job.bytes_done, job.bytes_total = progress.bytes_done, progress.bytes_total
+        try:
+            result = future.result()
+        except OperationCancelled:
+            if self._stopping:
+                await self._finish(job, JobStatus.FAILED, INTERRUPTED_ERROR)
+                return
+            logger.info(f"Job {job.id} ({job.type.value}) of miniverse {job.miniverse_id} cancelled")
+            await self._finish(job, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.type.value}) of miniverse {job.miniverse_id} failed: {e}")
+            await self._finish(job, JobStatus.FAILED, str(e))
+        else:
+            job.result = result if isinstance(result, dict) else None
+            await self._finish(job, JobStatus.COMPLETED)
+
+
+job_manager = JobManager(redis_async_client, "jobs")
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import json
+import re
+import time
+
+from app import logger
+from app.core import root_store, settings
+from app.enums import MiniverseType
+from app.schemas import ModrinthSearchResults, ModrinthSearchResult, ModrinthSearchFacets, ModrinthProjectType
+from app.schemas.mods import ModSideSupport
+from app.services.mods_service import search_modrinth_projects, build_facets
+from app.services.modrinth_client import modrinth_client
+
+mod_search_index_store = root_store.with_namespace("mod-search-index")
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+PAGE_SIZE = 100
+MIN_TYPO_TOKEN_LENGTH = 4
+
+# Match quality of a query term, exact matches rank above prefix matches, themselves above typos
+EXACT_MATCH = 3
+PREFIX_MATCH = 2
+TYPO_MATCH = 1
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_REGEX.findall(text.lower())
+
+
+def deletions(token: str) -> set[str]:
+    """Variants of the token with one character removed (deletion neighbourhood, edit distance 1)."""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def server_mod_facets(loader: MiniverseType | None = None, game_version: str | None = None) -> ModrinthSearchFacets:
+    """Facets of the indexed projects (server-side mods), so the index and Modrinth agree on what they return."""
+    return ModrinthSearchFacets(project_type=ModrinthProjectType.MOD,
+                                categories=[loader.value.lower()] if loader else None,
+                                versions=[game_version] if game_version else None,
+                                server_side=[ModSideSupport.REQUIRED, ModSideSupport.OPTIONAL])
+
+
+class ModSearchIndex:
+    """
+    In-memory search index of the server-side mods of Modrinth, synced periodically from the Modrinth search API
+    and persisted in Redis so workers and restarts can load it without syncing.
+
+    Query terms match project tokens exactly, by prefix (sorted token list) or with one typo (deletion
+    neighbourhood). Results can be filtered by loader and game version and are ranked by match quality then
+    downloads. Searches fall back to Modrinth (cached, with a short timeout) when the index is empty, finds nothing
+    for the query, or filters on a loader or game version that no indexed project has.
+    """
+
+    def __init__(self, size: int, sync_interval: int):
+        self.size = size
+        self.sync_interval = sync_interval
+        self.synced_at = 0.0
+        self._task: asyncio.Task | None = None
+
+        self._hits: list[dict] = []
+        self._tokens: list[str] = []  # sorted, for prefix lookups
+        self._postings: dict[str, set[int]] = {}  # token -> hit indexes
+        self._deletions: dict[str, set[str]] = {}  # deletion variant -> tokens
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            await self.load()
+        except Exception as e:
+            logger.warning(f"Could not load the mod search index: {e}")
+        while True:
+            delay = self.synced_at + self.sync_interval - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Mod search index sync failed: {e}")
+                await asyncio.sleep(min(self.sync_interval, 600))
+
+    def _build(self, hits: list[dict]) -> None:
+        postings: dict[str, set[int]] = {}
+        for i, hit in enumerate(hits):
+            for token in tokenize(f"{hit['title']} {hit['slug']} {hit['author']}"):
+                postings.setdefault(token, set()).add(i)
+
+        deletion_index: dict[str, set[str]] = {}
+        for token in postings:
+            if len(token) >= MIN_TYPO_TOKEN_LENGTH:
+                for variant in deletions(token):
+                    deletion_index.setdefault(variant, set()).add(token)
+
+        self._hits = hits
+        self._postings = postings
+        self._tokens = sorted(postings)
+        self._deletions = deletion_index
+
+    async def load(self) -> None:
+        raw = await mod_search_index_store.get("index")
+        if raw is None:
+            return
+        data = json.loads(raw)
+        self._build(data["hits"])
+        self.synced_at = data["synced_at"]
+        logger.info(f"Loaded mod search index ({len(self._hits)} projects)")
+
+    async def sync(self) -> None:
+        # Another worker may have synced the index in the meantime
+        await self.load()
+        if time.time() - self.synced_at < self.sync_interval:
+            return
+
+        facets = build_facets(server_mod_facets())
+
+        async def fetch_page(offset: int) -> list[dict]:
+            data = await modrinth_client.get_json("/search", params={
+                "facets": facets,
+                "index": "downloads",
+                "limit": PAGE_SIZE,
+                "offset": offset,
+            })
+            return data["hits"]
+
+        start = time.perf_counter()
+        pages = await asyncio.gather(*(fetch_page(offset) for offset in range(0, self.size, PAGE_SIZE)))
+        hits = list({hit["project_id"]: hit for page in pages for hit in page}.values())
+
+        self._build(hits)
+        self.synced_at = time.time()
+        await mod_search_index_store.set("index", json.dumps({"synced_at": self.synced_at, "hits": hits}))
+        logger.info(f"Synced mod search index ({len(hits)} projects) in {time.perf_counter() - start:.1f}s")
+
+    def _match_term(self, term: str) -> dict[int, int]:
+        """Return the best match quality of the term for each hit."""
+        matches: dict[int, int] = {}
+
+        def add(token: str, quality: int) -> None:
+            for i in self._postings.get(token, ()):
+                if matches.get(i, 0) < quality:
+                    matches[i] = quality
+
+        start = bisect.bisect_left(self._tokens, term)
+        for token in self._tokens[start:]:
+            if not token.startswith(term):
+                break
+            add(token, EXACT_MATCH if token == term else PREFIX_MATCH)
+
+        if len(term) >= MIN_TYPO_TOKEN_LENGTH - 1:
+            # Tokens at one edit (substitution, insertion or deletion) share a deletion variant with the term
+            candidates = set(self._deletions.get(term, ()))
+            for variant in deletions(term) | {term}:
+                candidates |= self._deletions.get(variant, set())
+                if variant in self._postings:
+                    candidates.add(variant)
+            for token in candidates:
+                add(token, TYPO_MATCH)
+        return matches
+
+    def search_local(self, query: str, limit: int, offset: int = 0, *, loader: MiniverseType | None = None,
+                     game_version: str | None = None) -> ModrinthSearchResults:
+        terms = tokenize(query)
+        if terms:
+            scores = self._match_term(terms[0])
+            for term in terms[1:]:
+                term_matches = self._match_term(term)
+                scores = {i: score + term_matches[i] for i, score in scores.items() if i in term_matches}
+        else:
+            scores = dict.fromkeys(range(len(self._hits)), 0)
+
+        loader_name = loader.value.lower() if loader else None
+        candidates = [
+            i for i in scores
+            if (loader_name is None or loader_name in self._hits[i]["categories"])
+            and (game_version is None or game_version in self._hits[i]["versions"])
+        ]
+        candidates.sort(key=lambda i: (scores[i], self._hits[i]["downloads"]), reverse=True)
+
+        return ModrinthSearchResults(
+            hits=[ModrinthSearchResult.from_dict(self._hits[i]) for i in candidates[offset:offset + limit]],
+            offset=offset,
+            limit=limit,
+            total_hits=len(candidates),
+        )
+
+    async def search(self, query: str, limit: int, offset: int = 0, *, loader: MiniverseType | None = None,
+                     game_version: str | None = None) -> ModrinthSearchResults:
+        if not self._hits:
+            # Index not loaded yet, Modrinth is the only source
+            return await search_modrinth_projects(query, facets=server_mod_facets(loader, game_version), limit=limit,
+                                                  offset=offset)
+
+        local_results = self.search_local(query, limit, offset, loader=loader, game_version=game_version)
+        if local_results.total_hits:
+            return local_results
+
+        # Nothing found: less popular project, or a loader or game version no indexed project has
+        try:
+            async with asyncio.timeout(settings.MOD_SEARCH_FALLBACK_TIMEOUT):
+                return await search_modrinth_projects(query, facets=server_mod_facets(loader, game_version),
+                                                      limit=limit, offset=offset)
+        except Exception as e:
+            logger.warning(f"Could not search Modrinth for {query!r}, returning the local results: {e}")
+            return local_results
+
+
+mod_search_index = ModSearchIndex(settings.MOD_SEARCH_INDEX_SIZE, settings.MOD_SEARCH_INDEX_SYNC_INTERVAL)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+
+from sqlalchemy import select
+
+from app import logger
+from app.core import root_store, settings
+from app.db.session import session_config
+from app.enums import MiniverseType
+from app.enums.event_type import EventType
+from app.events.miniverse_event import publish_miniverse_control_event
+from app.models import Miniverse, Mod
+from app.schemas import ModUpdateInfo, ModUpdateStatus
+from app.services.mods_service import check_mods_updates
+
+mod_updates_store = root_store.with_namespace("mod-updates")
+
+
+class ModUpdateScanner:
+    """
+    Periodically check all miniverses for mod updates and keep the results in Redis, so listing the updates of a
+    miniverse does not hit Modrinth. Miniverses sharing a loader and game version are checked together, and a mod
+    version installed on several of them is only checked once.
+    """
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.scan_all()
+            except Exception as e:
+                logger.error(f"Mod update scan failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def scan_all(self) -> None:
+        async with session_config.get_session() as db:
+            result = await db.execute(select(Miniverse))
+            miniverses = list(result.scalars().all())
+
+        groups: dict[tuple[MiniverseType, str], list[Miniverse]] = {}
+        for miniverse in miniverses:
+            if miniverse.mods:
+                groups.setdefault((miniverse.type, miniverse.mc_version), []).append(miniverse)
+
+        start = time.perf_counter()
+        for (loader, game_version), group in groups.items():
+            await self._scan_group(group, loader, game_version)
+        logger.info(f"Checked mod updates of {len(miniverses)} miniverses in {time.perf_counter() - start:.1f}s")
+
+    async def _scan_group(self, miniverses: list[Miniverse], loader: MiniverseType,
+                          game_version: str) -> dict[str, dict[str, ModUpdateInfo]]:
+        # Check each installed (project, version) once for the whole group
+        unique_mods: dict[tuple[str | None, str | None], Mod] = {}
+        for miniverse in miniverses:
+            for mod in miniverse.mods:
+                unique_mods.setdefault((mod.project_id, mod.version_id), mod)
+        updates = await check_mods_updates(list(unique_mods.values()), loader, game_version)
+
+        results = {}
+        for miniverse in miniverses:
+            results[miniverse.id] = {
+                mod.id: updates[unique_mods[(mod.project_id, mod.version_id)].id] for mod in miniverse.mods
+            }
+            await self._save(miniverse, results[miniverse.id])
+        return results
+
+    async def _save(self, miniverse: Miniverse, updates: dict[str, ModUpdateInfo]) -> None:
+        previous = await self._load(miniverse.id)
+        await mod_updates_store.set(miniverse.id, json.dumps({
+            "checked_at": time.time(),
+            "game_version": miniverse.mc_version,
+            "mod_versions": {mod.id: mod.version_id for mod in miniverse.mods},
+            "updates": {mod_id: info.to_dict() for mod_id, info in updates.items()},
+        }), expires_in=2 * self.interval)
+
+        previous_versions = {
+            (mod_id, version_id)
+            for mod_id, info in (previous["updates"] if previous else {}).items()
+            for version_id in info["new_versions_ids"]
+        }
+        new_updates = {
+            mod_id: info.new_versions_ids for mod_id, info in updates.items()
+            if info.update_status == ModUpdateStatus.UPDATE_AVAILABLE
+            and any((mod_id, v) not in previous_versions for v in info.new_versions_ids)
+        }
+        if new_updates:
+            publish_miniverse_control_event(miniverse.id, EventType.MOD_UPDATES, new_updates)
+
+    async def _load(self, miniverse_id: str) -> dict | None:
+        raw = await mod_updates_store.get(miniverse_id)
+        return json.loads(raw) if raw is not None else None
+
+    async def get_updates(self, miniverse: Miniverse, refresh: bool = False) -> dict[str, ModUpdateInfo]:
+        """Return the cached updates of the miniverse, checking them now if asked or if its mods changed since."""
+        if not refresh:
+            cached = await self._load(miniverse.id)
+            if (cached is not None and cached["game_version"] == miniverse.mc_version
+                    and cached["mod_versions"] == {mod.id: mod.version_id for mod in miniverse.mods}):
+                return {mod_id: ModUpdateInfo.from_dict(info) for mod_id, info in cached["updates"].items()}
+        results = await self._scan_group([miniverse], miniverse.type, miniverse.mc_version)
+        return results[miniverse.id]
+
+
+mod_update_scanner = ModUpdateScanner(settings.MOD_UPDATE_SCAN_INTERVAL)
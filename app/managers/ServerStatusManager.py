@@ -20,7 +20,7 @@ class MiniversesManager:
             existing_control.start()
             return existing_control
 
-        support_websockets = (await compare_versions(miniverse.mc_version, "1.21.9")) == 1
+        support_websockets = compare_versions(miniverse.mc_version, "1.21.9") == 1
         if support_websockets:
             control = WebSocketMiniverseService(miniverse.id, websocket_uri_from_miniverse_id(miniverse.id),
                                                 miniverse.management_server_secret)
@@ -39,6 +39,9 @@ class MiniversesManager:
     def get_miniverse_controller(self, miniverse_id: str) -> BaseMiniverseService | None:
         return self._miniverse_control_services.get(miniverse_id, None)
 
+    def get_miniverse_controllers(self) -> list[BaseMiniverseService]:
+        return list(self._miniverse_control_services.values())
+
     async def handle_mc_router_webhook(self, payload: dict):
         target_id = str(payload.get("backend")).lstrip('miniverse-').split(':')[0]
         service = self._miniverse_control_services.get(target_id)
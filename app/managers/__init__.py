@@ -1 +1,4 @@
 from .ServerStatusManager import miniverses_manager
+from .ModUpdateScanner import mod_update_scanner
+from .ModSearchIndex import mod_search_index
+from .JobManager import job_manager
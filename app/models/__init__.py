@@ -1,3 +1,5 @@
 from .user import *
 from .miniverse import *
-from .mod import *
\ No newline at end of file
+from .mod import *
+from .global_ban import *
+from .player_session import *
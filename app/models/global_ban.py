@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from litestar.dto import dto_field
+from sqlalchemy import String, Text, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core import settings
+from app.core.utils import utc_now
+from app.db import Base
+
+
+class GlobalBan(Base):
+    __tablename__ = "global_bans"
+
+    player_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    player_name: Mapped[str | None] = mapped_column(String(settings.DATABASE_DEFAULT_STRING_LENGTH))
+    reason: Mapped[str] = mapped_column(Text)
+    source: Mapped[str] = mapped_column(String(settings.DATABASE_DEFAULT_STRING_LENGTH))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utc_now,
+                                                 info=dto_field("read-only"))
@@ -21,6 +21,7 @@ class Mod(Base):
     version_name: Mapped[str | None] = mapped_column(String(settings.DATABASE_DEFAULT_STRING_LENGTH))
     version_number: Mapped[str | None] = mapped_column(String(settings.DATABASE_DEFAULT_STRING_LENGTH))
     file_name: Mapped[str] = mapped_column(String(settings.DATABASE_DEFAULT_STRING_LENGTH), info=dto_field("private"))
+    file_hash: Mapped[str | None] = mapped_column(String(128), index=True, info=dto_field("private"))  # sha512
 
     miniverse_id: Mapped[str] = mapped_column(String(36), ForeignKey("miniverses.id"),
                                                      info=dto_field("read-only"),
@@ -0,0 +1,49 @@
+from datetime import datetime, date
+
+from sqlalchemy import String, DateTime, Date, Integer, BigInteger, Enum, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core import settings
+from app.db import Base
+from app.enums.session_source import SessionSource
+
+
+class PlayerSession(Base):
+    """Append-only log of player sessions, one row per join. leave_ts is set once the player leaves."""
+    __tablename__ = "player_sessions"
+    __table_args__ = (
+        Index("ix_player_sessions_miniverse_join", "miniverse_id", "join_ts"),
+        Index("ix_player_sessions_player_join", "player_id", "join_ts"),
+        Index("ix_player_sessions_open", "miniverse_id", "leave_ts"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    player_id: Mapped[str] = mapped_column(String(36))
+    player_name: Mapped[str] = mapped_column(String(settings.DATABASE_DEFAULT_STRING_LENGTH))
+    miniverse_id: Mapped[str] = mapped_column(String(36), ForeignKey("miniverses.id", ondelete="CASCADE"))
+    join_ts: Mapped[datetime] = mapped_column(DateTime)
+    leave_ts: Mapped[datetime | None] = mapped_column(DateTime)
+    source: Mapped[SessionSource] = mapped_column(Enum(SessionSource))
+
+
+class PlayerSessionHourly(Base):
+    """Hourly rollup of player sessions per miniverse, used by dashboards instead of the raw session log."""
+    __tablename__ = "player_sessions_hourly"
+
+    miniverse_id: Mapped[str] = mapped_column(String(36), ForeignKey("miniverses.id", ondelete="CASCADE"),
+                                              primary_key=True)
+    hour: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    playtime_seconds: Mapped[int] = mapped_column(Integer, default=0)
+    joins: Mapped[int] = mapped_column(Integer, default=0)
+    peak_players: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class PlayerPlaytimeDaily(Base):
+    """Daily rollup of playtime per player and miniverse."""
+    __tablename__ = "player_playtime_daily"
+
+    player_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    miniverse_id: Mapped[str] = mapped_column(String(36), ForeignKey("miniverses.id", ondelete="CASCADE"),
+                                              primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    playtime_seconds: Mapped[int] = mapped_column(Integer, default=0)
@@ -1,3 +1,4 @@
 from .miniverse import *
 from .mods import *
-from .player import *
\ No newline at end of file
+from .player import *
+from .jobs import *
\ No newline at end of file
@@ -15,6 +15,28 @@ class FileInfo:
     size: Optional[int]
 
 
+class FileSort(str, Enum):
+    NAME = "name"
+    SIZE = "size"
+    MTIME = "mtime"
+
+
+class ArchiveFormat(str, Enum):
+    ZIP = "zip"
+    TAR_ZST = "tar.zst"
+
+    @property
+    def extension(self) -> str:
+        return "." + self.value
+
+
+@dataclass
+class DiskUsage:
+    path: str
+    size: int
+    files: int
+
+
 @dataclass
 class FilesRequest:
     paths: list[Path]
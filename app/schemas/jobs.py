@@ -0,0 +1,38 @@
+from enum import Enum
+from typing import Optional, Any
+
+from pydantic import BaseModel
+
+
+class JobType(str, Enum):
+    COPY = "copy"
+    DELETE = "delete"
+    COMPRESS = "compress"
+    EXTRACT = "extract"
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class Job(BaseModel):
+    id: str
+    miniverse_id: str
+    type: JobType
+    status: JobStatus = JobStatus.PENDING
+    files_done: int = 0
+    files_total: Optional[int] = None
+    bytes_done: int = 0
+    bytes_total: Optional[int] = None
+    error: Optional[str] = None
+    result: Optional[dict[str, Any]] = None
+    created_at: float
+    updated_at: float
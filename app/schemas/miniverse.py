@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Optional
 
 from pydantic import BaseModel, ConfigDict
@@ -47,3 +48,7 @@ class MiniverseUpdateMCVersion(BaseModel):
 
 class AutomaticInstallMod(BaseModel):
     mod_id: str
+
+
+class ModpackInstall(BaseModel):
+    path: Path  # .mrpack file in the miniverse data folder
@@ -43,6 +43,13 @@ class ModVersionType(enum.Enum):
     ALPHA = "alpha"
 
 
+class ModDependencyType(enum.Enum):
+    REQUIRED = "required"
+    OPTIONAL = "optional"
+    INCOMPATIBLE = "incompatible"
+    EMBEDDED = "embedded"
+
+
 class ModUpdateStatus(enum.Enum):
     ALREADY_UP_TO_DATE = "already_up_to_date"
     UPDATE_AVAILABLE = "update_available"
@@ -56,6 +63,28 @@ class ModUpdateInfo:
     new_versions_ids: list[str]
     game_versions: list[list[str]]  # list of compatible game versions for each new version
 
+    @staticmethod
+    def from_dict(data: dict) -> "ModUpdateInfo":
+        return ModUpdateInfo(
+            update_status=ModUpdateStatus(data["update_status"]),
+            new_versions_ids=data["new_versions_ids"],
+            game_versions=data["game_versions"],
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "update_status": self.update_status.value,
+            "new_versions_ids": self.new_versions_ids,
+            "game_versions": self.game_versions,
+        }
+
+
+@dataclass
+class ModsReconcileResult:
+    created: list[str]  # file names
+    updated: list[str]
+    removed: list[str]
+
 
 # ================== Modrinth API Schemas ================== #
 @dataclass
@@ -63,8 +92,8 @@ class ModrinthSearchFacets:
     project_type: ModrinthProjectType = None
     categories: list[str] = None
     versions: list[str] = None
-    client_side: ModSideSupport = None
-    server_side: ModSideSupport = None
+    client_side: list[ModSideSupport] = None
+    server_side: list[ModSideSupport] = None
 
 
 @dataclass
@@ -244,6 +273,23 @@ class ModrinthProjectFile:
         )
 
 
+@dataclass
+class ModrinthDependency:
+    dependency_type: ModDependencyType
+    version_id: str | None = None
+    project_id: str | None = None
+    file_name: str | None = None
+
+    @staticmethod
+    def from_dict(data: dict) -> "ModrinthDependency":
+        return ModrinthDependency(
+            dependency_type=ModDependencyType(data["dependency_type"]),
+            version_id=data.get("version_id"),
+            project_id=data.get("project_id"),
+            file_name=data.get("file_name"),
+        )
+
+
 @dataclass
 class ModrinthProjectVersion:
     id: str
@@ -261,7 +307,7 @@ class ModrinthProjectVersion:
     status: str
     requested_status: str
     files: list[ModrinthProjectFile]
-    dependencies: list[str] | None = None
+    dependencies: list[ModrinthDependency] | None = None
 
     @staticmethod
     def from_dict(data: dict) -> "ModrinthProjectVersion":
@@ -283,5 +329,47 @@ class ModrinthProjectVersion:
             status=data["status"],
             requested_status=data["requested_status"],
             files=[ModrinthProjectFile.from_dict(f) for f in data["files"]],
-            dependencies=data.get("dependencies"),
+            dependencies=[ModrinthDependency.from_dict(d) for d in data.get("dependencies") or []],
+        )
+
+
+@dataclass
+class ModrinthPackFile:
+    path: str
+    hashes: ModrinthFileHashes
+    downloads: list[str]
+    file_size: int
+    env: dict[str, str] | None = None
+
+    @staticmethod
+    def from_dict(data: dict) -> "ModrinthPackFile":
+        return ModrinthPackFile(
+            path=data["path"],
+            hashes=ModrinthFileHashes(sha1=data["hashes"]["sha1"], sha512=data["hashes"]["sha512"]),
+            downloads=data["downloads"],
+            file_size=data["fileSize"],
+            env=data.get("env"),
+        )
+
+
+@dataclass
+class ModrinthPackIndex:
+    format_version: int
+    game: str
+    version_id: str
+    name: str
+    files: list[ModrinthPackFile]
+    dependencies: dict[str, str]
+    summary: str | None = None
+
+    @staticmethod
+    def from_dict(data: dict) -> "ModrinthPackIndex":
+        return ModrinthPackIndex(
+            format_version=data["formatVersion"],
+            game=data["game"],
+            version_id=data["versionId"],
+            name=data["name"],
+            files=[ModrinthPackFile.from_dict(f) for f in data["files"]],
+            dependencies=data["dependencies"],
+            summary=data.get("summary"),
         )
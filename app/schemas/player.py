@@ -2,6 +2,8 @@ from typing import Optional
 
 from pydantic import BaseModel
 
+from app.enums.player_action import PlayerAction
+
 
 class MSMPPlayer(BaseModel):
     id: str
@@ -19,3 +21,30 @@ class MSMPOperator(BaseModel):
     permissionLevel: int
     bypassesPlayerLimit: bool
     player: MSMPPlayer
+
+
+class PlayerModerationOperation(BaseModel):
+    miniverse_id: str
+    player_id: str
+    action: PlayerAction
+    reason: Optional[str] = None
+
+
+class PlayerModerationResult(BaseModel):
+    miniverse_id: str
+    player_id: str
+    action: PlayerAction
+    success: bool
+    error: Optional[str] = None
+
+
+class GlobalBanCreate(BaseModel):
+    player_id: str
+    player_name: Optional[str] = None
+    reason: str = "You have been banned from the network by an administrator"
+
+
+class OnlinePlayer(BaseModel):
+    id: str
+    name: str
+    miniverse_id: str
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class PlayerPlaytime(BaseModel):
+    miniverse_id: str
+    playtime_seconds: int
+
+
+class HourlyPlayerStats(BaseModel):
+    hour: datetime
+    average_players: float
+    peak_players: int
+    joins: int
+
+
+class PeakHourStats(BaseModel):
+    hour_of_day: int
+    average_players: float
+    peak_players: int
@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Callable, Coroutine
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import logger
+from app.db.session import session_config
+from app.managers import miniverses_manager
+from app.models import GlobalBan, User
+from app.schemas import GlobalBanCreate
+from app.services.connexion.WebSocketMiniverseService import WebSocketMiniverseService
+from app.services.connexion.server_status_store import server_status_store
+
+
+def global_ban_to_msmp(ban: GlobalBan) -> dict:
+    return {
+        'player': {'id': ban.player_id, 'name': ban.player_name or ""},
+        'reason': ban.reason,
+        'source': ban.source,
+    }
+
+
+async def get_global_bans(db: AsyncSession) -> list[GlobalBan]:
+    result = await db.execute(select(GlobalBan))
+    return list(result.scalars().all())
+
+
+async def get_cached_banned_player_ids(miniverse_id: str) -> set[str]:
+    bans = (await server_status_store.get(miniverse_id, "minecraft:bans")) or []
+    return {ban["player"]["id"] for ban in bans}
+
+
+def _connected_websocket_controllers() -> list[WebSocketMiniverseService]:
+    # Disconnected miniverses are skipped, they are reconciled on their next connection
+    return [c for c in miniverses_manager.get_miniverse_controllers()
+            if isinstance(c, WebSocketMiniverseService) and c.rpc.connected]
+
+
+async def _run_on_controllers(action: str,
+                              coro_factory: Callable[[WebSocketMiniverseService], Coroutine[Any, Any, Any]],
+                              controllers: list[WebSocketMiniverseService]) -> None:
+    # The bans are already committed, a failing miniverse must not fail the request nor stop the others
+    results = await asyncio.gather(*(coro_factory(c) for c in controllers), return_exceptions=True)
+    for controller, result in zip(controllers, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not {action} on miniverse {controller.miniverse_id}: {result}")
+
+
+async def reconcile_miniverse_bans(controller: WebSocketMiniverseService, global_bans: list[GlobalBan]) -> int:
+    """
+    Diff the global ban list against the cached ban list of a miniverse and push the missing entries in a single
+    MSMP call. Returns the number of pushed bans.
+    """
+    banned_ids = await get_cached_banned_player_ids(controller.miniverse_id)
+    missing = [global_ban_to_msmp(ban) for ban in global_bans if ban.player_id not in banned_ids]
+    if not missing:
+        return 0
+
+    if not await controller.ban_players(missing):
+        logger.warning(f"Could not push {len(missing)} global bans to miniverse {controller.miniverse_id}")
+        return 0
+
+    logger.info(f"Pushed {len(missing)} global bans to miniverse {controller.miniverse_id}")
+    return len(missing)
+
+
+async def sync_global_bans(controller: WebSocketMiniverseService) -> None:
+    try:
+        async with session_config.get_session() as session:
+            global_bans = await get_global_bans(session)
+        await reconcile_miniverse_bans(controller, global_bans)
+    except Exception as e:
+        logger.error(f"Could not sync global bans on miniverse {controller.miniverse_id}: {e}")
+
+
+async def propagate_global_bans(global_bans: list[GlobalBan]) -> None:
+    await _run_on_controllers("push global bans", lambda c: reconcile_miniverse_bans(c, global_bans),
+                              _connected_websocket_controllers())
+
+
+async def add_global_bans(bans: list[GlobalBanCreate], author: User, db: AsyncSession) -> list[GlobalBan]:
+    db_bans = []
+    for ban in bans:
+        db_ban = await db.get(GlobalBan, ban.player_id)
+        if db_ban is None:
+            db_ban = GlobalBan(player_id=ban.player_id)
+            db.add(db_ban)
+        db_ban.player_name = ban.player_name or db_ban.player_name
+        db_ban.reason = ban.reason
+        db_ban.source = author.username
+        db_bans.append(db_ban)
+    await db.commit()
+
+    await propagate_global_bans(db_bans)
+    return db_bans
+
+
+async def remove_global_ban(player_id: str, db: AsyncSession) -> bool:
+    db_ban = await db.get(GlobalBan, player_id)
+    if db_ban is None:
+        return False
+    await db.delete(db_ban)
+    await db.commit()
+
+    async def unban(controller: WebSocketMiniverseService):
+        if player_id in await get_cached_banned_player_ids(controller.miniverse_id):
+            await controller.unban_players([player_id])
+
+    await _run_on_controllers(f"remove global ban of {player_id}", unban, _connected_websocket_controllers())
+    return True
@@ -0,0 +1,116 @@
+import asyncio
+import errno
+import os
+import time
+from pathlib import Path
+from typing import Callable, Awaitable
+
+from app import logger
+from app.core import settings
+from app.services.file_copy import copy_file
+
+
+def _link_or_copy(source: Path, destination: Path) -> None:
+    if destination.exists() and destination.samefile(source):
+        return
+    tmp_path = destination.with_name(destination.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_path)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        # Different filesystem or hardlinks not allowed: copy-on-write clone or in-kernel copy when possible
+        copy_file(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+def _copy(source: Path, destination: Path) -> None:
+    # Replaces the destination instead of writing into it, in case it is still a link to a blob
+    tmp_path = destination.with_name(destination.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    copy_file(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+class BlobStore:
+    """
+    Content-addressed store for downloaded files (mods, server jars), keyed by their sha512.
+    A blob is downloaded once and hardlinked (or reflinked / copied when linking is not possible) wherever it is
+    needed, so installing an already known file is only a filesystem operation.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def get_path(self, sha512: str) -> Path:
+        return self.root / sha512[:2] / sha512
+
+    def has(self, sha512: str) -> bool:
+        return self.get_path(sha512).is_file()
+
+    async def ensure(self, sha512: str, fetch: Callable[[Path], Awaitable[None]]) -> Path:
+        """
+        Return the path of the blob, calling fetch(path) to download it if it is not in the store yet.
+        fetch must verify the hash and write the blob atomically. Concurrent calls for the same blob share one fetch.
+        """
+        path = self.get_path(sha512)
+        if path.is_file():
+            return path
+
+        task = self._inflight.get(sha512)
+        if task is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            task = asyncio.create_task(fetch(path))
+            self._inflight[sha512] = task
+            task.add_done_callback(lambda _: self._inflight.pop(sha512, None))
+        await asyncio.shield(task)
+        return path
+
+    async def link(self, sha512: str, destination: Path) -> None:
+        await asyncio.to_thread(_link_or_copy, self.get_path(sha512), destination)
+
+    async def copy(self, sha512: str, destination: Path) -> None:
+        """
+        Copy a blob (reflinked when the filesystem supports it) for files that may be edited in place, which
+        would otherwise modify the blob and every other file linked to it.
+        """
+        await asyncio.to_thread(_copy, self.get_path(sha512), destination)
+
+    def remove(self, sha512: str) -> bool:
+        """Remove a blob if no file outside the store still links to it."""
+        path = self.get_path(sha512)
+        try:
+            if path.stat().st_nlink > 1:
+                return False
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def collect_garbage(self, referenced: set[str], grace_period: int = 3600) -> int:
+        """
+        Remove the blobs that are not referenced anymore. Recent blobs are kept so a download that is not
+        recorded in the database yet is not removed.
+        """
+        if not self.root.exists():
+            return 0
+        removed = 0
+        now = time.time()
+        for prefix_dir in self.root.iterdir():
+            if not prefix_dir.is_dir():
+                continue
+            for entry in os.scandir(prefix_dir):
+                if entry.name in referenced or entry.name.endswith(".part"):
+                    continue
+                if now - entry.stat().st_mtime < grace_period:
+                    continue
+                if self.remove(entry.name):
+                    removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unused blobs from the store")
+        return removed
+
+
+blob_store = BlobStore(settings.DATA_PATH / "blobs")
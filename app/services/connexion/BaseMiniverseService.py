@@ -1,10 +1,16 @@
 from abc import ABC, abstractmethod
 
+from app.enums.session_source import SessionSource
 from app.schemas import MSMPPlayer
+from app.services.connexion.player_index import player_index
 from app.services.connexion.server_status_store import server_status_store
+from app.services.player_session_service import record_player_joined, record_player_left, \
+    sync_player_sessions
 
 
 class BaseMiniverseService(ABC):
+    session_source: SessionSource
+
     def __init__(self, miniverse_id: str):
         self.miniverse_id = miniverse_id
 
@@ -33,6 +39,23 @@ class BaseMiniverseService(ABC):
             has_refreshed = True
         return raw_data, has_refreshed
 
+    async def _on_player_joined(self, player: MSMPPlayer):
+        await player_index.add(self.miniverse_id, player)
+        await record_player_joined(self.miniverse_id, player, self.session_source)
+
+    async def _on_player_left(self, player: MSMPPlayer):
+        await player_index.remove(self.miniverse_id, player.id)
+        await record_player_left(self.miniverse_id, player.id)
+
+    async def _on_player_list_synced(self, players: list[MSMPPlayer]):
+        await player_index.set_miniverse_players(self.miniverse_id, players)
+        await sync_player_sessions(self.miniverse_id, players, self.session_source)
+
+    async def _on_stopped(self):
+        # Players of a stopped or crashed server are offline, even if their leave events were never received
+        await player_index.clear_miniverse(self.miniverse_id)
+        await sync_player_sessions(self.miniverse_id, [], self.session_source)
+
     async def get_msmp_player_list(self, refresh_cache=False) -> list[MSMPPlayer]:
         raw_player_list, has_refreshed = await self._get_data_cached("minecraft:players", refresh_cache)
         if raw_player_list is None:
@@ -1,9 +1,12 @@
 from app import logger
+from app.enums.session_source import SessionSource
 from app.schemas import MSMPPlayer
 from app.services.connexion.BaseMiniverseService import BaseMiniverseService
 
 
 class MCRouterMiniverseService(BaseMiniverseService):
+    session_source = SessionSource.MC_ROUTER
+
     def __init__(self, miniverse_id: str):
         super().__init__(miniverse_id)
         self._online_players: dict[str, MSMPPlayer] = {}
@@ -18,6 +21,7 @@ class MCRouterMiniverseService(BaseMiniverseService):
 
     async def stop(self):
         self._online_players.clear()
+        await self._on_stopped()
 
     async def process_webhook(self, payload: dict):
         event_type = payload.get("event")
@@ -31,9 +35,11 @@ class MCRouterMiniverseService(BaseMiniverseService):
 
         if event_type == "connect" and payload.get("status") == "success":
             self._online_players[p_id] = MSMPPlayer(id=p_id, name=p_name)
+            await self._on_player_joined(self._online_players[p_id])
             logger.info(f"Player {p_name} joined {self.miniverse_id} via MC-Router")
         elif event_type == "disconnect":
             self._online_players.pop(p_id, None)
+            await self._on_player_left(MSMPPlayer(id=p_id, name=p_name))
             logger.info(f"Player {p_name} disconnected {self.miniverse_id} via MC-Router")
         else:
             logger.info(f"Unknown event {event_type}")
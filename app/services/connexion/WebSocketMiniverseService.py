@@ -1,12 +1,15 @@
 import asyncio
 
 from app import logger
+from app.enums.session_source import SessionSource
 from app.schemas import MSMPPlayer, MSMPOperator, MSMPPlayerBan
 from app.services.connexion.BaseMiniverseService import BaseMiniverseService
 from app.services.rpc_service import RpcService
 
 
 class WebSocketMiniverseService(BaseMiniverseService):
+    session_source = SessionSource.MSMP
+
     def __init__(self, miniverse_id: str, url: str, secret: str):
         super().__init__(miniverse_id)
         self.rpc = RpcService(url, secret)
@@ -22,13 +25,17 @@ class WebSocketMiniverseService(BaseMiniverseService):
             logger.warn(f"WebSocket miniverse {self.miniverse_id} already started")
 
     async def stop(self):
-        await self.get_msmp_player_list(
-            refresh_cache=True)  # Refresh cache before stopping websocket (in case of server crash)
+        try:
+            # Refresh cache before stopping websocket (in case of server crash)
+            await self.get_msmp_player_list(refresh_cache=True)
+        except Exception as e:
+            logger.warning(f"Could not refresh the player list of miniverse {self.miniverse_id} before stopping: {e}")
         if self.task is not None:
             self.task.cancel()
         else:
             logger.warn(f"WebSocket miniverse {self.miniverse_id} already stopped")
         self.task = None
+        await self._on_stopped()
 
     async def on_connect(self):
         self._add_handlers()
@@ -38,13 +45,17 @@ class WebSocketMiniverseService(BaseMiniverseService):
             self.get_msmp_operator_list(refresh_cache=True),
             self.get_msmp_banned_player_list(refresh_cache=True),
         ]
-        await asyncio.gather(*coro_list)
+        players, _, _ = await asyncio.gather(*coro_list)
+        await self._on_player_list_synced(players)
+
+        from app.services.ban_service import sync_global_bans
+        await sync_global_bans(self)
 
     def _add_handlers(self) -> None:
         self.rpc.async_add_handler("minecraft:notification/players/joined",
-                                   callback=self._handle_msmp_player_list)
+                                   callback=self._handle_msmp_player_joined)
         self.rpc.async_add_handler("minecraft:notification/players/left",
-                                   callback=self._handle_msmp_player_list)
+                                   callback=self._handle_msmp_player_left)
 
         self.rpc.async_add_handler("minecraft:notification/operators/added",
                                    callback=self._handle_msmp_operator_list)
@@ -68,7 +79,12 @@ class WebSocketMiniverseService(BaseMiniverseService):
         self.rpc.async_add_handler("minecraft:notification/server/stopping",
                                    callback=self._handle_server_stopping)
 
-    async def _handle_msmp_player_list(self, _):
+    async def _handle_msmp_player_joined(self, player: dict):
+        await self._on_player_joined(MSMPPlayer(**player))
+        await self.get_msmp_player_list(refresh_cache=True)
+
+    async def _handle_msmp_player_left(self, player: dict):
+        await self._on_player_left(MSMPPlayer(**player))
         await self.get_msmp_player_list(refresh_cache=True)
 
     async def _handle_msmp_operator_list(self, _):
@@ -130,3 +146,11 @@ class WebSocketMiniverseService(BaseMiniverseService):
         data = {'id': player_id}
         result = (await self.rpc.async_call_rpc("minecraft:bans/remove", [data]))
         return result is not None
+
+    async def ban_players(self, bans: list[dict]) -> bool:
+        result = (await self.rpc.async_call_rpc("minecraft:bans/add", bans))
+        return result is not None
+
+    async def unban_players(self, player_ids: list[str]) -> bool:
+        result = (await self.rpc.async_call_rpc("minecraft:bans/remove", [{'id': p_id} for p_id in player_ids]))
+        return result is not None
@@ -0,0 +1,84 @@
+from redis.asyncio import Redis
+
+from app.core.channels import redis_async_client
+from app.schemas import MSMPPlayer, OnlinePlayer
+
+
+class PlayerIndex:
+    """
+    Inverted index of online players, shared by all API workers through Redis:
+        - players: player uuid -> OnlinePlayer json
+        - names: lowercase player name -> player uuid
+        - prefixes: sorted set of lowercase names (all scores are 0) used for lexicographic prefix search
+        - miniverse:{id}: set of player uuids online on this miniverse
+    """
+
+    def __init__(self, redis: Redis, namespace: str):
+        self.redis = redis
+        self.namespace = namespace
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.namespace, *parts))
+
+    async def add(self, miniverse_id: str, player: MSMPPlayer) -> None:
+        online_player = OnlinePlayer(id=player.id, name=player.name, miniverse_id=miniverse_id)
+        lower_name = player.name.lower()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key("players"), player.id, online_player.model_dump_json())
+            pipe.hset(self._key("names"), lower_name, player.id)
+            pipe.zadd(self._key("prefixes"), {lower_name: 0})
+            pipe.sadd(self._key("miniverse", miniverse_id), player.id)
+            await pipe.execute()
+
+    async def remove(self, miniverse_id: str, player_id: str) -> None:
+        await self.redis.srem(self._key("miniverse", miniverse_id), player_id)
+
+        raw_player = await self.redis.hget(self._key("players"), player_id)
+        if raw_player is None:
+            return
+        online_player = OnlinePlayer.model_validate_json(raw_player)
+        if online_player.miniverse_id != miniverse_id:
+            # Player already joined another miniverse before this leave event was received
+            return
+
+        lower_name = online_player.name.lower()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self._key("players"), player_id)
+            pipe.hdel(self._key("names"), lower_name)
+            pipe.zrem(self._key("prefixes"), lower_name)
+            await pipe.execute()
+
+    async def clear_miniverse(self, miniverse_id: str) -> None:
+        player_ids = await self.redis.smembers(self._key("miniverse", miniverse_id))
+        for player_id in player_ids:
+            await self.remove(miniverse_id, player_id.decode())
+
+    async def set_miniverse_players(self, miniverse_id: str, players: list[MSMPPlayer]) -> None:
+        indexed_ids = {p_id.decode() for p_id in await self.redis.smembers(self._key("miniverse", miniverse_id))}
+        online_ids = {p.id for p in players}
+        for player_id in indexed_ids - online_ids:
+            await self.remove(miniverse_id, player_id)
+        for player in players:
+            await self.add(miniverse_id, player)
+
+    async def find(self, query: str) -> OnlinePlayer | None:
+        player_id = await self.redis.hget(self._key("names"), query.lower())
+        raw_player = await self.redis.hget(self._key("players"), player_id or query)
+        if raw_player is None:
+            return None
+        return OnlinePlayer.model_validate_json(raw_player)
+
+    async def search(self, prefix: str, limit: int = 20) -> list[OnlinePlayer]:
+        prefix = prefix.lower()
+        names = await self.redis.zrangebylex(self._key("prefixes"), f"[{prefix}", f"[{prefix}\xff", start=0,
+                                             num=limit)
+        if not names:
+            return []
+        player_ids = [p_id for p_id in await self.redis.hmget(self._key("names"), names) if p_id is not None]
+        if not player_ids:
+            return []
+        raw_players = await self.redis.hmget(self._key("players"), player_ids)
+        return [OnlinePlayer.model_validate_json(p) for p in raw_players if p is not None]
+
+
+player_index = PlayerIndex(redis_async_client, "player-index")
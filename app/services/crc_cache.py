@@ -0,0 +1,124 @@
+import asyncio
+import os
+import zlib
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+from app import logger
+from app.core import settings
+from app.core.channels import redis_async_client
+from app.services.mods_reconcile_service import get_hash_pool
+
+CRC_CHUNK_SIZE = 1024 * 1024
+# Files are sent to the process pool in batches, so small files do not cost a task each
+CRC_BATCH_SIZE = 256 * 1024 * 1024
+CRC_BATCH_FILES = 1000
+
+
+def crc32_files(paths: list[str]) -> list[tuple[int, int, int, str] | None]:
+    """
+    Return (inode, size, mtime_ns, crc32) of each file, None for the files deleted or modified while being read.
+    Runs in the hash process pool.
+    """
+    buffer = bytearray(CRC_CHUNK_SIZE)
+    view = memoryview(buffer)
+    results = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                before = os.fstat(f.fileno())
+                crc = 0
+                while count := f.readinto(buffer):
+                    crc = zlib.crc32(view[:count], crc)
+            after = os.stat(path)
+        except OSError:
+            results.append(None)
+            continue
+        key = (before.st_ino, before.st_size, before.st_mtime_ns)
+        results.append((*key, format(crc, "08x")) if key == (after.st_ino, after.st_size, after.st_mtime_ns)
+                       else None)
+    return results
+
+
+class Crc32Cache:
+    """
+    CRC32 of the files of the miniverses, for the mod_zip manifests of downloads: mod_zip only supports Range
+    requests (resuming a download) when the CRC32 of every file is given. Shared by all API workers through Redis:
+        - miniverse:{id}: file path relative to the data folder -> "inode:size:mtime_ns:crc32"
+
+    An entry is only used while the inode, size and mtime of the file match. Missing CRCs are computed in the
+    background on the hash process pool, so the first download of a folder is not slowed down by them. The hash of a
+    miniverse expires CRC_CACHE_TTL seconds after its last update, which drops the entries of deleted files.
+    """
+
+    def __init__(self, redis: Redis, namespace: str):
+        self.redis = redis
+        self.namespace = namespace
+        self._pending: dict[str, set[str]] = {}  # miniverse id -> paths being computed by this worker
+        self._tasks: set[asyncio.Task] = set()
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.namespace, *parts))
+
+    async def get(self, miniverse_id: str, files: dict[str, os.stat_result]) -> dict[str, str]:
+        """Return the cached CRC32 of the files (relative path -> stat) unchanged since they were computed."""
+        if not files:
+            return {}
+        names = list(files)
+        crcs = {}
+        for name, raw_entry in zip(names, await self.redis.hmget(self._key("miniverse", miniverse_id), names)):
+            if raw_entry is None:
+                continue
+            inode, size, mtime_ns, crc = raw_entry.decode().split(":")
+            file_stat = files[name]
+            if (int(inode), int(size), int(mtime_ns)) == (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns):
+                crcs[name] = crc
+        return crcs
+
+    def schedule(self, miniverse_id: str, root: Path, files: dict[str, os.stat_result]) -> None:
+        """Compute the CRC32 of the files (relative to root) in the background, unless already being computed."""
+        pending = self._pending.setdefault(miniverse_id, set())
+        names = [name for name in files if name not in pending]
+        if not names:
+            return
+        pending.update(names)
+
+        batches: list[list[str]] = [[]]
+        batch_size = 0
+        for name in names:
+            if batch_size >= CRC_BATCH_SIZE or len(batches[-1]) >= CRC_BATCH_FILES:
+                batches.append([])
+                batch_size = 0
+            batches[-1].append(name)
+            batch_size += files[name].st_size
+
+        task = asyncio.create_task(self._compute(miniverse_id, root, batches))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compute(self, miniverse_id: str, root: Path, batches: list[list[str]]) -> None:
+        loop = asyncio.get_running_loop()
+        key = self._key("miniverse", miniverse_id)
+        computed = 0
+        try:
+            # One batch at a time, downloads of other miniverses share the pool
+            for batch in batches:
+                results = await loop.run_in_executor(get_hash_pool(), crc32_files, [str(root / n) for n in batch])
+                entries = {name: ":".join(map(str, result)) for name, result in zip(batch, results)
+                           if result is not None}
+                if entries:
+                    async with self.redis.pipeline(transaction=True) as pipe:
+                        pipe.hset(key, mapping=entries)
+                        pipe.expire(key, settings.CRC_CACHE_TTL)
+                        await pipe.execute()
+                computed += len(entries)
+            logger.info(f"Computed the CRC32 of {computed} files of miniverse {miniverse_id}")
+        except Exception as e:
+            logger.warning(f"Could not compute the CRC32 of files of miniverse {miniverse_id}: {e}")
+        finally:
+            for batch in batches:
+                self._pending[miniverse_id].difference_update(batch)
+
+
+crc32_cache = Crc32Cache(redis_async_client, "crc32")
@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+
+@dataclass
+class DirRecord:
+    mtime_ns: int
+    scanned_at: float
+    size: int  # size of the files directly in the directory
+    files: int
+    subdirs: list[str]
+
+
+@dataclass
+class DirUsage:
+    size: int
+    files: int
+
+
+class DirSizeIndex:
+    """
+    Aggregated size of each directory of a tree, persisted as JSON so restarts do not walk the tree again.
+
+    A directory mtime changes when entries are added, removed or renamed in it, so a refresh only lists the
+    directories whose mtime changed (one stat per directory otherwise). Files growing in place (region files) do
+    not change their directory mtime: directories are also listed again when their record is older than max_age,
+    which bounds how stale the sizes can be.
+    """
+
+    def __init__(self, root: Path, index_path: Path, max_age: float):
+        self.root = root
+        self.index_path = index_path
+        self.max_age = max_age
+        self.refreshed_at: dict[str, float] = {}  # subtree -> last refresh
+        self._records: dict[str, DirRecord] = {}  # relative posix path ("" for the root) -> record
+        self._usages: dict[str, DirUsage] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._records = {path: DirRecord(**record) for path, record in data["records"].items()}
+            self._compute_usages()
+
+    def _save(self) -> None:
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"records": {path: asdict(record) for path, record in self._records.items()}}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self, subtree: str = "") -> int:
+        """Bring the records of the subtree up to date, return the number of directories listed again."""
+        with self._lock:
+            now = time.time()
+            seen: set[str] = set()
+            listed = 0
+            stack = [subtree]
+            while stack:
+                relative_path = stack.pop()
+                path = self.root / relative_path if relative_path else self.root
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(relative_path)
+
+                record = self._records.get(relative_path)
+                if record is None or record.mtime_ns != mtime_ns or now - record.scanned_at > self.max_age:
+                    record = self._scan(path, mtime_ns, now)
+                    self._records[relative_path] = record
+                    listed += 1
+                prefix = relative_path + "/" if relative_path else ""
+                stack.extend(prefix + name for name in record.subdirs)
+
+            prefix = subtree + "/" if subtree else ""
+            removed = [p for p in self._records if (p == subtree or p.startswith(prefix)) and p not in seen]
+            for relative_path in removed:
+                del self._records[relative_path]
+
+            if listed or removed:
+                self._compute_usages()
+                self._save()
+            self.refreshed_at[subtree] = now
+            return listed
+
+    @staticmethod
+    def _scan(path: Path, mtime_ns: int, now: float) -> DirRecord:
+        size = files = 0
+        subdirs = []
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    else:
+                        size += entry.stat(follow_symlinks=False).st_size
+                        files += 1
+                except OSError:
+                    continue
+        return DirRecord(mtime_ns=mtime_ns, scanned_at=now, size=size, files=files, subdirs=subdirs)
+
+    def _compute_usages(self) -> None:
+        # Deepest directories first, so the usage of subdirectories is known when adding them to their parent
+        usages: dict[str, DirUsage] = {}
+        for relative_path in sorted(self._records, key=lambda p: p.count("/") + (p != ""), reverse=True):
+            record = self._records[relative_path]
+            usage = DirUsage(record.size, record.files)
+            prefix = relative_path + "/" if relative_path else ""
+            for name in record.subdirs:
+                sub_usage = usages.get(prefix + name)
+                if sub_usage is not None:
+                    usage.size += sub_usage.size
+                    usage.files += sub_usage.files
+            usages[relative_path] = usage
+        self._usages = usages
+
+    def get_usage(self, relative_path: str = "") -> DirUsage | None:
+        return self._usages.get(relative_path)
+
+    def get_children_sizes(self, relative_path: str = "") -> dict[str, int]:
+        """Known sizes of the subdirectories of a directory, by name."""
+        record = self._records.get(relative_path)
+        if record is None:
+            return {}
+        prefix = relative_path + "/" if relative_path else ""
+        usages = self._usages
+        return {name: usages[prefix + name].size for name in record.subdirs if prefix + name in usages}
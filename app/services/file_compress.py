@@ -0,0 +1,287 @@
+import os
+import stat
+import struct
+import tarfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO
+
+from app.core import settings
+from app.schemas.fileinfo import ArchiveFormat
+from app.services.file_executor import OperationProgress
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency (zstd extra), tar.zst archives cannot be written without it
+    zstandard = None
+
+COMPRESS_CHUNK_SIZE = 1024 * 1024
+# Compressed members are kept in memory up to this size, larger ones are staged in a temporary file
+SPOOL_SIZE = 8 * 1024 * 1024
+
+# Formats already compressed, deflating them again costs CPU for no gain (.dat files are gzipped NBT)
+STORED_EXTENSIONS = frozenset({
+    ".jar", ".zip", ".mca", ".mcr", ".dat", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ogg", ".mp3",
+    ".gz", ".tgz", ".zst", ".xz", ".bz2", ".7z", ".rar", ".lz4",
+})
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_UTF8_FLAG = 0x800
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_ZIP64_END = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_LOCATOR = struct.Struct("<IIQI")
+_END = struct.Struct("<IHHHHIIH")
+
+COMPRESS_WORKERS = settings.COMPRESS_WORKERS or os.cpu_count() or 1
+compress_executor = ThreadPoolExecutor(max_workers=COMPRESS_WORKERS, thread_name_prefix="compress")
+
+
+def zstd_available() -> bool:
+    return zstandard is not None
+
+
+@dataclass
+class ArchiveMember:
+    path: str
+    arcname: str
+    size: int
+    mtime: float
+    mode: int
+
+
+@dataclass
+class _PreparedMember:
+    member: ArchiveMember
+    method: int
+    crc: int
+    size: int
+    compressed_size: int
+    data: BinaryIO
+
+
+def collect_members(paths: list[Path]) -> list[ArchiveMember]:
+    """
+    List the regular files of paths (directories included recursively), named relative to the parent of each path.
+    Symlinks are skipped so an archive cannot contain files from outside of the tree.
+    """
+    members = []
+    for path in paths:
+        parent = path.parent
+        if path.is_dir() and not path.is_symlink():
+            files = (os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [str(path)]
+        for file in files:
+            try:
+                file_stat = os.lstat(file)
+            except OSError:
+                continue
+            if stat.S_ISREG(file_stat.st_mode):
+                members.append(ArchiveMember(file, Path(os.path.relpath(file, parent)).as_posix(),
+                                             file_stat.st_size, file_stat.st_mtime, file_stat.st_mode))
+    return members
+
+
+def _prepare_member(member: ArchiveMember, level: int, spool_dir: Path, progress: OperationProgress
+                    ) -> _PreparedMember | None:
+    """
+    Deflate (or store) a member into a spooled buffer, ready to be appended to the archive.
+    Return None when the file was deleted since the members were listed.
+    """
+    stored = Path(member.arcname).suffix.lower() in STORED_EXTENSIONS
+    compressor = None if stored else zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    try:
+        f = open(member.path, "rb")
+    except FileNotFoundError:
+        return None
+    data = SpooledTemporaryFile(max_size=SPOOL_SIZE, dir=spool_dir)
+    crc = size = 0
+    try:
+        with f:
+            while chunk := f.read(COMPRESS_CHUNK_SIZE):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                data.write(chunk if compressor is None else compressor.compress(chunk))
+                progress.advance(size=len(chunk))
+        if compressor is not None:
+            data.write(compressor.flush())
+            if data.tell() >= size:
+                # Incompressible, store the member instead of keeping a deflate stream larger than the file
+                data.seek(0)
+                data.truncate()
+                with open(member.path, "rb") as f:
+                    crc = size = 0
+                    while chunk := f.read(COMPRESS_CHUNK_SIZE):
+                        crc = zlib.crc32(chunk, crc)
+                        size += len(chunk)
+                        data.write(chunk)
+                compressor = None
+        compressed_size = data.tell()
+        data.seek(0)
+    except BaseException:
+        data.close()
+        raise
+    return _PreparedMember(member, ZIP_STORED if compressor is None else ZIP_DEFLATED, crc, size, compressed_size,
+                           data)
+
+
+def _dos_date_time(mtime: float) -> tuple[int, int]:
+    year, month, day, hour, minute, second = time.localtime(mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+class _ZipWriter:
+    """Append members already compressed to a ZIP file, with ZIP64 records when sizes or offsets need them."""
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.offset = 0
+        self.central_directory: list[bytes] = []
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.offset += len(data)
+
+    def add(self, prepared: _PreparedMember) -> None:
+        member = prepared.member
+        name = member.arcname.encode()
+        date, time_ = _dos_date_time(member.mtime)
+        header_offset = self.offset
+
+        zip64 = prepared.size >= ZIP64_LIMIT or prepared.compressed_size >= ZIP64_LIMIT
+        version = 45 if zip64 else 20
+        local_extra = struct.pack("<HHQQ", 1, 16, prepared.size, prepared.compressed_size) if zip64 else b""
+        self._write(_LOCAL_HEADER.pack(
+            0x04034b50, version, ZIP_UTF8_FLAG, prepared.method, time_, date, prepared.crc,
+            ZIP64_LIMIT if zip64 else prepared.compressed_size, ZIP64_LIMIT if zip64 else prepared.size,
+            len(name), len(local_extra),
+        ) + name + local_extra)
+        while chunk := prepared.data.read(COMPRESS_CHUNK_SIZE):
+            self._write(chunk)
+
+        # The central directory only carries the ZIP64 fields that overflow, in this order
+        zip64_fields = [value for value in (prepared.size, prepared.compressed_size, header_offset)
+                        if value >= ZIP64_LIMIT]
+        central_extra = struct.pack(f"<HH{len(zip64_fields)}Q", 1, 8 * len(zip64_fields),
+                                    *zip64_fields) if zip64_fields else b""
+        version = 45 if zip64_fields else 20
+        self.central_directory.append(_CENTRAL_HEADER.pack(
+            0x02014b50, 3 << 8 | version, version, ZIP_UTF8_FLAG, prepared.method, time_, date, prepared.crc,
+            min(prepared.compressed_size, ZIP64_LIMIT), min(prepared.size, ZIP64_LIMIT), len(name),
+            len(central_extra), 0, 0, 0, (member.mode & 0xFFFF) << 16, min(header_offset, ZIP64_LIMIT),
+        ) + name + central_extra)
+
+    def close(self) -> None:
+        directory_offset = self.offset
+        for record in self.central_directory:
+            self._write(record)
+        directory_size = self.offset - directory_offset
+        count = len(self.central_directory)
+
+        if count >= 0xFFFF or directory_size >= ZIP64_LIMIT or directory_offset >= ZIP64_LIMIT:
+            zip64_end_offset = self.offset
+            self._write(_ZIP64_END.pack(0x06064b50, _ZIP64_END.size - 12, 3 << 8 | 45, 45, 0, 0, count, count,
+                                        directory_size, directory_offset))
+            self._write(_ZIP64_LOCATOR.pack(0x07064b50, 0, zip64_end_offset, 1))
+        self._write(_END.pack(0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                              min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0))
+
+
+def write_zip(members: list[ArchiveMember], destination: Path, progress: OperationProgress, *,
+              level: int | None = None) -> None:
+    """
+    Write a ZIP archive, the members being deflated in parallel on the compress executor and appended in order.
+    A bounded number of members is compressed ahead of the writer to bound the memory used by their buffers.
+    """
+    level = settings.ZIP_COMPRESSION_LEVEL if level is None else level
+    window = COMPRESS_WORKERS * 2
+    pending: deque[Future[_PreparedMember | None]] = deque()
+    members_iterator = iter(members)
+
+    try:
+        with open(destination, "wb") as f:
+            writer = _ZipWriter(f)
+            while True:
+                for member in members_iterator:
+                    pending.append(compress_executor.submit(_prepare_member, member, level, destination.parent,
+                                                            progress))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                prepared = pending.popleft().result()
+                if prepared is not None:
+                    with prepared.data:
+                        writer.add(prepared)
+                progress.advance(files=1)
+            writer.close()
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        for future in pending:
+            if not future.cancelled():
+                try:
+                    prepared = future.result()
+                except Exception:
+                    continue
+                if prepared is not None:
+                    prepared.data.close()
+        raise
+
+
+class _ProgressReader:
+    def __init__(self, file: BinaryIO, progress: OperationProgress):
+        self.file = file
+        self.progress = progress
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.file.read(size)
+        self.progress.advance(size=len(data))
+        return data
+
+
+def write_tar_zst(members: list[ArchiveMember], destination: Path, progress: OperationProgress, *,
+                  level: int | None = None) -> None:
+    """Write a tar archive compressed with zstd, which compresses in parallel on its own worker threads."""
+    if zstandard is None:
+        raise RuntimeError("tar.zst archives require the zstandard package")
+    level = settings.ARCHIVE_ZSTD_LEVEL if level is None else level
+    compressor = zstandard.ZstdCompressor(level=level, threads=settings.COMPRESS_WORKERS or -1)
+
+    with (open(destination, "wb") as f,
+          compressor.stream_writer(f, closefd=False) as zstd_writer,
+          tarfile.open(fileobj=zstd_writer, mode="w|", format=tarfile.PAX_FORMAT,
+                       copybufsize=COMPRESS_CHUNK_SIZE) as tar):
+        for member in members:
+            try:
+                src = open(member.path, "rb")
+            except FileNotFoundError:
+                continue
+            with src:
+                # Sizes from the open file, in case it changed since the members were listed
+                info = tar.gettarinfo(arcname=member.arcname, fileobj=src)
+                tar.addfile(info, _ProgressReader(src, progress))
+            progress.advance(files=1)
+
+
+def write_archive(members: list[ArchiveMember], destination: Path, archive_format: ArchiveFormat,
+                  progress: OperationProgress) -> None:
+    if archive_format == ArchiveFormat.TAR_ZST:
+        write_tar_zst(members, destination, progress)
+    else:
+        write_zip(members, destination, progress)
+
+
+async def shutdown_compress_executor() -> None:
+    compress_executor.shutdown(wait=False, cancel_futures=True)
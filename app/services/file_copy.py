@@ -0,0 +1,133 @@
+import errno
+import fcntl
+import os
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+
+from app.core import settings
+from app.services.file_executor import OperationProgress
+
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# Files below this size are copied in parallel, larger ones one after the other to keep the disk access sequential
+SMALL_FILE_SIZE = 1024 * 1024
+
+# Errors meaning the kernel or filesystem does not support the fast path, so the next method should be tried
+_UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.ENOSYS,
+                       errno.EBADF, errno.EPERM}
+
+copy_executor = ThreadPoolExecutor(max_workers=settings.COPY_WORKERS, thread_name_prefix="copy")
+
+
+def _copy_file_range(src: int, dst: int, size: int, progress: OperationProgress | None) -> None:
+    copied = 0
+    while copied < size:
+        count = os.copy_file_range(src, dst, min(COPY_CHUNK_SIZE, size - copied))
+        if count == 0:
+            break
+        copied += count
+        if progress is not None:
+            progress.advance(size=count)
+
+
+def _buffered_copy(src: int, dst: int, progress: OperationProgress | None) -> None:
+    buffer = bytearray(COPY_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while count := os.readv(src, [buffer]):
+        os.write(dst, view[:count])
+        if progress is not None:
+            progress.advance(size=count)
+
+
+def copy_file(source: Path | str, destination: Path | str, progress: OperationProgress | None = None) -> None:
+    """
+    Copy a file with its metadata (like shutil.copy2) using the cheapest method the filesystem supports:
+    a copy-on-write clone (FICLONE, btrfs / xfs), then an in-kernel copy (copy_file_range), then a buffered copy.
+    """
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        size = os.fstat(src.fileno()).st_size
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            if progress is not None:
+                progress.advance(size=size)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            try:
+                _copy_file_range(src.fileno(), dst.fileno(), size, progress)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                # Start over, copy_file_range may have copied part of the file. The bytes it copied (the offset it
+                # advanced the destination to) were counted, so they are taken back from the progress
+                if progress is not None:
+                    progress.advance(size=-os.lseek(dst.fileno(), 0, os.SEEK_CUR))
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+                _buffered_copy(src.fileno(), dst.fileno(), progress)
+    shutil.copystat(source, destination)
+    if progress is not None:
+        progress.advance(files=1)
+
+
+def copy_tree(source: Path, destination: Path, progress: OperationProgress | None = None) -> None:
+    """
+    Copy a directory with copy_file, small files in parallel on the copy executor. Symlinks are copied as symlinks,
+    so a link cannot make the copy read outside of the source tree.
+    """
+    directories: list[tuple[str, str]] = []
+    futures: list[Future] = []
+    try:
+        for root, dir_names, file_names in os.walk(source):
+            target_root = os.path.normpath(os.path.join(destination, os.path.relpath(root, source)))
+            os.mkdir(target_root)
+            directories.append((root, target_root))
+
+            for name in dir_names:
+                if os.path.islink(os.path.join(root, name)):
+                    # Not walked by os.walk, copied as a symlink below
+                    file_names.append(name)
+
+            for name in file_names:
+                src = os.path.join(root, name)
+                dst = os.path.join(target_root, name)
+                file_stat = os.lstat(src)
+                if stat.S_ISLNK(file_stat.st_mode):
+                    os.symlink(os.readlink(src), dst)
+                    if progress is not None:
+                        progress.advance(files=1)
+                elif not stat.S_ISREG(file_stat.st_mode):
+                    # Sockets, fifos and devices are not copied
+                    continue
+                elif file_stat.st_size < SMALL_FILE_SIZE:
+                    futures.append(copy_executor.submit(copy_file, src, dst, progress))
+                else:
+                    copy_file(src, dst, progress)
+
+            if progress is not None:
+                progress.check_cancelled()
+
+        for future in futures:
+            future.result()
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        # Let the copies already started finish before the caller cleans up the destination
+        for future in futures:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        raise
+
+    # Deepest directories first, creating their content changed the mtime of their parent
+    for src, dst in reversed(directories):
+        shutil.copystat(src, dst)
+
+
+async def shutdown_copy_executor() -> None:
+    copy_executor.shutdown(wait=False, cancel_futures=True)
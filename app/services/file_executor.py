@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from app.core import settings
+
+T = TypeVar("T")
+
+# Dedicated pool so filesystem work cannot starve the default executor used by the rest of the API
+file_executor = ThreadPoolExecutor(max_workers=settings.FILE_WORKERS, thread_name_prefix="files")
+# Background jobs (copy, delete, compress, extract) run for minutes: they get their own pool and limits, so they
+# cannot hold the slots of the quick operations of the requests (listing, reading, saving, downloading)
+job_executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="jobs")
+
+_miniverse_semaphores: dict[str, asyncio.Semaphore] = {}
+_miniverse_job_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+class OperationProgress:
+    """
+    Progress of a file operation, updated by the worker thread and read from the event loop. Cancelling it makes the
+    next advance (or check) raise OperationCancelled in the worker thread.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.files_done = 0
+        self.files_total: int | None = None
+        self.bytes_done = 0
+        self.bytes_total: int | None = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()  # Operations may advance from several threads
+
+    def set_totals(self, files: int | None, size: int | None) -> None:
+        self.files_total = files
+        self.bytes_total = size
+
+    def advance(self, files: int = 0, size: int = 0) -> None:
+        with self._lock:
+            self.files_done += files
+            self.bytes_done += size
+        self.check_cancelled()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise OperationCancelled()
+
+
+def get_miniverse_semaphore(miniverse_id: str) -> asyncio.Semaphore:
+    semaphore = _miniverse_semaphores.get(miniverse_id)
+    if semaphore is None:
+        semaphore = _miniverse_semaphores[miniverse_id] = asyncio.Semaphore(settings.FILE_OPERATIONS_PER_MINIVERSE)
+    return semaphore
+
+
+def get_miniverse_job_semaphore(miniverse_id: str) -> asyncio.Semaphore:
+    semaphore = _miniverse_job_semaphores.get(miniverse_id)
+    if semaphore is None:
+        semaphore = _miniverse_job_semaphores[miniverse_id] = asyncio.Semaphore(settings.JOBS_PER_MINIVERSE)
+    return semaphore
+
+
+async def run_file_operation(miniverse_id: str, func: Callable[..., T], /, *args, **kwargs) -> T:
+    """
+    Run blocking filesystem work on the file executor, off the event loop. A miniverse runs at most
+    FILE_OPERATIONS_PER_MINIVERSE operations at once, so one busy miniverse cannot take the whole pool.
+    """
+    async with get_miniverse_semaphore(miniverse_id):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(file_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_job_operation(miniverse_id: str, func: Callable[..., T], /, *args, **kwargs) -> T:
+    """
+    Run the blocking work of a background job on the job executor. A miniverse runs at most JOBS_PER_MINIVERSE jobs
+    at once, the others wait for a slot without blocking the file operations of the requests.
+    """
+    async with get_miniverse_job_semaphore(miniverse_id):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(job_executor, functools.partial(func, *args, **kwargs))
+
+
+async def shutdown_file_executor() -> None:
+    file_executor.shutdown(wait=False, cancel_futures=True)
+    job_executor.shutdown(wait=False, cancel_futures=True)
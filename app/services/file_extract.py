@@ -0,0 +1,269 @@
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+from app.core import settings
+from app.services.file_copy import copy_executor, SMALL_FILE_SIZE
+from app.services.file_executor import OperationProgress
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency (zstd extra), tar.zst archives cannot be extracted without it
+    zstandard = None
+
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+# Below this size an archive can expand as much as it wants, so small archives of text files are not rejected
+RATIO_CHECK_MIN_SIZE = 100 * 1024 * 1024
+
+# Archive suffix -> tarfile compression (None for ZIP archives)
+ARCHIVE_SUFFIXES: dict[str, str | None] = {
+    ".zip": None,
+    ".tar": "",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.bz2": "bz2",
+    ".tar.xz": "xz",
+    ".tar.zst": "zst",
+    ".tzst": "zst",
+}
+
+
+class ArchiveLimitExceeded(ValueError):
+    pass
+
+
+def archive_suffix(name: str) -> str | None:
+    """Return the archive suffix of a file name (".tar.gz" rather than ".gz"), None when it is not an archive."""
+    lower_name = name.lower()
+    suffixes = [suffix for suffix in ARCHIVE_SUFFIXES if lower_name.endswith(suffix)]
+    return max(suffixes, key=len) if suffixes else None
+
+
+def archive_supported(name: str) -> bool:
+    suffix = archive_suffix(name)
+    return suffix is not None and (ARCHIVE_SUFFIXES[suffix] != "zst" or zstandard is not None)
+
+
+class ExtractBudget:
+    """
+    Limits of an extraction, against archive bombs: number of entries, total uncompressed size and expansion ratio.
+    ZIP archives are checked up front from their central directory, tarballs while they are read.
+    """
+
+    def __init__(self):
+        self.entries = 0
+        self.size = 0
+
+    def add_entry(self, size: int) -> None:
+        self.entries += 1
+        self.size += size
+        if self.entries > settings.EXTRACT_MAX_ENTRIES:
+            raise ArchiveLimitExceeded(f"Archive has more than {settings.EXTRACT_MAX_ENTRIES} entries")
+        if self.size > settings.EXTRACT_MAX_SIZE:
+            raise ArchiveLimitExceeded(f"Archive expands to more than {settings.EXTRACT_MAX_SIZE / 1e9:.1f} GB")
+
+    @staticmethod
+    def check_ratio(size: int, compressed_size: int) -> None:
+        if size > RATIO_CHECK_MIN_SIZE and size > compressed_size * settings.EXTRACT_MAX_RATIO:
+            raise ArchiveLimitExceeded(f"Archive expands more than {settings.EXTRACT_MAX_RATIO} times its size")
+
+
+class _ParallelWriter:
+    """Run the writes of small members on the copy executor, with a bounded number of them in flight."""
+
+    def __init__(self):
+        self.pending: deque[Future] = deque()
+        self.window = settings.COPY_WORKERS * 2
+
+    def submit(self, func: Callable[..., object], *args) -> None:
+        self.pending.append(copy_executor.submit(func, *args))
+        while len(self.pending) >= self.window:
+            self.pending.popleft().result()
+
+    def drain(self) -> None:
+        while self.pending:
+            self.pending.popleft().result()
+
+    def __enter__(self) -> "_ParallelWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.drain()
+            return
+        for future in self.pending:
+            future.cancel()
+        # Let the writes already started finish before the caller cleans up the destination
+        for future in self.pending:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+
+def _safe_target(root: str, name: str) -> str:
+    if os.path.isabs(name):
+        raise ValueError(f"Archive entry {name} has an absolute path")
+    target = os.path.normpath(os.path.join(root, name))
+    if target != root and not target.startswith(root + os.sep):
+        raise ValueError(f"Archive entry {name} is outside of the destination")
+    return target
+
+
+def _make_parent(target: str, created: set[str]) -> None:
+    # Archives list many files per folder, remember the folders created instead of checking them for each file
+    parent = os.path.dirname(target)
+    if parent not in created:
+        os.makedirs(parent, exist_ok=True)
+        created.add(parent)
+
+
+def _copy_to_file(src: BinaryIO, target: str, on_chunk: Callable[[int], None]) -> None:
+    with open(target, "wb") as dst:
+        while chunk := src.read(EXTRACT_CHUNK_SIZE):
+            dst.write(chunk)
+            on_chunk(len(chunk))
+
+
+def _extract_zip_member(z: zipfile.ZipFile, member: zipfile.ZipInfo, target: str,
+                        progress: OperationProgress) -> None:
+    with z.open(member) as src:
+        _copy_to_file(src, target, lambda size: progress.advance(size=size))
+    progress.advance(files=1)
+
+
+def extract_zip(archive_path: Path, destination: Path, progress: OperationProgress) -> None:
+    """
+    Extract a ZIP archive into destination. The budget is enforced from the central directory before anything is
+    written (reads stop at the declared sizes), then small members are decompressed and written in parallel.
+    """
+    with zipfile.ZipFile(archive_path) as z:
+        members = z.infolist()
+        budget = ExtractBudget()
+        for member in members:
+            budget.add_entry(member.file_size)
+        budget.check_ratio(budget.size, os.path.getsize(archive_path))
+        if budget.size > shutil.disk_usage(destination).free:
+            raise ArchiveLimitExceeded("Not enough disk space to extract the archive")
+        progress.set_totals(sum(not member.is_dir() for member in members), budget.size)
+
+        root = os.path.realpath(destination)
+        created_dirs = {root}
+        with _ParallelWriter() as writer:
+            for member in members:
+                target = _safe_target(root, member.filename)
+                if member.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                _make_parent(target, created_dirs)
+                if member.file_size < SMALL_FILE_SIZE:
+                    # ZipFile reads of several members are serialized on its file, decompression is not
+                    writer.submit(_extract_zip_member, z, member, target, progress)
+                else:
+                    _extract_zip_member(z, member, target, progress)
+
+
+_DECOMPRESSORS: dict[str, Callable[[BinaryIO], BinaryIO]] = {
+    "gz": lambda file: gzip.GzipFile(fileobj=file),
+    "bz2": bz2.BZ2File,
+    "xz": lzma.LZMAFile,
+    "zst": lambda file: zstandard.ZstdDecompressor().stream_reader(file),
+}
+
+
+class _CountingReader:
+    def __init__(self, file: BinaryIO, progress: OperationProgress):
+        self.file = file
+        self.progress = progress
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.file.read(size)
+        self.consumed += len(data)
+        self.progress.advance(size=len(data))
+        return data
+
+
+def _write_bytes(target: str, data: bytes, progress: OperationProgress) -> None:
+    with open(target, "wb") as f:
+        f.write(data)
+    progress.advance(files=1)
+
+
+def extract_tar(archive_path: Path, destination: Path, compression: str, progress: OperationProgress) -> None:
+    """
+    Extract a tarball into destination, links being checked with the tarfile data filter. The budget is enforced
+    while reading: tar headers give the sizes, the expansion ratio is checked against the compressed bytes read.
+    Progress is counted in bytes of the archive, the number of members is not known before the end.
+    """
+    if compression == "zst" and zstandard is None:
+        raise ValueError("tar.zst archives require the zstandard package")
+    progress.set_totals(None, os.path.getsize(archive_path))
+    budget = ExtractBudget()
+    root = os.path.realpath(destination)
+    written = 0
+
+    def on_chunk(size: int) -> None:
+        nonlocal written
+        written += size
+        budget.check_ratio(written, reader.consumed)
+
+    with open(archive_path, "rb") as raw:
+        reader = _CountingReader(raw, progress)
+        # Decompressed outside of tarfile, its stream mode copies its buffer on every read of a large member
+        stream = _DECOMPRESSORS[compression](reader) if compression else reader
+
+        with tarfile.open(fileobj=stream, mode="r|") as tar, _ParallelWriter() as writer:
+            has_links = False
+            created_dirs = {root}
+            for member in tar:
+                budget.add_entry(member.size)
+                if member.issym() or member.islnk() or has_links:
+                    # Only needed once links exist: before that, a safe name cannot resolve outside of root
+                    try:
+                        member = tarfile.data_filter(member, root)
+                    except tarfile.SpecialFileError:
+                        # Sockets, fifos and devices are not extracted
+                        continue
+                elif not (member.isreg() or member.isdir()):
+                    continue
+                target = _safe_target(root, member.name)
+
+                if member.isdir():
+                    os.makedirs(target, exist_ok=True)
+                elif member.isreg():
+                    _make_parent(target, created_dirs)
+                    src = tar.extractfile(member)
+                    if member.size < SMALL_FILE_SIZE:
+                        data = src.read()
+                        on_chunk(len(data))
+                        writer.submit(_write_bytes, target, data, progress)
+                    else:
+                        _copy_to_file(src, target, on_chunk)
+                        progress.advance(files=1)
+                else:
+                    # Links may point to members still being written
+                    writer.drain()
+                    tar.extract(member, root, filter="fully_trusted")  # Already filtered
+                    has_links = True
+                    progress.advance(files=1)
+
+
+def extract_archive(archive_path: Path, destination: Path, progress: OperationProgress) -> None:
+    suffix = archive_suffix(archive_path.name)
+    if suffix is None:
+        raise ValueError("Unsupported archive format")
+    compression = ARCHIVE_SUFFIXES[suffix]
+    if compression is None:
+        extract_zip(archive_path, destination, progress)
+    else:
+        extract_tar(archive_path, destination, compression, progress)
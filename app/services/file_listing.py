@@ -0,0 +1,95 @@
+import base64
+import heapq
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from operator import itemgetter
+from pathlib import Path
+
+from litestar.exceptions import ValidationException
+
+from app.schemas.fileinfo import FileInfo, FileSort
+
+
+@dataclass
+class FileListingPage:
+    files: list[FileInfo]
+    next_cursor: str | None
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, TypeError):
+        raise ValidationException("Invalid cursor")
+
+
+def _entry_stat(entry: os.DirEntry) -> os.stat_result:
+    try:
+        return entry.stat()
+    except OSError:
+        # Broken symlink
+        return entry.stat(follow_symlinks=False)
+
+
+def _sort_key(entry: os.DirEntry, sort: FileSort, folder_sizes: dict[str, int]) -> tuple:
+    # Names are unique in a directory, so they make every key unique and usable as a cursor
+    if sort == FileSort.NAME:
+        return entry.name,
+    if sort == FileSort.SIZE:
+        size = folder_sizes.get(entry.name, -1) if entry.is_dir() else _entry_stat(entry).st_size
+        return size, entry.name
+    return _entry_stat(entry).st_mtime_ns, entry.name
+
+
+def list_directory(path: Path, root: Path, *, sort: FileSort = FileSort.NAME, descending: bool = False,
+                   limit: int | None = None, cursor: str | None = None,
+                   folder_sizes: dict[str, int] | None = None) -> FileListingPage:
+    """
+    List a directory with a single os.scandir pass. Entries are stat'ed at most once (DirEntry caches the result),
+    and when sorting by name only the entries of the returned page are. Pages are selected with a partial sort,
+    next_cursor is the key of the last entry of the page, or None on the last page.
+    Folders get their size from folder_sizes (by name) when known.
+    """
+    folder_sizes = folder_sizes or {}
+    with os.scandir(path) as iterator:
+        keyed = [(_sort_key(entry, sort, folder_sizes), entry) for entry in iterator]
+
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        try:
+            keyed = [item for item in keyed if (item[0] < after if descending else item[0] > after)]
+        except TypeError:
+            # Cursor of another sort
+            raise ValidationException("Invalid cursor")
+
+    if limit is None or len(keyed) <= limit:
+        page = sorted(keyed, key=itemgetter(0), reverse=descending)
+        next_cursor = None
+    else:
+        select = heapq.nlargest if descending else heapq.nsmallest
+        page = select(limit, keyed, key=itemgetter(0))
+        next_cursor = encode_cursor(page[-1][0])
+
+    relative_dir = path.relative_to(root).as_posix()
+    prefix = "" if relative_dir == "." else relative_dir + "/"
+    files = []
+    for _, entry in page:
+        stats = _entry_stat(entry)
+        is_dir = entry.is_dir()
+        files.append(FileInfo(
+            is_folder=is_dir,
+            path=prefix + entry.name,
+            name=entry.name,
+            # TODO: Created is not really creation time on UNIX system, we should probably change this in the future
+            created=datetime.fromtimestamp(stats.st_ctime, tz=timezone.utc),
+            updated=datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc),
+            size=stats.st_size if not is_dir else folder_sizes.get(entry.name),
+        ))
+    return FileListingPage(files=files, next_cursor=next_cursor)
+
@@ -1,26 +1,39 @@
+import asyncio
+import os
 import shutil
-import zipfile
-import zlib
+import stat
+import time
+import uuid
 from copy import copy
-from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 from urllib.parse import quote
 
-from litestar.exceptions import HTTPException
+from litestar.exceptions import HTTPException, ValidationException
 from litestar.response import File
 
-import zipstream
 from litestar import Response
-from litestar.concurrency import sync_to_thread
 
+from app import logger
 from app.core import root_store, settings
+from app.managers import job_manager
 from app.models import Miniverse
-from app.schemas.fileinfo import FileInfo
+from app.schemas import Job, JobType
+from app.schemas.fileinfo import FileSort, DiskUsage, ArchiveFormat
+from app.services.crc_cache import crc32_cache
+from app.services.dir_size_index import DirSizeIndex
+from app.services.file_compress import collect_members, write_archive, zstd_available
+from app.services.file_copy import copy_file, copy_tree
+from app.services.file_executor import run_file_operation, OperationProgress
+from app.services.file_extract import archive_suffix, archive_supported, extract_archive
+from app.services.file_listing import list_directory, FileListingPage
 from app.services.miniverse_service import get_miniverse_path
 
 download_tokens_store = root_store.with_namespace("download-tokens")
 
+size_indexes: dict[str, DirSizeIndex] = {}
+_size_index_refreshes: dict[tuple[str, str], asyncio.Task] = {}
+
 
 def safe_user_path(root: Path, user_relative_path: Path) -> Path:
     base = root.resolve()
@@ -48,106 +61,149 @@ def change_path_name_if_exists(path: Path) -> Path:
     return new_path
 
 
-def get_zip_roots(z: zipfile.ZipFile) -> set[str]:
-    roots: set[str] = set()
-
-    for info in z.infolist():
-        if not info.filename:
-            continue
-
-        parts = Path(info.filename).parts
-        if parts:
-            roots.add(parts[0])
-
-    return roots
-
-
-async def _extract_zip(
-        archive_path: Path,
-        extract_dir: Path,
-):
-    def extract():
-        with zipfile.ZipFile(archive_path) as z:
-            roots = get_zip_roots(z)
-
-            if len(roots) == 1:
-                container_name = next(iter(roots))
-            else:
-                container_name = archive_path.stem
-
-            container_dir = change_path_name_if_exists(
-                safe_user_path(extract_dir, Path(container_name))
-            )
+def count_files(paths: list[Path]) -> tuple[int, int]:
+    """Return the number of files and their total size, directories included recursively."""
+    files = size = 0
+    for path in paths:
+        if path.is_file():
+            files += 1
+            size += path.stat().st_size
+        elif path.is_dir():
+            for root, _, names in os.walk(path):
+                for name in names:
+                    try:
+                        size += os.lstat(os.path.join(root, name)).st_size
+                    except OSError:
+                        continue
+                    files += 1
+    return files, size
+
+
+# Filesystem work runs on the file executor (see run_file_operation): the public functions below are coroutines
+# resolving the miniverse data path, the blocking parts are the underscored functions taking that path.
+# Long operations (delete, copy, extract, compress) run as jobs on the job executor and return right away.
+
+def get_size_index(miniverse_id: str) -> DirSizeIndex:
+    """Size index of the data folder of a miniverse, loaded from disk on first use (blocking)."""
+    index = size_indexes.get(miniverse_id)
+    if index is None:
+        index = DirSizeIndex(get_miniverse_path(miniverse_id, "data"),
+                             get_miniverse_path(miniverse_id, "size-index.json"), settings.SIZE_INDEX_MAX_AGE)
+        index.load()
+        index = size_indexes.setdefault(miniverse_id, index)
+    return index
+
+
+def _schedule_size_index_refresh(miniverse_id: str, subtree: str) -> None:
+    index = size_indexes[miniverse_id]
+    key = (miniverse_id, subtree)
+    if key in _size_index_refreshes \
+            or time.time() - index.refreshed_at.get(subtree, 0) < settings.SIZE_INDEX_REFRESH_INTERVAL:
+        return
+
+    def done(task: asyncio.Task) -> None:
+        del _size_index_refreshes[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Could not refresh the size index of miniverse {miniverse_id}: {task.exception()}")
+
+    _size_index_refreshes[key] = asyncio.create_task(run_file_operation(miniverse_id, index.refresh, subtree))
+    _size_index_refreshes[key].add_done_callback(done)
+
+
+def _relative_posix(root: Path, path: Path) -> str:
+    relative_path = path.relative_to(root.resolve()).as_posix()
+    return "" if relative_path == "." else relative_path
+
+
+async def list_miniverse_files(miniverse: Miniverse, user_path: Path, *, sort: FileSort = FileSort.NAME,
+                               descending: bool = False, limit: int | None = None,
+                               cursor: str | None = None) -> FileListingPage | None:
+    miniverse_data_path = get_miniverse_path(miniverse.id) / 'data'
+    page, relative_path = await run_file_operation(miniverse.id, _list_files, miniverse.id, miniverse_data_path,
+                                                   user_path, sort=sort, descending=descending, limit=limit,
+                                                   cursor=cursor)
+    # Folder sizes come from the size index as is, it is refreshed in the background when it gets old
+    if page is not None:
+        _schedule_size_index_refresh(miniverse.id, relative_path)
+    return page
 
-            container_dir.mkdir(parents=True, exist_ok=True)
 
-            for member in z.infolist():
-                if member.is_dir():
-                    continue
+def _list_files(miniverse_id: str, miniverse_data_path: Path, user_path: Path,
+                **options) -> tuple[FileListingPage | None, str]:
+    safe_path = safe_user_path(miniverse_data_path, user_path)
 
-                member_path = Path(member.filename)
+    if not safe_path.exists():
+        raise ValueError(f"Specified does not exist: {user_path}")
 
-                if len(roots) == 1:
-                    member_path = Path(*member_path.parts[1:])
+    relative_path = _relative_posix(miniverse_data_path, safe_path)
+    if safe_path.is_file():
+        return None, relative_path
 
-                target = safe_user_path(container_dir, member_path)
-                target.parent.mkdir(parents=True, exist_ok=True)
+    folder_sizes = get_size_index(miniverse_id).get_children_sizes(relative_path)
+    page = list_directory(safe_path, miniverse_data_path.resolve(), folder_sizes=folder_sizes, **options)
+    return page, relative_path
 
-                with z.open(member) as src, target.open("wb") as dst:
-                    while chunk := src.read(1024 * 1024):
-                        dst.write(chunk)
 
-    await sync_to_thread(extract)
+async def get_miniverse_disk_usage(miniverse: Miniverse, user_path: Path) -> DiskUsage:
+    miniverse_data_path = get_miniverse_path(miniverse.id) / 'data'
+    return await run_file_operation(miniverse.id, _get_disk_usage, miniverse.id, miniverse_data_path, user_path)
 
 
-def list_miniverse_files(miniverse: Miniverse, user_path: Path) -> list[FileInfo] | None:
-    miniverse_data_path = get_miniverse_path(miniverse.id) / 'data'
+def _get_disk_usage(miniverse_id: str, miniverse_data_path: Path, user_path: Path) -> DiskUsage:
     safe_path = safe_user_path(miniverse_data_path, user_path)
-
-    if not safe_path.exists():
-        raise ValueError(f"Specified does not exist: {user_path}")
+    relative_path = _relative_posix(miniverse_data_path, safe_path)
 
     if safe_path.is_file():
-        return None
-
-    files = []
-    for path in Path(safe_path).glob("*"):
-        stats = path.stat()
-
-        # TODO: Created is not really creation time on UNIX system, we should probably change this in the future
-        created_at = datetime.fromtimestamp(stats.st_ctime, tz=timezone.utc)
-        modified_at = datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc)
-        is_dir = path.is_dir()
-        size = stats.st_size if not is_dir else None
-
-        file = FileInfo(
-            is_folder=is_dir,
-            path=str(path.relative_to(miniverse_data_path).as_posix()),
-            name=path.name,
-            created=created_at,
-            updated=modified_at,
-            size=size,
-        )
-        files.append(file)
+        return DiskUsage(path=relative_path, size=safe_path.stat().st_size, files=1)
+    if not safe_path.is_dir():
+        raise ValueError(f"Specified does not exist: {user_path}")
 
-    return files
+    index = get_size_index(miniverse_id)
+    index.refresh(relative_path)
+    usage = index.get_usage(relative_path)
+    return DiskUsage(path=relative_path, size=usage.size, files=usage.files)
 
 
-def delete_miniverse_files(miniverse: Miniverse, paths: list[Path]):
+async def delete_miniverse_files(miniverse: Miniverse, paths: list[Path]) -> Job:
     miniverse_data_path = get_miniverse_path(miniverse.id) / 'data'
+    return await job_manager.submit(miniverse.id, JobType.DELETE, _delete_files, miniverse_data_path, paths)
+
+
+def _delete_files(miniverse_data_path: Path, paths: list[Path], progress: OperationProgress):
     safe_paths = [safe_user_path(miniverse_data_path, path) for path in paths]
+    progress.set_totals(*count_files(safe_paths))
     for safe_path in safe_paths:
-        if safe_path.exists():
-            if safe_path.is_dir():
-                shutil.rmtree(safe_path)
-            else:
-                safe_path.unlink()
+        if safe_path.is_dir() and not safe_path.is_symlink():
+            # Bottom-up walk instead of rmtree to report progress and stop between files when cancelled
+            for root, dirs, files in os.walk(safe_path, topdown=False):
+                for name in files:
+                    file = os.path.join(root, name)
+                    size = os.lstat(file).st_size
+                    os.unlink(file)
+                    progress.advance(1, size)
+                for name in dirs:
+                    directory = os.path.join(root, name)
+                    if os.path.islink(directory):
+                        os.unlink(directory)
+                    else:
+                        os.rmdir(directory)
+            os.rmdir(safe_path)
+        elif safe_path.exists() or safe_path.is_symlink():
+            size = safe_path.lstat().st_size
+            safe_path.unlink()
+            progress.advance(1, size)
+
+
+async def copy_miniverse_files(miniverse: Miniverse, paths: list[Path], destination_path: Path) -> Job:
+    miniverse_data_path = get_miniverse_path(miniverse.id) / 'data'
+    return await job_manager.submit(miniverse.id, JobType.COPY, _copy_files, miniverse_data_path, paths,
+                                    destination_path)
 
 
-def copy_miniverse_files(miniverse: Miniverse, paths: list[Path], destination_path: Path):
-    miniverse_data_path = get_miniverse_path(miniverse.id) / 'data'
+def _copy_files(miniverse_data_path: Path, paths: list[Path], destination_path: Path, progress: OperationProgress):
     safe_paths = [safe_user_path(miniverse_data_path, path) for path in paths]
     safe_destination_path = safe_user_path(miniverse_data_path, destination_path)
+    progress.set_totals(*count_files(safe_paths))
 
     for src in safe_paths:
         if not src.exists():
@@ -155,10 +211,18 @@ def copy_miniverse_files(miniverse: Miniverse, paths: list[Path], destination_pa
 
         dst = change_path_name_if_exists(safe_destination_path / src.name)
 
-        if src.is_dir():
-            shutil.copytree(src, dst)
-        else:
-            shutil.copy2(src, dst)
+        try:
+            if src.is_dir():
+                copy_tree(src, dst, progress)
+            else:
+                copy_file(src, dst, progress)
+        except BaseException:
+            # Cancelled or failed, do not leave a partial copy behind
+            if dst.is_dir():
+                shutil.rmtree(dst, ignore_errors=True)
+            else:
+                dst.unlink(missing_ok=True)
+            raise
 
 
 def transform_safe_miniverse_files(miniverse: Miniverse, paths: list[Path]):
@@ -166,56 +230,33 @@ def transform_safe_miniverse_files(miniverse: Miniverse, paths: list[Path]):
     return [safe_user_path(miniverse_data_path, p) for p in paths]
 
 
-def compute_crc32(file_path):
-    crc = 0
-    # We read in 1MB chunks for a good balance between speed and RAM
-    chunk_size = 1024 * 1024
-
-    with open(file_path, 'rb') as f:
-        while True:
-            data = f.read(chunk_size)
-            if not data:
-                break
-            # zlib.crc32(data, starting_crc) allows incremental updates
-            crc = zlib.crc32(data, crc)
-
-    # Convert to unsigned 32-bit hex string (8 characters)
-    return format(crc & 0xFFFFFFFF, '08x')
-
-
-def add_to_manifest(manifest: list[Any], parent: Path, path: Path):
-    stat = path.stat()
+def manifest_line(path: Path, zip_path: str, size: int, crc: str) -> str:
     nginx_path = path.relative_to(settings.DATA_PATH)
-    zip_path = path.relative_to(parent)
-
-    crc = "-"
-    # TODO test if this lines below helps download speed / download retries
-    # if stat.st_size >= 100_000_000:
-    #     crc = compute_crc32(path)
-
-    manifest.append(f"{crc} {stat.st_size} /internal/{quote(nginx_path.as_posix(), safe='/')} {zip_path}")
+    return f"{crc} {size} /internal/{quote(nginx_path.as_posix(), safe='/')} {zip_path}"
 
 
-def download_files(paths: list[Path]) -> Response:
-    if len(paths) == 1:
-        if paths[0].is_file():
-            internal_path = f"/internal/{paths[0].relative_to(settings.DATA_PATH).as_posix()}"
-            response = Response(content="")
-            response.headers["X-Accel-Redirect"] = internal_path
-            response.headers["Content-Type"] = "application/octet-stream"
-            response.headers["Content-Disposition"] = f'attachment; filename="{paths[0].name}"'
-            return response
-
-    manifest = []
-    for path in paths:
-        parent = path.parent
-        if path.is_file():
-            add_to_manifest(manifest, parent, path)
-        elif path.is_dir():
-            for file in path.rglob("*"):
-                if file.is_file():
-                    add_to_manifest(manifest, parent, file)
+async def download_files(miniverse: Miniverse, paths: list[Path]) -> Response:
+    if len(paths) == 1 and await run_file_operation(miniverse.id, paths[0].is_file):
+        internal_path = f"/internal/{paths[0].relative_to(settings.DATA_PATH).as_posix()}"
+        response = Response(content="")
+        response.headers["X-Accel-Redirect"] = internal_path
+        response.headers["Content-Type"] = "application/octet-stream"
+        response.headers["Content-Disposition"] = f'attachment; filename="{paths[0].name}"'
+        return response
 
+    miniverse_data_path = get_miniverse_path(miniverse.id) / "data"
+    files = await run_file_operation(miniverse.id, _list_download_files, miniverse_data_path, paths)
+
+    # mod_zip needs the CRC32 of the files to answer Range requests: the cached ones are sent, the missing ones are
+    # computed in the background for the next downloads
+    stats = {name: file_stat for name, (_, _, file_stat) in files.items()}
+    crcs = await crc32_cache.get(miniverse.id, stats)
+    missing = {name: file_stat for name, file_stat in stats.items() if name not in crcs}
+    if missing:
+        crc32_cache.schedule(miniverse.id, miniverse_data_path, missing)
+
+    manifest = [manifest_line(path, zip_path, file_stat.st_size, crcs.get(name, "-"))
+                for name, (path, zip_path, file_stat) in files.items()]
     response = Response(content="\n".join(manifest) + "\n")
     response.headers["X-Archive-Files"] = "zip"  # Trigger mod_zip
     response.headers["Content-Type"] = "application/zip"
@@ -223,8 +264,32 @@ def download_files(paths: list[Path]) -> Response:
     return response
 
 
+def _list_download_files(miniverse_data_path: Path, paths: list[Path]) -> dict[str, tuple[Path, str, os.stat_result]]:
+    """Regular files of paths, by path relative to the data folder: (path, path in the zip, stat)."""
+    files = {}
+    for path in paths:
+        parent = path.parent
+        if path.is_dir() and not path.is_symlink():
+            candidates = (Path(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            candidates = [path]
+        for file in candidates:
+            try:
+                file_stat = file.lstat()
+            except OSError:
+                continue
+            if stat.S_ISREG(file_stat.st_mode):
+                files[_relative_posix(miniverse_data_path, file)] = (file, file.relative_to(parent).as_posix(),
+                                                                     file_stat)
+    return files
+
+
 async def upload_miniverse_file(miniverse: Miniverse, file_id: str, filename: str, destination: Path):
     base_path = get_miniverse_path(miniverse.id) / "data"
+    await run_file_operation(miniverse.id, _move_uploaded_file, base_path, file_id, filename, destination)
+
+
+def _move_uploaded_file(base_path: Path, file_id: str, filename: str, destination: Path):
     dest_path = safe_user_path(base_path, destination)
 
     if dest_path.is_file():
@@ -242,23 +307,54 @@ async def upload_miniverse_file(miniverse: Miniverse, file_id: str, filename: st
     tmp_path.rename(target)
 
 
-async def extract_miniverse_archive(miniverse: Miniverse, path: Path):
+async def extract_miniverse_archive(miniverse: Miniverse, path: Path) -> Job:
+    if not archive_supported(path.name):
+        raise ValidationException("Unsupported archive format")
     base_path = get_miniverse_path(miniverse.id) / "data"
+    return await job_manager.submit(miniverse.id, JobType.EXTRACT, _extract_archive, base_path, path)
+
+
+def _extract_archive(base_path: Path, path: Path, progress: OperationProgress) -> dict[str, Any]:
     file_to_extract = safe_user_path(base_path, path)
 
     if not file_to_extract.is_file():
         raise ValueError(f"File {file_to_extract} does not exist")
 
     extract_dir = file_to_extract.parent
-
-    if file_to_extract.suffix.lower() == ".zip":
-        await _extract_zip(file_to_extract, extract_dir)
-    else:
-        raise ValueError("Unsupported archive format")
+    stem = file_to_extract.name[:-len(archive_suffix(file_to_extract.name))]
+
+    # Extracted in a hidden folder first, so a failed or cancelled extraction leaves nothing behind
+    staging_dir = extract_dir / f".{stem}.{uuid.uuid4().hex[:8]}.extracting"
+    staging_dir.mkdir()
+    try:
+        extract_archive(file_to_extract, staging_dir, progress)
+
+        entries = list(staging_dir.iterdir())
+        if len(entries) == 1 and entries[0].is_dir() and not entries[0].is_symlink():
+            # The archive has a single root folder, use it as the container
+            destination = change_path_name_if_exists(extract_dir / entries[0].name)
+            entries[0].rename(destination)
+            staging_dir.rmdir()
+        else:
+            destination = change_path_name_if_exists(extract_dir / stem)
+            staging_dir.rename(destination)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    return {"path": _relative_posix(base_path, destination)}
+
+
+async def compress_miniverse_files(miniverse: Miniverse, paths: list[Path],
+                                   archive_format: ArchiveFormat = ArchiveFormat.ZIP) -> Job:
+    if archive_format == ArchiveFormat.TAR_ZST and not zstd_available():
+        raise ValidationException("tar.zst archives are not supported by this server")
+    miniverse_data_path = get_miniverse_path(miniverse.id) / "data"
+    return await job_manager.submit(miniverse.id, JobType.COMPRESS, _compress_files, miniverse_data_path, paths,
+                                    archive_format)
 
 
-async def compress_miniverse_files(miniverse: Miniverse, paths: list[Path]):
-    miniverse_data_path = get_miniverse_path(miniverse.id) / "data"
+def _compress_files(miniverse_data_path: Path, paths: list[Path], archive_format: ArchiveFormat,
+                    progress: OperationProgress) -> dict[str, Any]:
     files_to_compress = [safe_user_path(miniverse_data_path, p) for p in paths]
 
     parents = set()
@@ -268,27 +364,36 @@ async def compress_miniverse_files(miniverse: Miniverse, paths: list[Path]):
     if len(parents) != 1:
         raise ValueError("Files to compress must have same parent")
 
-    destination_name = files_to_compress[0].name + ".zip" if len(files_to_compress) == 1 else "Archive.zip"
+    destination_name = (files_to_compress[0].name if len(files_to_compress) == 1 else "Archive") + \
+        archive_format.extension
     destination = change_path_name_if_exists(files_to_compress[0].parent / destination_name)
-
-    z = zipstream.ZipFile(compression=zipstream.ZIP_DEFLATED)
-
-    for path in paths:
-        parent = path.parent
-        if path.is_file():
-            z.write(path, arcname=path.relative_to(parent))
-        elif path.is_dir():
-            for file in path.rglob("*"):
-                if file.is_file():
-                    z.write(file, arcname=file.relative_to(parent))
-
-    with open(destination, 'wb') as f:
-        for data in z:
-            f.write(data)
+    members = collect_members(files_to_compress)
+    bytes_total = sum(member.size for member in members)
+    progress.set_totals(len(members), bytes_total)
+
+    start = time.perf_counter()
+    try:
+        write_archive(members, destination, archive_format, progress)
+    except BaseException:
+        # Cancelled or failed, do not leave a partial archive behind
+        destination.unlink(missing_ok=True)
+        raise
+    elapsed = time.perf_counter() - start
+
+    archive_size = destination.stat().st_size
+    throughput = bytes_total / 1e6 / elapsed if elapsed > 0 else 0.0
+    logger.info(f"Compressed {len(members)} files ({bytes_total / 1e6:.1f} MB) into {destination.name} "
+                f"({archive_size / 1e6:.1f} MB) in {elapsed:.2f}s, {throughput:.1f} MB/s")
+    return {"path": _relative_posix(miniverse_data_path, destination), "size": archive_size,
+            "throughput": round(throughput, 1)}
+
+
+async def rename_file(miniverse: Miniverse, path: Path, new_name: str):
+    base_path = get_miniverse_path(miniverse.id) / "data"
+    await run_file_operation(miniverse.id, _rename_file, base_path, path, new_name)
 
 
-def rename_file(miniverse: Miniverse, path: Path, new_name: str):
-    base_path = get_miniverse_path(miniverse.id) / "data"
+def _rename_file(base_path: Path, path: Path, new_name: str):
     file_to_rename = safe_user_path(base_path, path)
 
     new_path = path.with_name(new_name)
@@ -299,8 +404,12 @@ def rename_file(miniverse: Miniverse, path: Path, new_name: str):
     file_to_rename.rename(new_path_safe)
 
 
-def get_file_content(miniverse: Miniverse, path: Path) -> File:
+async def get_file_content(miniverse: Miniverse, path: Path) -> File:
     base_path = get_miniverse_path(miniverse.id) / "data"
+    return await run_file_operation(miniverse.id, _get_file_content, base_path, path)
+
+
+def _get_file_content(base_path: Path, path: Path) -> File:
     file_to_read = safe_user_path(base_path, path)
 
     if file_to_read.is_dir():
@@ -314,14 +423,26 @@ def get_file_content(miniverse: Miniverse, path: Path) -> File:
     raise ValueError(f"File {file_to_read} does not exist")
 
 
-def set_file_content(miniverse: Miniverse, path: Path, content: str):
+async def set_file_content(miniverse: Miniverse, path: Path, content: str):
     base_path = get_miniverse_path(miniverse.id) / "data"
+    await run_file_operation(miniverse.id, _set_file_content, base_path, path, content)
+
+
+def _set_file_content(base_path: Path, path: Path, content: str):
     file_to_write = safe_user_path(base_path, path)
 
     if file_to_write.is_dir():
         raise ValueError(f"Directory {file_to_write} already exists")
 
-    if file_to_write.is_file():
-        file_to_write.write_text(content, encoding="utf-8")
-    else:
-        raise ValueError(f"File {file_to_write} does not exist")
\ No newline at end of file
+    if not file_to_write.is_file():
+        raise ValueError(f"File {file_to_write} does not exist")
+
+    # Written aside then moved instead of truncated: the file can be hardlinked to a blob shared with other miniverses
+    tmp_path = file_to_write.with_name(f".{file_to_write.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_text(content, encoding="utf-8")
+        shutil.copymode(file_to_write, tmp_path)
+        os.replace(tmp_path, file_to_write)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
\ No newline at end of file
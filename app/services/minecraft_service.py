@@ -1,13 +1,17 @@
+import asyncio
 import json
 import re
+import time
+from array import array
+from collections.abc import Sequence
+from itertools import repeat
 from dataclasses import dataclass
-from datetime import timedelta
+from functools import lru_cache, cached_property
 
-import httpx
-
-from app.core import root_store
+from app import logger
+from app.core import root_store, settings
 from app.schemas.minecraft import MinecraftVersion
-from app.services.mods_service import MODRINTH_BASE_URL
+from app.services.modrinth_client import modrinth_client
 
 OLD_RELEASE_FORMAT = re.compile(r"^(?P<major>\d{1,2})\.(?P<minor>\d{1,2})(?:\.(?P<patch>\d{1,2}))?$")
 NEW_RELEASE_FORMAT = re.compile(r"^(?P<major>\d{2})\.(?P<minor>\d+)(?:\.(?P<patch>\d+))?$")
@@ -21,7 +25,8 @@ NEW_PRERELEASE_FORMAT = re.compile(r"^(?P<major>\d{2})\.(?P<minor>\d+)(?:\.(?P<p
 
 minecraft_cache_store = root_store.with_namespace("minecraft")
 
-@dataclass
+
+@dataclass(frozen=True)
 class ParsedMinecraftVersion:
     value: str
     type: str
@@ -32,25 +37,92 @@ class ParsedMinecraftVersion:
     type_version: int = 0
     suffix: str | None = None
 
-# TODO: Add cache on this function
-async def get_minecraft_versions() -> list[MinecraftVersion]:
-    cached = await minecraft_cache_store.get("versions")
-    if cached:
-        return [MinecraftVersion.from_dict(v) for v in json.loads(cached)]
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MODRINTH_BASE_URL}/tag/game_version")
-        response.raise_for_status()
-        data = response.json()
+class MinecraftVersionRegistry:
+    """
+    Minecraft versions from Modrinth, loaded once (from Redis when another worker already fetched them) and
+    refreshed in the background. Versions are indexed so lookups and publish date comparisons are O(1).
+    """
+
+    def __init__(self, refresh_interval: int):
+        self.refresh_interval = refresh_interval
+        self.synced_at = 0.0
+        self.versions: list[MinecraftVersion] = []  # Newest first, as returned by Modrinth
+        self._positions: dict[str, int] = {}  # version -> position in versions
+        self._ranks: dict[str, int] = {}  # version -> rank by publish date, versions published together share it
+        self._task: asyncio.Task | None = None
+
+    def _build(self, data: list[dict]) -> None:
+        versions = [MinecraftVersion.from_dict(v) for v in data]
+        dates = sorted({v.date for v in versions})
+        date_ranks = {date: rank for rank, date in enumerate(dates)}
+
+        self.versions = versions
+        self._positions = {v.version: i for i, v in enumerate(versions)}
+        self._ranks = {v.version: date_ranks[v.date] for v in versions}
+
+    async def load(self) -> None:
+        cached = await minecraft_cache_store.get("versions")
+        if cached is not None:
+            cached = json.loads(cached)
+            if time.time() - cached["synced_at"] < self.refresh_interval:
+                self._build(cached["data"])
+                self.synced_at = cached["synced_at"]
+                return
+
+        data = await modrinth_client.get_json("/tag/game_version")
+        self._build(data)
+        self.synced_at = time.time()
+        await minecraft_cache_store.set("versions", json.dumps({"synced_at": self.synced_at, "data": data}),
+                                        expires_in=2 * self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.synced_at + self.refresh_interval - time.time(), 60))
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Could not refresh Minecraft versions: {e}")
+
+    async def get_versions(self) -> list[MinecraftVersion]:
+        if not self.versions:
+            await self.load()
+        return self.versions
+
+    def get_position(self, version: str) -> int | None:
+        return self._positions.get(version)
 
-        await minecraft_cache_store.set("minecraft_versions", json.dumps(data), expires_in=timedelta(minutes=10).seconds)
+    def get_rank(self, version: str) -> int | None:
+        return self._ranks.get(version)
 
-        versions = [
-            MinecraftVersion.from_dict(v) for v in data
-        ]
-        return versions
+    def get_newest_ranks(self, game_versions_lists: Sequence[Sequence[str]]) -> array:
+        """Rank of the most recent known version of each list, -1 when none of its versions is known."""
+        get_rank = self._ranks.get
+        return array("i", (max(map(get_rank, game_versions, repeat(-1, len(game_versions))), default=-1)
+                           for game_versions in game_versions_lists))
 
 
+minecraft_versions = MinecraftVersionRegistry(settings.MINECRAFT_VERSIONS_REFRESH_INTERVAL)
+
+
+async def get_minecraft_versions() -> list[MinecraftVersion]:
+    return await minecraft_versions.get_versions()
+
+
+@lru_cache(maxsize=4096)
 def parse_version(version: str) -> ParsedMinecraftVersion | None:
     if (match := re.match(OLD_RELEASE_FORMAT, version)) is not None:
         return ParsedMinecraftVersion(
@@ -146,17 +218,43 @@ def compare_prerelease_identifiers(id1: str, id2: str) -> int:
     return int(id1_value) - int(id2_value)
 
 
-async def compare_by_publish_date(v1: str, v2: str) -> int | None:
+def compare_by_publish_date(v1: str, v2: str) -> int | None:
     # Fallback comparison by publish date if one of versions is a snapshot because we can't compare them directly
-    all_versions = await get_minecraft_versions()
-    v1_date = next((v.date for v in all_versions if v.version == v1), None)
-    v2_date = next((v.date for v in all_versions if v.version == v2), None)
-    if v1_date is None or v2_date is None:
+    v1_rank = minecraft_versions.get_rank(v1)
+    v2_rank = minecraft_versions.get_rank(v2)
+    if v1_rank is None or v2_rank is None:
         return None
-    return (v1_date > v2_date) - (v1_date < v2_date)
+    return (v1_rank > v2_rank) - (v1_rank < v2_rank)
+
+
+class GameVersionsSupport:
+    """
+    Game versions supported by each version of a mod, ranked once so many game versions can be tested against the
+    whole list: "supports this game version or newer" becomes an integer comparison per version.
+    """
+
+    def __init__(self, game_versions_lists: Sequence[Sequence[str]]):
+        self.game_versions_lists = game_versions_lists
+
+    @cached_property
+    def newest_ranks(self) -> array:
+        return minecraft_versions.get_newest_ranks(self.game_versions_lists)
+
+    def supporting(self, game_version: str, *, or_newer: bool = False) -> list[int]:
+        """Return the indexes of the versions supporting the game version (or a version published after it)."""
+        target_rank = minecraft_versions.get_rank(game_version) if or_newer else None
+        if target_rank is None:
+            # Exact matches, or unknown version (registry not loaded yet or version newer than it)
+            return [i for i, game_versions in enumerate(self.game_versions_lists) if game_version in game_versions]
+        return [i for i, rank in enumerate(self.newest_ranks) if rank >= target_rank]
+
+
+def supporting_versions(game_versions_lists: Sequence[Sequence[str]], game_version: str, *,
+                        or_newer: bool = False) -> list[int]:
+    return GameVersionsSupport(game_versions_lists).supporting(game_version, or_newer=or_newer)
 
 
-async def compare_versions(v1: str, v2: str) -> int | None:
+def compare_versions(v1: str, v2: str) -> int | None:
     """
     Compare two version strings.
     Support many versions formats:
@@ -174,12 +272,12 @@ async def compare_versions(v1: str, v2: str) -> int | None:
     v1_parsed = parse_version(v1)
     v2_parsed = parse_version(v2)
 
-    if v2_parsed is None or v2_parsed is None:
+    if v1_parsed is None or v2_parsed is None:
         return None
 
     if v1_parsed.type == "snapshot" and v1_parsed.system == "old" \
             or v2_parsed.type == "snapshot" and v2_parsed.system == "old":
-        return await compare_by_publish_date(v1, v2)
+        return compare_by_publish_date(v1, v2)
 
     basic_comparison = compare_main_versions(
         v1_parsed.major, v1_parsed.minor, v1_parsed.patch,
@@ -195,4 +293,4 @@ async def compare_versions(v1: str, v2: str) -> int | None:
     if v1_parsed.type == "prerelease" and v2_parsed.type == "prerelease":
         return compare_prerelease_identifiers(v1_parsed.suffix, v2_parsed.suffix)
 
-    return await compare_by_publish_date(v1, v2)
+    return compare_by_publish_date(v1, v2)
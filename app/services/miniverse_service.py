@@ -1,10 +1,12 @@
+import asyncio
+import re
 import shutil
 from importlib import resources
 from pathlib import Path
 
 import toml
 from docker.errors import NotFound as DockerNotFound
-from litestar.exceptions import ValidationException
+from litestar.exceptions import HTTPException, ValidationException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,17 +14,32 @@ from app import logger
 from app.core import settings
 from app.core.utils import generate_random_string
 from app.enums import MiniverseType, Role
+from app.enums.player_action import PlayerAction
 from app.events.miniverse_event import publish_miniverse_deleted_event, publish_miniverse_created_event, \
     publish_miniverse_updated_event, user_list_from_user_role_list
 from app.managers import miniverses_manager
-from app.models import Miniverse, MiniverseUserRole, User
-from app.schemas import ModUpdateStatus
+from app.models import Miniverse, MiniverseUserRole, User, Mod
+from app.schemas import ModUpdateStatus, PlayerModerationOperation, PlayerModerationResult, ModrinthProject, \
+    ModrinthProjectVersion
 from app.schemas.miniverse import MiniverseCreate
 from app.services.docker_service import dockerctl, VolumeConfig
 from app.services.minecraft_service import parse_version, compare_versions
-from app.services.mods_service import automatic_mod_install, list_possible_mod_updates, update_mod
+from app.services.mods_service import automatic_mod_install, list_possible_mod_updates, release_mod_blob, \
+    select_mod_version, install_mod_versions, get_versions_details, get_projects_details, download_mod_file, \
+    apply_mod_version
 from app.services.proxy_service import update_proxy_config
+from app.services.connexion.WebSocketMiniverseService import WebSocketMiniverseService
 from app.services.connexion.server_status_store import server_status_store
+from app.services.connexion.player_index import player_index
+
+# Server jars downloaded by the itzg/minecraft-server image, {version} being the Minecraft version
+SERVER_JAR_PATTERNS = {
+    MiniverseType.VANILLA: r"minecraft_server\.{version}\.jar",
+    MiniverseType.PAPER: r"paper-{version}-\d+\.jar",
+    MiniverseType.FABRIC: r"fabric-server-mc\.{version}-loader\.[\d.]+-launcher\.[\d.]+\.jar",
+    MiniverseType.FORGE: r"forge-{version}-\d[\w.]*(-shim|-universal|-installer)?\.jar",
+    MiniverseType.NEO_FORGE: r"(neo)?forge-{version}-\d[\w.]*(-shim|-universal|-installer)?\.jar",
+}
 
 
 def get_miniverse_path(miniverse_id: str, *subpaths: str, from_host: bool = False) -> Path:
@@ -91,9 +108,14 @@ async def delete_miniverse(miniverse: Miniverse, db: AsyncSession):
     if volume_base_path.exists() and volume_base_path.is_dir():
         shutil.rmtree(volume_base_path)
 
+    mod_file_hashes = {mod.file_hash for mod in miniverse.mods}
     await db.delete(miniverse)
     await db.commit()
+    for file_hash in mod_file_hashes:
+        await release_mod_blob(file_hash, db)
     await server_status_store.delete_miniverse_cache(miniverse_id)
+    # The control service may not run on this worker, clear the players it would have cleared when stopping
+    await player_index.clear_miniverse(miniverse_id)
     await update_proxy_config(db)
 
     publish_miniverse_deleted_event(miniverse_id, user_list_from_user_role_list(miniverse.users_roles))
@@ -144,7 +166,7 @@ async def init_data_path(miniverse: Miniverse, db: AsyncSession):
     game_version = miniverse.mc_version
     parsed_game_version = parse_version(game_version)
 
-    prioritize_release = parsed_game_version == 'release'
+    prioritize_release = parsed_game_version is not None and parsed_game_version.type == 'release'
 
     icon_path = volume_data_path / "server-icon.png"
     if not icon_path.exists():
@@ -156,9 +178,13 @@ async def init_data_path(miniverse: Miniverse, db: AsyncSession):
         config_path.mkdir(parents=True, exist_ok=True)
 
         if miniverse.type == MiniverseType.FABRIC:
-            await automatic_mod_install("P7dR8mSH", miniverse, db, prioritize_release=prioritize_release)  # Fabric API
-            await automatic_mod_install("8dI2tmqs", miniverse, db, prioritize_release=prioritize_release,
-                                        retry_with_latest=True)  # FabricProxy-Lite
+            versions = await asyncio.gather(
+                select_mod_version("P7dR8mSH", miniverse.type, game_version,
+                                   prioritize_release=prioritize_release),  # Fabric API
+                select_mod_version("8dI2tmqs", miniverse.type, game_version, prioritize_release=prioritize_release,
+                                   retry_with_latest=True),  # FabricProxy-Lite
+            )
+            await install_mod_versions(list(versions), miniverse, db, prioritize_release=prioritize_release)
             fabric_proxy_lite_config = config_path / "FabricProxy-Lite.toml"
             with open(str(fabric_proxy_lite_config), "w") as f:
                 toml.dump({"secret": settings.PROXY_SECRET}, f)
@@ -289,15 +315,15 @@ async def update_miniverse_game_version(miniverse: Miniverse, new_mc_version: st
     if miniverse.mc_version == new_mc_version:
         raise ValidationException("The new Minecraft version is the same as the current one.")
 
-    version_comparison = await compare_versions(miniverse.mc_version, new_mc_version)
+    version_comparison = compare_versions(miniverse.mc_version, new_mc_version)
     if version_comparison is None:
         raise ValidationException("The specified Minecraft versions is invalid.")
     if version_comparison > 0:
         # TODO: Support this
         raise ValidationException("Downgrading Minecraft versions is not supported.")
 
+    mod_updates: dict[str, str] = {}  # mod id -> new version id
     if miniverse.type in [MiniverseType.FORGE, MiniverseType.NEO_FORGE, MiniverseType.FABRIC]:
-        # TODO: Update mods to compatible versions
         possible_mod_updates = await list_possible_mod_updates(miniverse, new_mc_version)
 
         safe_update = True
@@ -311,25 +337,132 @@ async def update_miniverse_game_version(miniverse: Miniverse, new_mc_version: st
             raise ValidationException(
                 "One or more mods cannot be updated to be compatible with the specified Minecraft version.")
 
-        for mod in miniverse.mods:
-            update_info = possible_mod_updates[mod.id]
-            if update_info.update_status == ModUpdateStatus.UPDATE_AVAILABLE:
-                new_version_id = update_info.new_versions_ids[0]
-                await update_mod(mod, new_version_id, db)
+        mod_updates = {
+            mod_id: update_info.new_versions_ids[0] for mod_id, update_info in possible_mod_updates.items()
+            if update_info.update_status == ModUpdateStatus.UPDATE_AVAILABLE
+        }
 
-    await stop_miniverse(miniverse, db)
+    # Download the new jars while the server is still running, so the downtime is only stop / swap / start
+    miniverse_id = miniverse.id
+    staging_path = get_miniverse_path(miniverse_id, "staging")
+    shutil.rmtree(staging_path, ignore_errors=True)
+    try:
+        staged = await _stage_mod_updates(miniverse, mod_updates, staging_path / "mods")
 
-    miniverse.mc_version = new_mc_version
-    await db.commit()
-    await db.refresh(miniverse)
+        was_started = miniverse.started
+        try:
+            await stop_miniverse(miniverse, db)
+        except Exception as e:
+            logger.error(f"Could not stop miniverse {miniverse_id} for its upgrade to Minecraft {new_mc_version}: {e}")
+            await db.rollback()
+            await db.refresh(miniverse)
+            await _restart_after_failed_upgrade(miniverse, db, was_started, e)
+            raise
+
+        old_mc_version = miniverse.mc_version
+        backups = []
+        try:
+            backups = _swap_staged_mods(miniverse_id, staged, staging_path / "previous")
+            old_file_hashes = []
+            for mod, project, version, file_name in staged:
+                old_file_hashes.append(mod.file_hash)
+                apply_mod_version(mod, project, version, file_name)
+            miniverse.mc_version = new_mc_version
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            _rollback_swapped_mods(miniverse_id, backups)
+            logger.error(f"Upgrade of miniverse {miniverse_id} to Minecraft {new_mc_version} failed, rolled back")
+            await db.refresh(miniverse)
+            await _restart_after_failed_upgrade(miniverse, db, was_started, e)
+            raise
+        await db.refresh(miniverse)
+    finally:
+        shutil.rmtree(staging_path, ignore_errors=True)
 
-    # TODO: Delete previous jar files
+    for file_hash in old_file_hashes:
+        await release_mod_blob(file_hash, db)
+    _delete_server_jars(miniverse, old_mc_version)
 
-    await start_miniverse(miniverse, db)
+    if was_started:
+        await start_miniverse(miniverse, db)
+    publish_miniverse_updated_event(miniverse.id)
 
     return miniverse
 
 
+async def _restart_after_failed_upgrade(miniverse: Miniverse, db: AsyncSession, was_started: bool,
+                                        error: Exception) -> None:
+    """Start the miniverse again on its previous version, or report clearly that it is left stopped."""
+    if not was_started:
+        return
+    try:
+        await start_miniverse(miniverse, db)
+    except Exception as e:
+        logger.error(f"Could not restart miniverse {miniverse.id} after its failed upgrade: {e}")
+        raise HTTPException(status_code=500, detail=f"Upgrade failed ({error}) and the miniverse could not be "
+                                                    f"restarted, it is left stopped") from e
+
+
+async def _stage_mod_updates(miniverse: Miniverse, mod_updates: dict[str, str],
+                             staging_path: Path) -> list[tuple[Mod, ModrinthProject, ModrinthProjectVersion, str]]:
+    if not mod_updates:
+        return []
+    mods = {mod.id: mod for mod in miniverse.mods}
+    versions = {v.id: v for v in await get_versions_details(list(set(mod_updates.values())))}
+    projects = {p.id: p for p in await get_projects_details(list({v.project_id for v in versions.values()}))}
+
+    updates = [(mods[mod_id], projects[versions[version_id].project_id], versions[version_id])
+               for mod_id, version_id in mod_updates.items()]
+    file_names = await asyncio.gather(*(download_mod_file(project, version, miniverse, staging_path)
+                                        for _, project, version in updates))
+    return [(mod, project, version, file_name) for (mod, project, version), file_name in zip(updates, file_names)]
+
+
+def _swap_staged_mods(miniverse_id: str, staged: list[tuple[Mod, ModrinthProject, ModrinthProjectVersion, str]],
+                      backup_path: Path) -> list[tuple[Path | None, Path]]:
+    """Move the old jars to the backup folder and the staged ones to the mods folder, rolling back on failure."""
+    mods_path = get_miniverse_path(miniverse_id, "data", "mods")
+    staging_path = get_miniverse_path(miniverse_id, "staging", "mods")
+    backup_path.mkdir(parents=True, exist_ok=True)
+
+    swapped: list[tuple[Path | None, Path]] = []  # (backup of the old jar, new jar)
+    try:
+        for mod, _, _, file_name in staged:
+            old_jar = mods_path / mod.file_name
+            backup = None
+            if old_jar.is_file():
+                backup = backup_path / mod.file_name
+                old_jar.rename(backup)
+            swapped.append((backup, mods_path / file_name))
+            (staging_path / file_name).rename(mods_path / file_name)
+    except Exception:
+        _rollback_swapped_mods(miniverse_id, swapped)
+        raise
+    return swapped
+
+
+def _rollback_swapped_mods(miniverse_id: str, swapped: list[tuple[Path | None, Path]]) -> None:
+    mods_path = get_miniverse_path(miniverse_id, "data", "mods")
+    for backup, new_jar in reversed(swapped):
+        new_jar.unlink(missing_ok=True)
+        if backup is not None and backup.exists():
+            backup.rename(mods_path / backup.name)
+
+
+def _delete_server_jars(miniverse: Miniverse, mc_version: str) -> None:
+    # Only the jars the itzg/minecraft-server image downloads for the previous version, other jars of the data folder
+    # (proxies, launchers, backups) belong to the user. Recent NeoForge jars are not named after the game version.
+    pattern = SERVER_JAR_PATTERNS.get(miniverse.type)
+    if pattern is None:
+        return
+    jar_regex = re.compile(pattern.format(version=re.escape(mc_version)))
+    for jar in get_miniverse_path(miniverse.id, "data").glob("*.jar"):
+        if jar_regex.fullmatch(jar.name):
+            logger.info(f"Removing previous server jar {jar.name} of miniverse {miniverse.id}")
+            jar.unlink(missing_ok=True)
+
+
 async def miniverse_set_player_operator(miniverse: Miniverse, player_id: str, operator: bool) -> bool:
     return await miniverses_manager.get_miniverse_controller(miniverse.id).set_player_operator(player_id, operator)
 
@@ -344,3 +477,53 @@ async def miniverse_ban_player(miniverse: Miniverse, player_id: str, reason: str
 
 async def miniverse_unban_player(miniverse: Miniverse, player_id: str) -> bool:
     return await miniverses_manager.get_miniverse_controller(miniverse.id).unban_player(player_id)
+
+
+async def _apply_player_action(controller: WebSocketMiniverseService, operation: PlayerModerationOperation) -> bool:
+    match operation.action:
+        case PlayerAction.BAN:
+            return await controller.ban_player(operation.player_id,
+                                               operation.reason or "You have been banned by an administrator")
+        case PlayerAction.UNBAN:
+            return await controller.unban_player(operation.player_id)
+        case PlayerAction.KICK:
+            return await controller.kick_player(operation.player_id,
+                                                operation.reason or "You have been kicked by an administrator")
+        case PlayerAction.OP:
+            return await controller.set_player_operator(operation.player_id, True)
+        case PlayerAction.DEOP:
+            return await controller.set_player_operator(operation.player_id, False)
+
+
+async def miniverses_bulk_moderation(operations: list[PlayerModerationOperation], user: User,
+                                     db: AsyncSession) -> list[PlayerModerationResult]:
+    # Miniverses are loaded once for the whole batch, then operations are sent concurrently to their controllers
+    miniverses = {m.id: m for m in await get_miniverses(db)}
+    semaphore = asyncio.Semaphore(settings.BULK_MODERATION_CONCURRENCY)
+
+    async def apply(operation: PlayerModerationOperation) -> PlayerModerationResult:
+        result = PlayerModerationResult(miniverse_id=operation.miniverse_id, player_id=operation.player_id,
+                                        action=operation.action, success=False)
+
+        miniverse = miniverses.get(operation.miniverse_id)
+        controller = miniverses_manager.get_miniverse_controller(operation.miniverse_id)
+        if miniverse is None or user.get_miniverse_role(miniverse.id) < Role.USER:
+            result.error = "Miniverse not found"
+        elif user.get_miniverse_role(miniverse.id) < Role.MODERATOR:
+            result.error = "You are not authorized to moderate players in this miniverse"
+        elif not miniverse.started:
+            result.error = "Miniverse is not started"
+        elif not isinstance(controller, WebSocketMiniverseService):
+            result.error = "Miniverse does not support player moderation"
+        else:
+            async with semaphore:
+                try:
+                    result.success = await _apply_player_action(controller, operation)
+                    if not result.success:
+                        result.error = "Management server did not accept the operation"
+                except Exception as e:
+                    logger.error(f"Bulk moderation {operation.action.value} failed on {miniverse.id}: {e}")
+                    result.error = str(e)
+        return result
+
+    return list(await asyncio.gather(*(apply(operation) for operation in operations)))
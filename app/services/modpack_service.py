@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Callable
+from urllib.parse import urlparse
+
+from litestar.exceptions import ValidationException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import logger
+from app.enums import MiniverseType
+from app.enums.event_type import EventType
+from app.events.miniverse_event import publish_miniverse_control_event, publish_miniverse_updated_event
+from app.models import Miniverse, Mod
+from app.schemas.mods import ModrinthPackIndex, ModrinthPackFile
+from app.services.blob_store import blob_store
+from app.services.mods_service import download_file, get_versions_from_hashes, get_projects_details, \
+    delete_mod_file, release_mod_blob, apply_mod_version
+
+# Hosts allowed by the .mrpack format specification
+ALLOWED_DOWNLOAD_HOSTS = {"cdn.modrinth.com", "github.com", "raw.githubusercontent.com", "gitlab.com"}
+OVERRIDES_DIRS = ("overrides/", "server-overrides/")  # server-overrides are applied last and take precedence
+LOADER_DEPENDENCIES = {
+    MiniverseType.FABRIC: "fabric-loader",
+    MiniverseType.FORGE: "forge",
+    MiniverseType.NEO_FORGE: "neoforge",
+}
+
+
+def publish_modpack_progress(miniverse_id: str, stage: str, done: int = 0, total: int = 0, **data) -> None:
+    publish_miniverse_control_event(miniverse_id, EventType.MODPACK_PROGRESS,
+                                    {"stage": stage, "done": done, "total": total, **data})
+
+
+def _safe_path(root: Path, relative_path: str) -> Path:
+    target = (root / relative_path).resolve()
+    if not target.is_relative_to(root.resolve()):
+        raise ValidationException(f"Invalid file path in modpack: {relative_path}")
+    return target
+
+
+def read_modpack_index(pack: zipfile.ZipFile) -> ModrinthPackIndex:
+    try:
+        index = ModrinthPackIndex.from_dict(json.loads(pack.read("modrinth.index.json")))
+    except (KeyError, ValueError) as e:
+        raise ValidationException(f"Invalid modpack: {e}")
+
+    if index.format_version != 1 or index.game != "minecraft":
+        raise ValidationException(f"Unsupported modpack format {index.format_version} for game {index.game}")
+    for file in index.files:
+        file_path = PurePosixPath(file.path)
+        if file_path.is_absolute() or ".." in file_path.parts:
+            raise ValidationException(f"Invalid file path in modpack: {file.path}")
+        if not file.downloads or any(urlparse(url).hostname not in ALLOWED_DOWNLOAD_HOSTS for url in file.downloads):
+            raise ValidationException(f"File {file.path} of the modpack has no allowed download URL")
+    return index
+
+
+def check_modpack_compatibility(index: ModrinthPackIndex, miniverse: Miniverse) -> None:
+    game_version = index.dependencies.get("minecraft")
+    if game_version is not None and game_version != miniverse.mc_version:
+        raise ValidationException(f"Modpack {index.name} requires Minecraft {game_version}, "
+                                  f"the miniverse runs {miniverse.mc_version}")
+    loader = LOADER_DEPENDENCIES.get(miniverse.type)
+    pack_loaders = set(index.dependencies) - {"minecraft"}
+    if pack_loaders and loader not in pack_loaders:
+        raise ValidationException(f"Modpack {index.name} requires {', '.join(pack_loaders)}, "
+                                  f"the miniverse runs {miniverse.type.value}")
+
+
+def is_mod_jar(path: str) -> bool:
+    file_path = PurePosixPath(path)
+    return file_path.parent == PurePosixPath("mods") and file_path.suffix == ".jar"
+
+
+def get_server_files(index: ModrinthPackIndex) -> list[ModrinthPackFile]:
+    return [f for f in index.files if (f.env or {}).get("server") != "unsupported"]
+
+
+async def _fetch_pack_file(file: ModrinthPackFile, path: Path) -> None:
+    for i, url in enumerate(file.downloads):
+        try:
+            return await download_file(url, path, file.hashes.sha512)
+        except Exception as e:
+            if i == len(file.downloads) - 1:
+                raise
+            logger.warning(f"Could not download {file.path} from {url}, trying the next mirror: {e}")
+
+
+async def download_modpack_files(files: list[ModrinthPackFile], data_path: Path,
+                                 on_progress: Callable[[int, int], None] | None = None) -> None:
+    """
+    Download the files of a modpack concurrently (bounded by the shared download semaphore) through the blob store,
+    verifying their hashes, and install them at their path in data_path. Mod jars are linked to their blob, the other
+    files (configs, resource packs...) are copied since they can be edited.
+    """
+    targets = [_safe_path(data_path, f.path) for f in files]
+    done = 0
+
+    async def install(file: ModrinthPackFile, target: Path) -> None:
+        nonlocal done
+        sha512 = file.hashes.sha512
+        await blob_store.ensure(sha512, lambda path: _fetch_pack_file(file, path))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if is_mod_jar(file.path):
+            await blob_store.link(sha512, target)
+        else:
+            await blob_store.copy(sha512, target)
+        done += 1
+        if on_progress is not None:
+            on_progress(done, len(files))
+
+    await asyncio.gather(*(install(f, t) for f, t in zip(files, targets)))
+
+
+def extract_modpack_overrides(pack: zipfile.ZipFile, data_path: Path) -> int:
+    count = 0
+    for overrides_dir in OVERRIDES_DIRS:
+        for member in pack.infolist():
+            if member.is_dir() or not member.filename.startswith(overrides_dir):
+                continue
+            target = _safe_path(data_path, member.filename[len(overrides_dir):])
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Written aside then moved, the target can be a file linked to a blob by the file list
+            tmp_path = target.with_name(target.name + ".tmp")
+            with pack.open(member) as src, tmp_path.open("wb") as dst:
+                while chunk := src.read(1024 * 1024):
+                    dst.write(chunk)
+            os.replace(tmp_path, target)
+            count += 1
+    return count
+
+
+async def create_modpack_mods(files: list[ModrinthPackFile], miniverse: Miniverse, db: AsyncSession) -> list[Mod]:
+    """Create (or update) the Mod rows of the modpack jars known by Modrinth, with two batch requests."""
+    mod_files = {f.hashes.sha512: f for f in files if is_mod_jar(f.path)}
+    versions = await get_versions_from_hashes(list(mod_files))
+    projects = {p.id: p for p in await get_projects_details(list({v.project_id for v in versions.values()}))}
+
+    installed = {mod.project_id: mod for mod in miniverse.mods if mod.project_id is not None}
+    old_file_hashes = []
+    mods = []
+    for file_hash, version in versions.items():
+        project = projects.get(version.project_id)
+        if project is None:
+            continue
+        file_name = PurePosixPath(mod_files[file_hash].path).name
+        mod = installed.get(version.project_id)
+        if mod is None:
+            mod = Mod(miniverse_id=miniverse.id)
+            db.add(mod)
+        else:
+            if mod.file_hash != file_hash:
+                # The pack file replaced the jar, even when it kept its name
+                old_file_hashes.append(mod.file_hash)
+            if mod.file_name != file_name:
+                await delete_mod_file(mod)
+        apply_mod_version(mod, project, version, file_name, file_hash)
+        mods.append(mod)
+
+    await db.commit()
+    for file_hash in old_file_hashes:
+        await release_mod_blob(file_hash, db)
+    for mod in mods:
+        await db.refresh(mod)
+    return mods
+
+
+async def install_modpack(miniverse: Miniverse, pack_path: Path, db: AsyncSession) -> list[Mod]:
+    """
+    Install a Modrinth modpack (.mrpack) located in the miniverse data folder: download the listed files
+    concurrently, apply the overrides and create the Mod rows. Progress is published on the miniverse channel.
+    """
+    from app.services.files_service import safe_user_path
+    from app.services.miniverse_service import get_miniverse_path
+    data_path = get_miniverse_path(miniverse.id, "data")
+    try:
+        pack_file = safe_user_path(data_path, pack_path)
+    except ValueError as e:
+        raise ValidationException(str(e))
+    if not pack_file.is_file() or not zipfile.is_zipfile(pack_file):
+        raise ValidationException(f"File {pack_path} is not a valid modpack")
+
+    with zipfile.ZipFile(pack_file) as pack:
+        index = read_modpack_index(pack)
+    check_modpack_compatibility(index, miniverse)
+    files = get_server_files(index)
+
+    start = time.perf_counter()
+    last_progress = 0.0
+
+    def on_progress(done: int, total: int) -> None:
+        nonlocal last_progress
+        # Throttle events, a pack can contain hundreds of files
+        if done == total or time.perf_counter() - last_progress > 0.25:
+            last_progress = time.perf_counter()
+            publish_modpack_progress(miniverse.id, "downloading", done, total)
+
+    try:
+        publish_modpack_progress(miniverse.id, "downloading", 0, len(files))
+        await download_modpack_files(files, data_path, on_progress)
+
+        publish_modpack_progress(miniverse.id, "overrides")
+
+        def apply_overrides() -> int:
+            with zipfile.ZipFile(pack_file) as pack:
+                return extract_modpack_overrides(pack, data_path)
+
+        overrides_count = await asyncio.to_thread(apply_overrides)
+
+        publish_modpack_progress(miniverse.id, "mods")
+        mods = await create_modpack_mods(files, miniverse, db)
+    except Exception as e:
+        publish_modpack_progress(miniverse.id, "failed", error=str(e))
+        raise
+
+    publish_modpack_progress(miniverse.id, "done", len(files), len(files))
+    publish_miniverse_updated_event(miniverse.id)
+    logger.info(f"Modpack {index.name} ({index.version_id}) installed on miniverse {miniverse.id}: {len(files)} files, "
+                f"{overrides_count} overrides, {len(mods)} mods in {time.perf_counter() - start:.1f}s")
+    return mods
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Coroutine
+from urllib.parse import urlencode
+
+import httpx
+from litestar.stores.base import Store
+
+from app import logger
+from app.core import settings, root_store
+
+MODRINTH_BASE_URL = "https://api.modrinth.com/v2"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ModrinthClient:
+    """
+    Shared HTTP client for Modrinth, created once and closed on application shutdown.
+    Connections are pooled (HTTP/2 and keep-alive), failed requests are retried with exponential backoff and
+    requests are paced using the X-Ratelimit-* headers returned by Modrinth.
+
+    Metadata responses can be cached in Redis (shared by all workers) with stale-while-revalidate: a stale entry is
+    returned immediately while a conditional request (If-None-Match) refreshes it in the background.
+    Concurrent identical requests are coalesced so only one of them reaches Modrinth.
+    """
+
+    def __init__(self, base_url: str, *, max_connections: int, max_retries: int, timeout: float,
+                 cache_store: Store | None = None):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.cache_store = cache_store
+        self._client: httpx.AsyncClient | None = None
+        self._inflight: dict[str, asyncio.Task] = {}
+
+        self._rate_limit: int | None = None
+        self._rate_limit_remaining: int | None = None
+        self._rate_limit_reset_at: float = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections,
+                                    keepalive_expiry=60),
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                headers={"User-Agent": f"Louis-PAGNIER/Miniverse-Backend ({settings.DOMAIN_NAME})"},
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _update_rate_limit(self, response: httpx.Response) -> None:
+        headers = response.headers
+        try:
+            if "X-Ratelimit-Limit" in headers:
+                self._rate_limit = int(headers["X-Ratelimit-Limit"])
+            if "X-Ratelimit-Remaining" in headers:
+                self._rate_limit_remaining = int(headers["X-Ratelimit-Remaining"])
+            if "X-Ratelimit-Reset" in headers:
+                # Modrinth sends the number of seconds until the rate limit window resets
+                self._rate_limit_reset_at = time.monotonic() + int(headers["X-Ratelimit-Reset"])
+        except ValueError:
+            logger.warning(f"Invalid rate limit headers from Modrinth: {dict(headers)}")
+
+    async def _wait_rate_limit(self) -> None:
+        if self._rate_limit_remaining is None:
+            return
+        reset_in = self._rate_limit_reset_at - time.monotonic()
+        if reset_in <= 0:
+            self._rate_limit_remaining = None
+            return
+        if self._rate_limit_remaining <= 0:
+            logger.warning(f"Modrinth rate limit reached, waiting {reset_in:.1f}s")
+            await asyncio.sleep(reset_in)
+            self._rate_limit_remaining = None
+        elif self._rate_limit_remaining < self.max_connections:
+            # Few requests left in this window: spread them until the reset instead of bursting
+            await asyncio.sleep(reset_in / self._rate_limit_remaining)
+        if self._rate_limit_remaining is not None:
+            self._rate_limit_remaining -= 1
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After") or response.headers.get("X-Ratelimit-Reset")
+            if retry_after is not None and retry_after.isdigit():
+                return float(retry_after)
+        return min(2 ** attempt, 30) * 0.5 + random.uniform(0, 0.5)
+
+    async def request(self, method: str, url: str, *, params: dict[str, Any] | None = None,
+                      **kwargs) -> httpx.Response:
+        if params is not None:
+            params = {k: v for k, v in params.items() if v is not None}
+        request_headers = httpx.Headers(kwargs.get("headers"))
+        conditional = "If-None-Match" in request_headers or "If-Modified-Since" in request_headers
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_rate_limit()
+            try:
+                response = await self.client.request(method, url, params=params, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"Modrinth request {method} {url} failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self._update_rate_limit(response)
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                logger.warning(f"Modrinth request {method} {url} returned {response.status_code}, "
+                               f"retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code == httpx.codes.NOT_MODIFIED and conditional:
+                # Answer to the validators sent by the caller, which keeps its cached copy
+                return response
+            response.raise_for_status()
+            return response
+
+        raise RuntimeError("unreachable")
+
+    async def get_json(self, url: str, params: dict[str, Any] | None = None) -> Any:
+        response = await self.request("GET", url, params=params)
+        return response.json()
+
+    def _singleflight(self, key: str, factory: Callable[[], Coroutine[Any, Any, Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_inflight_done(key, t))
+        return task
+
+    def _on_inflight_done(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Modrinth request {key} failed: {task.exception()!r}")
+
+    async def _fetch_and_cache(self, key: str, url: str, params: dict[str, Any] | None, stale_ttl: int,
+                               previous: dict | None) -> dict:
+        headers = {}
+        if previous is not None and previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+
+        response = await self.request("GET", url, params=params, headers=headers)
+        if response.status_code == 304 and previous is not None:
+            entry = previous | {"fetched_at": time.time()}
+        else:
+            entry = {"etag": response.headers.get("ETag"), "fetched_at": time.time(), "data": response.json()}
+
+        await self.cache_store.set(key, json.dumps(entry), expires_in=stale_ttl)
+        return entry
+
+    async def get_json_cached(self, url: str, params: dict[str, Any] | None = None, *,
+                              ttl: int = settings.MODRINTH_CACHE_TTL,
+                              stale_ttl: int = settings.MODRINTH_CACHE_STALE_TTL) -> Any:
+        if self.cache_store is None:
+            return await self.get_json(url, params)
+
+        if params is not None:
+            params = {k: v for k, v in params.items() if v is not None}
+        key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+        raw_entry = await self.cache_store.get(key)
+        if raw_entry is not None:
+            entry = json.loads(raw_entry)
+            if time.time() - entry["fetched_at"] >= ttl:
+                # Serve the stale entry, the revalidation runs in the background
+                self._singleflight(key, lambda: self._fetch_and_cache(key, url, params, stale_ttl, entry))
+            return entry["data"]
+
+        task = self._singleflight(key, lambda: self._fetch_and_cache(key, url, params, stale_ttl, None))
+        entry = await asyncio.shield(task)
+        return entry["data"]
+
+
+modrinth_client = ModrinthClient(
+    MODRINTH_BASE_URL,
+    max_connections=settings.MODRINTH_MAX_CONNECTIONS,
+    max_retries=settings.MODRINTH_MAX_RETRIES,
+    timeout=settings.MODRINTH_TIMEOUT,
+    cache_store=root_store.with_namespace("modrinth"),
+)
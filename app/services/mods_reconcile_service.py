@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import logger
+from app.core import root_store, settings
+from app.events.miniverse_event import publish_miniverse_updated_event
+from app.models import Miniverse, Mod
+from app.schemas.mods import ModsReconcileResult
+from app.services.mods_service import get_versions_from_hashes, get_projects_details, apply_mod_version, \
+    release_mod_blob
+
+mod_hashes_store = root_store.with_namespace("mod-hashes")
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=settings.HASH_WORKERS)
+    return _hash_pool
+
+
+async def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+def sha512_file(path: str) -> str:
+    digest = hashlib.sha512()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def hash_mods_folder(miniverse_id: str, mods_path: Path) -> dict[str, str]:
+    """
+    Return the sha512 of each jar of the mods folder. Hashes are cached by (inode, size, mtime) so only new or
+    modified jars are hashed again, in a process pool.
+    """
+    raw_cache = await mod_hashes_store.get(miniverse_id)
+    cache: dict[str, dict] = json.loads(raw_cache) if raw_cache is not None else {}
+
+    entries = {}
+    if mods_path.is_dir():
+        for entry in os.scandir(mods_path):
+            if entry.is_file() and entry.name.endswith(".jar"):
+                stat = entry.stat()
+                entries[entry.name] = {"inode": stat.st_ino, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    to_hash = [name for name, key in entries.items()
+               if name not in cache or {k: cache[name][k] for k in key} != key]
+    loop = asyncio.get_running_loop()
+    hashes = await asyncio.gather(*(loop.run_in_executor(get_hash_pool(), sha512_file, str(mods_path / name))
+                                    for name in to_hash))
+
+    new_cache = {name: cache[name] for name in entries if name not in to_hash}
+    for name, sha512 in zip(to_hash, hashes):
+        new_cache[name] = entries[name] | {"sha512": sha512}
+    await mod_hashes_store.set(miniverse_id, json.dumps(new_cache))
+
+    if to_hash:
+        logger.info(f"Hashed {len(to_hash)} of {len(entries)} jars in the mods folder of miniverse {miniverse_id}")
+    return {name: entry["sha512"] for name, entry in new_cache.items()}
+
+
+async def reconcile_mods(miniverse: Miniverse, db: AsyncSession) -> ModsReconcileResult:
+    """
+    Update the Mod rows of a miniverse to match the jars of its mods folder: jars added by hand get a row
+    (identified on Modrinth from their hash when possible), rows of deleted jars are removed and rows of replaced
+    jars are updated.
+    """
+    from app.services.miniverse_service import get_miniverse_path
+    files = await hash_mods_folder(miniverse.id, get_miniverse_path(miniverse.id, "data", "mods"))
+
+    mods_by_file = {mod.file_name: mod for mod in miniverse.mods}
+    removed = [mod for name, mod in mods_by_file.items() if name not in files]
+    changed = {name: sha512 for name, sha512 in files.items()
+               if name not in mods_by_file or mods_by_file[name].file_hash != sha512}
+
+    versions = await get_versions_from_hashes(list(set(changed.values())))
+    projects = {p.id: p for p in await get_projects_details(list({v.project_id for v in versions.values()}))}
+
+    result = ModsReconcileResult(created=[], updated=[], removed=[mod.file_name for mod in removed])
+    old_file_hashes = [mod.file_hash for mod in removed]
+    for mod in removed:
+        await db.delete(mod)
+
+    for file_name, sha512 in changed.items():
+        mod = mods_by_file.get(file_name)
+        if mod is None:
+            mod = Mod(miniverse_id=miniverse.id)
+            db.add(mod)
+            result.created.append(file_name)
+        else:
+            old_file_hashes.append(mod.file_hash)
+            result.updated.append(file_name)
+
+        version = versions.get(sha512)
+        project = projects.get(version.project_id) if version is not None else None
+        if project is not None:
+            apply_mod_version(mod, project, version, file_name, sha512)
+        else:
+            # Jar unknown to Modrinth
+            mod.slug = mod.title = Path(file_name).stem
+            mod.version_id = mod.project_id = mod.icon_url = mod.version_name = mod.version_number = None
+            mod.file_name = file_name
+            mod.file_hash = sha512
+
+    await db.commit()
+    for file_hash in old_file_hashes:
+        await release_mod_blob(file_hash, db)
+
+    if result.created or result.updated or result.removed:
+        logger.info(f"Reconciled mods of miniverse {miniverse.id}: {len(result.created)} created, "
+                    f"{len(result.updated)} updated, {len(result.removed)} removed")
+        publish_miniverse_updated_event(miniverse.id)
+    return result
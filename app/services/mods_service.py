@@ -1,19 +1,26 @@
+import asyncio
+import hashlib
+import os
 from pathlib import Path
 
 import httpx
+
 from litestar.exceptions import ValidationException
-from sqlalchemy import select
+from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import logger
+from app.core import settings
+from app.db.session import session_config
 from app.enums import MiniverseType
 from app.events.miniverse_event import publish_miniverse_updated_event
 from app.models import Miniverse, Mod
 from app.schemas import ModVersionType
 from app.schemas.mods import ModrinthSearchFacets, ModrinthSearchResults, ModrinthProjectVersion, ModrinthProject, \
-    ModUpdateStatus, ModUpdateInfo
-
-MODRINTH_BASE_URL = "https://api.modrinth.com/v2"
+    ModUpdateStatus, ModUpdateInfo, ModrinthProjectFile, ModDependencyType
+from app.services.blob_store import blob_store
+from app.services.minecraft_service import GameVersionsSupport, supporting_versions
+from app.services.modrinth_client import modrinth_client
 
 
 def dumps_values(values: list) -> str:
@@ -37,63 +44,155 @@ def build_facets(facets: ModrinthSearchFacets) -> str:
     if facets.versions is not None:
         res.append(build_or_facets("versions", facets.versions))
     if facets.client_side is not None:
-        res.append(build_or_facets("client_side", facets.client_side.value))
+        res.append(build_or_facets("client_side", [side.value for side in facets.client_side]))
     if facets.server_side is not None:
-        res.append(build_or_facets("server_side", facets.server_side.value))
+        res.append(build_or_facets("server_side", [side.value for side in facets.server_side]))
     return dumps_values(res)
 
 
 async def search_modrinth_projects(query: str, facets: ModrinthSearchFacets, limit: int, offset: int = 0) -> ModrinthSearchResults:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MODRINTH_BASE_URL}/search",
-                                    params={
-                                        "query": query,
-                                        "facets": build_facets(facets),
-                                        "limit": limit,
-                                        "offset": offset
-                                    })
-        response.raise_for_status()
-        data = response.json()
-        return ModrinthSearchResults.from_dict(data)
+    data = await modrinth_client.get_json_cached("/search",
+                                                 params={
+                                                     "query": query,
+                                                     "facets": build_facets(facets),
+                                                     "limit": limit,
+                                                     "offset": offset
+                                                 })
+    return ModrinthSearchResults.from_dict(data)
 
 
 async def list_project_versions(project_id: str, loader: MiniverseType = None, mc_version: str = None) -> list[ModrinthProjectVersion]:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MODRINTH_BASE_URL}/project/{project_id}/version",
-                                    params={
-                                        "loaders": dumps_values([loader.value.lower()]) if loader else None,
-                                        "game_versions": dumps_values([mc_version]) if mc_version else None
-                                    })
-        response.raise_for_status()
-        data = response.json()
-        return [ModrinthProjectVersion.from_dict(v) for v in data]
+    data = await modrinth_client.get_json_cached(f"/project/{project_id}/version",
+                                                 params={
+                                                     "loaders": dumps_values([loader.value.lower()]) if loader else None,
+                                                     "game_versions": dumps_values([mc_version]) if mc_version else None
+                                                 })
+    return [ModrinthProjectVersion.from_dict(v) for v in data]
 
 
 async def get_project_details(project_id: str) -> ModrinthProject:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MODRINTH_BASE_URL}/project/{project_id}")
-        response.raise_for_status()
-        data = response.json()
-        return ModrinthProject.from_dict(data)
+    data = await modrinth_client.get_json_cached(f"/project/{project_id}", ttl=3600)
+    return ModrinthProject.from_dict(data)
+
+
+async def get_projects_details(project_ids: list[str]) -> list[ModrinthProject]:
+    projects = []
+    for i in range(0, len(project_ids), 100):
+        data = await modrinth_client.get_json("/projects", params={"ids": dumps_values(project_ids[i:i + 100])})
+        projects.extend(ModrinthProject.from_dict(p) for p in data)
+    return projects
 
 
 async def get_version_details(version_id: str) -> ModrinthProjectVersion:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MODRINTH_BASE_URL}/version/{version_id}")
+    # A published version rarely changes, it can be kept longer than lists
+    data = await modrinth_client.get_json_cached(f"/version/{version_id}", ttl=24 * 3600)
+    return ModrinthProjectVersion.from_dict(data)
+
+
+async def get_versions_details(version_ids: list[str]) -> list[ModrinthProjectVersion]:
+    versions = []
+    # Keep the query string reasonably short
+    for i in range(0, len(version_ids), 100):
+        data = await modrinth_client.get_json("/versions", params={"ids": dumps_values(version_ids[i:i + 100])})
+        versions.extend(ModrinthProjectVersion.from_dict(v) for v in data)
+    return versions
+
+
+async def get_versions_from_hashes(hashes: list[str]) -> dict[str, ModrinthProjectVersion]:
+    """Return the version each file hash (sha512) belongs to, files unknown to Modrinth are missing."""
+    if not hashes:
+        return {}
+    response = await modrinth_client.request("POST", "/version_files", json={"hashes": hashes, "algorithm": "sha512"})
+    return {h: ModrinthProjectVersion.from_dict(v) for h, v in response.json().items()}
+
+
+async def get_latest_versions_from_hashes(hashes: list[str], loader: MiniverseType,
+                                          game_version: str) -> dict[str, ModrinthProjectVersion]:
+    """Return the latest version compatible with the loader and game version for each file hash (sha512)."""
+    if not hashes:
+        return {}
+    response = await modrinth_client.request("POST", "/version_files/update", json={
+        "hashes": hashes,
+        "algorithm": "sha512",
+        "loaders": [loader.value.lower()],
+        "game_versions": [game_version],
+    })
+    return {h: ModrinthProjectVersion.from_dict(v) for h, v in response.json().items()}
+
+
+def get_primary_file(version: ModrinthProjectVersion) -> ModrinthProjectFile:
+    primary_file = next((f for f in version.files if f.primary), None)
+    if not primary_file:
+        raise ValidationException("No primary file found for this mod version")
+    return primary_file
+
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+download_semaphore = asyncio.Semaphore(settings.MOD_DOWNLOAD_CONCURRENCY)
+
+
+async def _stream_to_part_file(url: str, part_path: Path) -> "hashlib._Hash":
+    digest = hashlib.sha512()
+    offset = 0
+    if part_path.exists():
+        # Resume an interrupted download: hash what we already have and only request the remaining bytes
+        with part_path.open("rb") as f:
+            while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                offset += len(chunk)
+
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    async with modrinth_client.client.stream("GET", url, headers=headers) as response:
+        if offset and response.status_code == 416:
+            return digest  # Part file is already complete
         response.raise_for_status()
-        data = response.json()
-        return ModrinthProjectVersion.from_dict(data)
+
+        mode = "ab"
+        if offset and response.status_code != 206:
+            # Range not supported by the server, download from the start
+            digest = hashlib.sha512()
+            mode = "wb"
+
+        with part_path.open(mode) as f:
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+    return digest
+
+
+async def download_file(url: str, destination: Path, sha512: str) -> None:
+    """
+    Stream a file to a .part file next to its destination while hashing it, verify the sha512 and atomically move
+    it to its destination. Interrupted downloads are resumed with Range requests.
+    """
+    part_path = destination.with_name(destination.name + ".part")
+    async with download_semaphore:
+        for attempt in range(settings.MODRINTH_MAX_RETRIES + 1):
+            try:
+                digest = await _stream_to_part_file(url, part_path)
+                break
+            except httpx.TransportError as e:
+                if attempt >= settings.MODRINTH_MAX_RETRIES:
+                    raise
+                logger.warning(f"Download of {url} interrupted ({e!r}), resuming")
+                await asyncio.sleep(2 ** attempt)
+
+    if digest.hexdigest() != sha512:
+        part_path.unlink(missing_ok=True)
+        raise ValidationException(f"Downloaded file {destination.name} is corrupted (sha512 mismatch)")
+
+    os.replace(part_path, destination)
 
 
 async def get_mod(mod_id: str, db: AsyncSession) -> Mod | None:
     return await db.get(Mod, mod_id)
 
 
-async def download_mod_file(project: ModrinthProject, version: ModrinthProjectVersion, miniverse: Miniverse) -> str:
+async def download_mod_file(project: ModrinthProject, version: ModrinthProjectVersion, miniverse: Miniverse,
+                            mods_path: Path | None = None) -> str:
     from app.services.miniverse_service import get_miniverse_path
-    primary_file = next((f for f in version.files if f.primary), None)
-    if not primary_file:
-        raise ValidationException("No primary file found for this mod version")
+    primary_file = get_primary_file(version)
     extension = Path(primary_file.filename).suffix
     if extension != ".jar":
         raise ValidationException("Unsupported file type for mod installation: " + extension)
@@ -101,15 +200,13 @@ async def download_mod_file(project: ModrinthProject, version: ModrinthProjectVe
     # TODO: wrap the name to be filesystem-safe
     file_name = f"{project.slug}-{version.version_number}-{version.id}{extension}"
 
-    mods_path = get_miniverse_path(miniverse.id, "data", "mods")
+    if mods_path is None:
+        mods_path = get_miniverse_path(miniverse.id, "data", "mods")
     mods_path.mkdir(parents=True, exist_ok=True)
 
-    async with httpx.AsyncClient() as client:
-        download_response = await client.get(primary_file.url)
-    download_response.raise_for_status()
-
-    with open(mods_path / file_name, "wb") as f:
-        f.write(download_response.content)
+    sha512 = primary_file.hashes.sha512
+    await blob_store.ensure(sha512, lambda path: download_file(primary_file.url, path, sha512))
+    await blob_store.link(sha512, mods_path / file_name)
 
     return file_name
 
@@ -122,44 +219,24 @@ async def delete_mod_file(mod: Mod) -> None:
         mod_file_path.unlink()
 
 
-async def install_mod(mod_version_id: str, miniverse: Miniverse, db: AsyncSession) -> Mod:
-    version = await get_version_details(mod_version_id)
-    project = await get_project_details(version.project_id)
-
-    existing_mod_req = await db.execute(select(Mod).where(Mod.miniverse_id == miniverse.id, Mod.project_id == project.id))
-    existing_mod: Mod | None = existing_mod_req.scalars().first()
-    if existing_mod is not None:
-        return await update_mod(existing_mod, mod_version_id, db)
-
-    file_name = await download_mod_file(project, version, miniverse)
-    mod = Mod(
-        slug=project.slug,
-        version_id=version.id,
-        project_id=version.project_id,
-        title=project.title,
-        icon_url=project.icon_url,
-        version_name=version.name,
-        version_number=version.version_number,
-        file_name=file_name,
-        miniverse_id=miniverse.id,
-    )
-
-    db.add(mod)
-    await db.commit()
-    await db.refresh(mod)
-
-    logger.info(f"Mod {mod.slug} installed")
-    publish_miniverse_updated_event(miniverse.id)
+async def release_mod_blob(file_hash: str | None, db: AsyncSession) -> None:
+    """Remove a blob from the store once no mod references it anymore."""
+    if file_hash is None:
+        return
+    references = await db.scalar(select(func.count()).select_from(Mod).where(Mod.file_hash == file_hash))
+    if not references:
+        blob_store.remove(file_hash)
 
-    return mod
 
-async def update_mod(mod: Mod, new_version_id: str, db: AsyncSession) -> Mod:
-    version = await get_version_details(new_version_id)
-    project = await get_project_details(version.project_id)
+async def collect_mod_blobs(db: AsyncSession) -> None:
+    result = await db.execute(select(Mod.file_hash).where(Mod.file_hash.is_not(None)).distinct())
+    referenced = set(result.scalars().all())
+    await asyncio.to_thread(blob_store.collect_garbage, referenced)
 
-    await delete_mod_file(mod)
-    file_name = await download_mod_file(project, version, mod.miniverse)
 
+def apply_mod_version(mod: Mod, project: ModrinthProject, version: ModrinthProjectVersion, file_name: str,
+                      file_hash: str | None = None) -> None:
+    mod.slug = project.slug
     mod.version_id = version.id
     mod.project_id = version.project_id
     mod.title = project.title
@@ -167,9 +244,168 @@ async def update_mod(mod: Mod, new_version_id: str, db: AsyncSession) -> Mod:
     mod.version_name = version.name
     mod.version_number = version.version_number
     mod.file_name = file_name
+    mod.file_hash = file_hash or get_primary_file(version).hashes.sha512
+
+
+async def select_mod_version(project_id: str, loader: MiniverseType, game_version: str, *,
+                             prioritize_release: bool = True, retry_with_latest: bool = False) -> ModrinthProjectVersion:
+    versions = await list_project_versions(project_id, loader=loader, mc_version=game_version)
+    if not versions and retry_with_latest:
+        all_versions = await list_project_versions(project_id, loader=loader)
+        support = GameVersionsSupport([v.game_versions for v in all_versions])
+        # Versions made for a newer game version first, then the ones made for the newest older game version
+        versions = [all_versions[i] for i in support.supporting(game_version, or_newer=True)]
+        if not versions and all_versions:
+            newest_rank = max(support.newest_ranks)
+            versions = [v for v, rank in zip(all_versions, support.newest_ranks) if rank == newest_rank]
+        if versions:
+            logger.warning(f"No direct compatible versions found for mod {project_id} with loader {loader} and game version {game_version}, falling back to the closest available version")
+    if not versions:
+        raise ValidationException(f"No compatible versions found for mod {project_id} with loader {loader} and game version {game_version}")
+    if prioritize_release:
+        versions = [v for v in versions if v.version_type == ModVersionType.RELEASE] or versions
+    return max(versions, key=lambda v: v.date_published)
+
+
+async def resolve_mod_dependencies(versions: list[ModrinthProjectVersion], miniverse: Miniverse, *,
+                                   game_version: str | None = None,
+                                   prioritize_release: bool = True) -> list[ModrinthProjectVersion]:
+    """
+    Return the requested versions and all their required dependencies for the miniverse loader and game version.
+    The dependency graph is walked level by level, the versions of a level being fetched concurrently.
+    Dependencies already installed on the miniverse are kept as is.
+    Raise a ValidationException on version conflicts and incompatible mods.
+    """
+    if game_version is None:
+        game_version = miniverse.mc_version
+    installed_project_ids = {mod.project_id for mod in miniverse.mods if mod.project_id is not None}
+
+    resolved: dict[str, ModrinthProjectVersion] = {}
+    pinned: dict[str, str] = {}  # project_id -> version_id required by the user or a dependency
+    required_by: dict[str, str] = {}
+    incompatible: dict[str, str] = {}  # project_id -> project_id declaring the incompatibility
+
+    async def select_dependency_version(project_id: str) -> ModrinthProjectVersion:
+        try:
+            return await select_mod_version(project_id, miniverse.type, game_version,
+                                            prioritize_release=prioritize_release)
+        except ValidationException as e:
+            raise ValidationException(f"{e.detail} (required by mod {required_by[project_id]})") from e
+
+    level_pinned = list(versions)
+    level_projects: set[str] = set()
+    while level_pinned or level_projects:
+        selected = await asyncio.gather(*(select_dependency_version(p) for p in level_projects))
+
+        level: list[ModrinthProjectVersion] = []
+        for version in level_pinned:
+            pinned_version_id = pinned.setdefault(version.project_id, version.id)
+            if pinned_version_id != version.id:
+                raise ValidationException(f"Version conflict for mod {version.project_id}: both versions "
+                                          f"{pinned_version_id} and {version.id} are required")
+            if version.project_id not in resolved or resolved[version.project_id].id != version.id:
+                resolved[version.project_id] = version
+                level.append(version)
+        for version in selected:
+            if version.project_id not in resolved:
+                resolved[version.project_id] = version
+                level.append(version)
+
+        level_version_ids: set[str] = set()
+        level_projects = set()
+        for version in level:
+            for dependency in version.dependencies or []:
+                if dependency.dependency_type == ModDependencyType.INCOMPATIBLE:
+                    if dependency.project_id is not None:
+                        incompatible[dependency.project_id] = version.project_id
+                    continue
+                if dependency.dependency_type != ModDependencyType.REQUIRED:
+                    continue
+                if dependency.project_id in installed_project_ids:
+                    continue
+                if dependency.version_id is not None:
+                    if pinned.get(dependency.project_id) != dependency.version_id:
+                        level_version_ids.add(dependency.version_id)
+                elif dependency.project_id is not None and dependency.project_id not in resolved:
+                    level_projects.add(dependency.project_id)
+                    required_by.setdefault(dependency.project_id, version.project_id)
+        level_pinned = await get_versions_details(list(level_version_ids))
+
+    for project_id, declared_by in incompatible.items():
+        if project_id in resolved or project_id in installed_project_ids:
+            raise ValidationException(f"Mod {declared_by} is incompatible with mod {project_id}")
+    return list(resolved.values())
+
+
+async def install_mod_versions(versions: list[ModrinthProjectVersion], miniverse: Miniverse, db: AsyncSession, *,
+                               game_version: str | None = None, prioritize_release: bool = True) -> dict[str, Mod]:
+    """
+    Install the given versions with their required dependencies. Files are downloaded concurrently and all the mods
+    are committed in a single transaction. Return the installed mods by project id.
+    """
+    closure = await resolve_mod_dependencies(versions, miniverse, game_version=game_version,
+                                             prioritize_release=prioritize_release)
+    installed = {mod.project_id: mod for mod in miniverse.mods if mod.project_id is not None}
+    to_install = [v for v in closure
+                  if v.project_id not in installed or installed[v.project_id].version_id != v.id]
+
+    projects = {p.id: p for p in await get_projects_details(list({v.project_id for v in to_install}))}
+    results = await asyncio.gather(*(download_mod_file(projects[v.project_id], v, miniverse) for v in to_install),
+                                   return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        from app.services.miniverse_service import get_miniverse_path
+        mods_path = get_miniverse_path(miniverse.id, "data", "mods")
+        for file_name in results:
+            if isinstance(file_name, str):
+                (mods_path / file_name).unlink(missing_ok=True)
+        raise errors[0]
+
+    old_file_hashes = []
+    for version, file_name in zip(to_install, results):
+        mod = installed.get(version.project_id)
+        if mod is None:
+            mod = Mod(miniverse_id=miniverse.id)
+            db.add(mod)
+            installed[version.project_id] = mod
+        else:
+            old_file_hashes.append(mod.file_hash)
+            await delete_mod_file(mod)
+        apply_mod_version(mod, projects[version.project_id], version, file_name)
+
+    await db.commit()
+    for file_hash in old_file_hashes:
+        await release_mod_blob(file_hash, db)
+
+    mods = {v.project_id: installed[v.project_id] for v in closure}
+    for mod in mods.values():
+        await db.refresh(mod)
+
+    if to_install:
+        logger.info(f"Mods {', '.join(projects[v.project_id].slug for v in to_install)} installed")
+        publish_miniverse_updated_event(miniverse.id)
+
+    return mods
+
+
+async def install_mod(mod_version_id: str, miniverse: Miniverse, db: AsyncSession) -> Mod:
+    version = await get_version_details(mod_version_id)
+    mods = await install_mod_versions([version], miniverse, db)
+    return mods[version.project_id]
+
+
+async def update_mod(mod: Mod, new_version_id: str, db: AsyncSession) -> Mod:
+    version = await get_version_details(new_version_id)
+    project = await get_project_details(version.project_id)
+
+    old_file_hash = mod.file_hash
+    await delete_mod_file(mod)
+    file_name = await download_mod_file(project, version, mod.miniverse)
+    apply_mod_version(mod, project, version, file_name)
 
     await db.commit()
     await db.refresh(mod)
+    await release_mod_blob(old_file_hash, db)
 
     logger.info(f"Mod {mod.slug} updated")
     publish_miniverse_updated_event(mod.miniverse_id)
@@ -188,18 +424,11 @@ async def automatic_mod_install(
 ) -> Mod:
     if game_version is None:
         game_version = miniverse.mc_version
-    versions = await list_project_versions(mod_id, loader=miniverse.type, mc_version=game_version)
-    if not versions:
-        if retry_with_latest:
-            versions = await list_project_versions(mod_id, loader=miniverse.type)
-        if not versions:
-            raise ValidationException(f"No compatible versions found for mod {mod_id} with loader {miniverse.type} and game version {game_version}")
-        logger.warning(f"No direct compatible versions found for mod {mod_id} with loader {miniverse.type} and game version {game_version}, falling back to latest available version")
-    if prioritize_release:
-        versions = [v for v in versions if v.version_type == ModVersionType.RELEASE] or versions
-    latest_version = sorted(versions, key=lambda v: v.date_published, reverse=True)[0]
-
-    return await install_mod(latest_version.id, miniverse, db)
+    version = await select_mod_version(mod_id, miniverse.type, game_version, prioritize_release=prioritize_release,
+                                       retry_with_latest=retry_with_latest)
+    mods = await install_mod_versions([version], miniverse, db, game_version=game_version,
+                                      prioritize_release=prioritize_release)
+    return mods[version.project_id]
 
 
 async def uninstall_mod(mod: Mod, db: AsyncSession) -> None:
@@ -208,36 +437,103 @@ async def uninstall_mod(mod: Mod, db: AsyncSession) -> None:
     await delete_mod_file(mod)
     await db.delete(mod)
     await db.commit()
+    await release_mod_blob(mod.file_hash, db)
 
     logger.info(f"Mod {mod.slug} uninstalled")
     publish_miniverse_updated_event(miniverse_id)
 
 
+async def _check_mod_update(mod: Mod, loader: MiniverseType, game_version: str) -> ModUpdateInfo:
+    try:
+        # All the versions in one (cached) request, compatible ones are filtered locally
+        versions = await list_project_versions(mod.project_id, loader=loader)
+        if not versions:
+            logger.warning(f"No versions found for mod {mod.project_id} when checking for updates")
+            return ModUpdateInfo(ModUpdateStatus.ERROR, [], [])
+        candidates = [versions[i] for i in supporting_versions([v.game_versions for v in versions], game_version)]
+        candidates += [v for v in versions if v.id == mod.version_id]
+        if candidates:
+            version = max(candidates, key=lambda v: v.date_published)
+            if version.id == mod.version_id:
+                return ModUpdateInfo(ModUpdateStatus.ALREADY_UP_TO_DATE, [version.id], [version.game_versions])
+            return ModUpdateInfo(ModUpdateStatus.UPDATE_AVAILABLE, [version.id], [version.game_versions])
+        versions = sorted(versions, key=lambda v: v.date_published, reverse=True)
+        return ModUpdateInfo(ModUpdateStatus.NO_COMPATIBLE_VERSIONS, [v.id for v in versions],
+                             [v.game_versions for v in versions])
+    except Exception as e:
+        logger.error(f"Error checking for updates for mod {mod.id}: {e}")
+        return ModUpdateInfo(ModUpdateStatus.ERROR, [], [])
+
+
+async def _get_mods_file_hashes(mods: list[Mod]) -> dict[str, str]:
+    hashes = {mod.id: mod.file_hash for mod in mods if mod.file_hash is not None}
+
+    # Mods installed before hashes were stored: fetch their current versions in one request to get the hash
+    missing: dict[str, list[Mod]] = {}
+    for mod in mods:
+        if mod.file_hash is None and mod.version_id is not None:
+            missing.setdefault(mod.version_id, []).append(mod)
+    if not missing:
+        return hashes
+
+    try:
+        resolved = {version.id: get_primary_file(version).hashes.sha512
+                    for version in await get_versions_details(list(missing))}
+    except Exception as e:
+        logger.warning(f"Could not fetch file hashes of {len(missing)} mods: {e}")
+        return hashes
+    for version_id, file_hash in resolved.items():
+        for mod in missing[version_id]:
+            mod.file_hash = file_hash
+            hashes[mod.id] = file_hash
+
+    # Saved so they are only fetched once, for every miniverse having these versions installed
+    try:
+        async with session_config.get_session() as session:
+            for version_id, file_hash in resolved.items():
+                await session.execute(update(Mod)
+                                      .where(Mod.version_id == version_id, Mod.file_hash.is_(None))
+                                      .values(file_hash=file_hash))
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"Could not save file hashes of {len(resolved)} mods: {e}")
+    return hashes
+
+
+async def check_mods_updates(mods: list[Mod], loader: MiniverseType, game_version: str) -> dict[str, ModUpdateInfo]:
+    """
+    Find the latest compatible version of each mod using Modrinth batch endpoints (one or two requests in total).
+    Mods that cannot be resolved from their file hash fall back to a per-project lookup, run concurrently.
+    """
+    hashes = await _get_mods_file_hashes(mods)
+    try:
+        latest_versions = await get_latest_versions_from_hashes(list(set(hashes.values())), loader, game_version)
+    except Exception as e:
+        logger.warning(f"Batch update check failed, falling back to per mod checks: {e}")
+        latest_versions = {}
+
+    updates: dict[str, ModUpdateInfo] = {}
+    fallback_mods = []
+    for mod in mods:
+        version = latest_versions.get(hashes.get(mod.id))
+        if version is None:
+            fallback_mods.append(mod)
+        elif version.id == mod.version_id:
+            updates[mod.id] = ModUpdateInfo(ModUpdateStatus.ALREADY_UP_TO_DATE, [version.id], [version.game_versions])
+        else:
+            updates[mod.id] = ModUpdateInfo(ModUpdateStatus.UPDATE_AVAILABLE, [version.id], [version.game_versions])
+
+    semaphore = asyncio.Semaphore(settings.MOD_UPDATE_CHECK_CONCURRENCY)
+
+    async def check(mod: Mod) -> None:
+        async with semaphore:
+            updates[mod.id] = await _check_mod_update(mod, loader, game_version)
+
+    await asyncio.gather(*(check(mod) for mod in fallback_mods))
+    return updates
+
+
 async def list_possible_mod_updates(miniverse: Miniverse, game_version: str | None = None) -> dict[str, ModUpdateInfo]:
-    mods = miniverse.mods
-    updates = {}
     if game_version is None:
         game_version = miniverse.mc_version
-    for mod in mods:
-        try:
-            versions = await list_project_versions(mod.project_id, loader=miniverse.type, mc_version=game_version)
-            if not versions:
-                versions = await list_project_versions(mod.project_id, loader=miniverse.type)
-            if not versions:
-                logger.warning(f"No versions found for mod {mod.project_id} when checking for updates")
-                updates[mod.id] = ModUpdateInfo(ModUpdateStatus.ERROR, [], [])
-                continue
-            versions = sorted(versions, key=lambda v: v.date_published, reverse=True)
-            for version in versions:
-                if game_version in version.game_versions or version.id == mod.version_id:
-                    if version.id == mod.version_id:
-                        updates[mod.id] = ModUpdateInfo(ModUpdateStatus.ALREADY_UP_TO_DATE, [version.id], [version.game_versions])
-                    else:
-                        updates[mod.id] = ModUpdateInfo(ModUpdateStatus.UPDATE_AVAILABLE, [version.id], [version.game_versions])
-                    break
-            else:
-                updates[mod.id] = ModUpdateInfo(ModUpdateStatus.NO_COMPATIBLE_VERSIONS, [v.id for v in versions], [v.game_versions for v in versions])
-        except Exception as e:
-            logger.error(f"Error checking for updates for mod {mod.id}: {e}")
-            updates[mod.id] = ModUpdateInfo(ModUpdateStatus.ERROR, [], [])
-    return updates
\ No newline at end of file
+    return await check_mods_updates(miniverse.mods, miniverse.type, game_version)
@@ -0,0 +1,191 @@
+import math
+from datetime import datetime, timedelta, date
+
+from sqlalchemy import select, func, update
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import logger
+from app.core.utils import utc_now
+from app.db.session import session_config
+from app.enums.session_source import SessionSource
+from app.models import PlayerSession, PlayerSessionHourly, PlayerPlaytimeDaily
+from app.schemas import MSMPPlayer
+from app.schemas.player_stats import PlayerPlaytime, HourlyPlayerStats, PeakHourStats
+
+
+def _split_by_hour(start: datetime, end: datetime) -> list[tuple[datetime, int]]:
+    buckets = []
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        next_hour = hour + timedelta(hours=1)
+        seconds = int((min(end, next_hour) - max(start, hour)).total_seconds())
+        if seconds > 0:
+            buckets.append((hour, seconds))
+        hour = next_hour
+    return buckets
+
+
+def _split_by_day(start: datetime, end: datetime) -> list[tuple[date, int]]:
+    buckets: dict[date, int] = {}
+    for hour, seconds in _split_by_hour(start, end):
+        buckets[hour.date()] = buckets.get(hour.date(), 0) + seconds
+    return list(buckets.items())
+
+
+async def _upsert_hourly(db: AsyncSession, miniverse_id: str, hour: datetime, *, playtime_seconds: int = 0,
+                         joins: int = 0, peak_players: int = 0) -> None:
+    stmt = insert(PlayerSessionHourly).values(miniverse_id=miniverse_id, hour=hour, playtime_seconds=playtime_seconds,
+                                              joins=joins, peak_players=peak_players)
+    stmt = stmt.on_duplicate_key_update(
+        playtime_seconds=PlayerSessionHourly.playtime_seconds + stmt.inserted.playtime_seconds,
+        joins=PlayerSessionHourly.joins + stmt.inserted.joins,
+        peak_players=func.greatest(PlayerSessionHourly.peak_players, stmt.inserted.peak_players),
+    )
+    await db.execute(stmt)
+
+
+async def _upsert_daily(db: AsyncSession, player_id: str, miniverse_id: str, day: date, playtime_seconds: int) -> None:
+    stmt = insert(PlayerPlaytimeDaily).values(player_id=player_id, miniverse_id=miniverse_id, day=day,
+                                              playtime_seconds=playtime_seconds)
+    stmt = stmt.on_duplicate_key_update(
+        playtime_seconds=PlayerPlaytimeDaily.playtime_seconds + stmt.inserted.playtime_seconds,
+    )
+    await db.execute(stmt)
+
+
+async def _get_open_sessions(db: AsyncSession, miniverse_id: str) -> list[PlayerSession]:
+    result = await db.execute(select(PlayerSession).where(PlayerSession.miniverse_id == miniverse_id,
+                                                          PlayerSession.leave_ts.is_(None)))
+    return list(result.scalars().all())
+
+
+async def _open_sessions(db: AsyncSession, miniverse_id: str, players: list[MSMPPlayer], source: SessionSource,
+                         at: datetime) -> None:
+    open_sessions = await _get_open_sessions(db, miniverse_id)
+    open_player_ids = {s.player_id for s in open_sessions}
+    new_players = [p for p in players if p.id not in open_player_ids]
+    if not new_players:
+        return
+
+    db.add_all([
+        PlayerSession(player_id=p.id, player_name=p.name, miniverse_id=miniverse_id, join_ts=at, source=source)
+        for p in new_players
+    ])
+    # Peak is sampled when players join, the hourly average comes from the playtime
+    hour = at.replace(minute=0, second=0, microsecond=0)
+    await _upsert_hourly(db, miniverse_id, hour, joins=len(new_players),
+                         peak_players=len(open_sessions) + len(new_players))
+
+
+async def _close_sessions(db: AsyncSession, sessions: list[PlayerSession], open_sessions: list[PlayerSession],
+                          at: datetime) -> None:
+    if not sessions:
+        return
+
+    await db.execute(update(PlayerSession)
+                     .where(PlayerSession.id.in_([s.id for s in sessions]))
+                     .values(leave_ts=at))
+    for session in sessions:
+        for hour, seconds in _split_by_hour(session.join_ts, at):
+            # Every session still open and started before the end of the hour was online during it, so hours
+            # without joins (sessions carried over from the previous hour) get a peak too
+            next_hour = hour + timedelta(hours=1)
+            concurrent_players = sum(1 for s in open_sessions if s.join_ts < next_hour)
+            await _upsert_hourly(db, session.miniverse_id, hour, playtime_seconds=seconds,
+                                 peak_players=concurrent_players)
+        for day, seconds in _split_by_day(session.join_ts, at):
+            await _upsert_daily(db, session.player_id, session.miniverse_id, day, seconds)
+
+
+async def record_player_joined(miniverse_id: str, player: MSMPPlayer, source: SessionSource) -> None:
+    try:
+        async with session_config.get_session() as db:
+            await _open_sessions(db, miniverse_id, [player], source, utc_now())
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Could not record join of {player.name} on miniverse {miniverse_id}: {e}")
+
+
+async def record_player_left(miniverse_id: str, player_id: str) -> None:
+    try:
+        async with session_config.get_session() as db:
+            open_sessions = await _get_open_sessions(db, miniverse_id)
+            sessions = [s for s in open_sessions if s.player_id == player_id]
+            await _close_sessions(db, sessions, open_sessions, utc_now())
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Could not record leave of {player_id} on miniverse {miniverse_id}: {e}")
+
+
+async def sync_player_sessions(miniverse_id: str, players: list[MSMPPlayer], source: SessionSource) -> None:
+    """Close sessions of players that are not online anymore (missed events, crash) and open the missing ones."""
+    try:
+        async with session_config.get_session() as db:
+            now = utc_now()
+            online_ids = {p.id for p in players}
+            open_sessions = await _get_open_sessions(db, miniverse_id)
+            stale_sessions = [s for s in open_sessions if s.player_id not in online_ids]
+            await _close_sessions(db, stale_sessions, open_sessions, now)
+            await _open_sessions(db, miniverse_id, players, source, now)
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Could not sync player sessions on miniverse {miniverse_id}: {e}")
+
+
+async def get_player_playtime(player_id: str, start: date, end: date, db: AsyncSession) -> list[PlayerPlaytime]:
+    result = await db.execute(
+        select(PlayerPlaytimeDaily.miniverse_id, func.sum(PlayerPlaytimeDaily.playtime_seconds))
+        .where(PlayerPlaytimeDaily.player_id == player_id,
+               PlayerPlaytimeDaily.day >= start,
+               PlayerPlaytimeDaily.day <= end)
+        .group_by(PlayerPlaytimeDaily.miniverse_id)
+    )
+    return [PlayerPlaytime(miniverse_id=m_id, playtime_seconds=int(seconds)) for m_id, seconds in result.all()]
+
+
+async def get_miniverse_player_curve(miniverse_id: str, start: datetime, end: datetime,
+                                     db: AsyncSession) -> list[HourlyPlayerStats]:
+    result = await db.execute(
+        select(PlayerSessionHourly)
+        .where(PlayerSessionHourly.miniverse_id == miniverse_id,
+               PlayerSessionHourly.hour >= start,
+               PlayerSessionHourly.hour < end)
+        .order_by(PlayerSessionHourly.hour)
+    )
+    return [
+        HourlyPlayerStats(hour=r.hour, average_players=r.playtime_seconds / 3600, peak_players=r.peak_players,
+                          joins=r.joins)
+        for r in result.scalars().all()
+    ]
+
+
+def _count_hours_of_day(start: datetime, end: datetime) -> list[int]:
+    """Number of times each hour of the day (0-23) starts in [start, end)."""
+    first_hour = start.replace(minute=0, second=0, microsecond=0)
+    if first_hour < start:
+        first_hour += timedelta(hours=1)
+    hours = max(math.ceil((end - first_hour) / timedelta(hours=1)), 0)
+    return [hours // 24 + ((hour_of_day - first_hour.hour) % 24 < hours % 24) for hour_of_day in range(24)]
+
+
+async def get_miniverse_peak_hours(miniverse_id: str, start: datetime, end: datetime,
+                                   db: AsyncSession) -> list[PeakHourStats]:
+    hour_of_day = func.hour(PlayerSessionHourly.hour)
+    result = await db.execute(
+        select(hour_of_day,
+               func.sum(PlayerSessionHourly.playtime_seconds),
+               func.max(PlayerSessionHourly.peak_players))
+        .where(PlayerSessionHourly.miniverse_id == miniverse_id,
+               PlayerSessionHourly.hour >= start,
+               PlayerSessionHourly.hour < end)
+        .group_by(hour_of_day)
+        .order_by(hour_of_day)
+    )
+    # Averaged over every hour of the period, hours without a row had no player
+    hours_count = _count_hours_of_day(start, end)
+    return [
+        PeakHourStats(hour_of_day=int(h), average_players=int(seconds) / 3600 / max(hours_count[int(h)], 1),
+                      peak_players=int(peak))
+        for h, seconds, peak in result.all()
+    ]
@@ -16,6 +16,10 @@ class RpcService:
         self.headers = {"Authorization": f"Bearer {secret}"}
         self.server: Server | None = None
 
+    @property
+    def connected(self) -> bool:
+        return self.server is not None and self.server.connected
+
     async def async_call_rpc(self, method_name: str, *args, **kwargs):
         if self.server is None:
             return None
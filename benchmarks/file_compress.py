@@ -0,0 +1,84 @@
+"""
+Compare zipfile (single threaded deflate of every member, like the previous zipstream archives) with the compression
+engine on a synthetic world: region files and jars that are already compressed, plus logs and configs that deflate
+well. The engine stores the first ones, deflates the others in parallel, and can write tar.zst archives.
+
+Usage: python -m benchmarks.file_compress [region_files] [region_size_mib] [text_files]
+"""
+import os
+import shutil
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from app.core import settings  # noqa: E402
+from app.services.file_compress import collect_members, write_zip, write_tar_zst, zstd_available, \
+    compress_executor, COMPRESS_WORKERS  # noqa: E402
+from app.services.file_executor import OperationProgress  # noqa: E402
+
+
+def generate_world(root: Path, region_files: int, region_size: int, text_files: int) -> int:
+    (root / "region").mkdir(parents=True)
+    (root / "mods").mkdir()
+    (root / "logs").mkdir()
+    for i in range(region_files):
+        (root / "region" / f"r.{i}.0.mca").write_bytes(os.urandom(region_size))
+    for i in range(region_files // 4):
+        (root / "mods" / f"mod-{i}.jar").write_bytes(os.urandom(1024 * 1024))
+    line = b"[12:00:00] [Server thread/INFO]: Player%d joined the game at x=%d y=64 z=%d\n"
+    for i in range(text_files):
+        (root / "logs" / f"{i}.log").write_bytes(b"".join(line % (i, j, j * 7) for j in range(4000)))
+    return sum(f.stat().st_size for f in root.rglob("*") if f.is_file())
+
+
+def zipfile_archive(source: Path, destination: Path) -> None:
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for file in source.rglob("*"):
+            if file.is_file():
+                z.write(file, arcname=file.relative_to(source.parent))
+
+
+def run(name: str, func, source: Path, destination: Path, total_size: int) -> None:
+    start = time.perf_counter()
+    func(source, destination)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed:6.2f}s -> {total_size / elapsed / 1e6:8.1f} MB/s, "
+          f"archive {destination.stat().st_size / 1e6:7.1f} MB")
+    destination.unlink()
+
+
+def main(region_files: int, region_size: int, text_files: int) -> None:
+    root = settings.DATA_PATH / "compress-benchmark"
+    shutil.rmtree(root, ignore_errors=True)
+    total_size = generate_world(root / "world", region_files, region_size, text_files)
+    print(f"{region_files} region files of {region_size // 1024 // 1024} MiB, {text_files} logs, "
+          f"{total_size / 1e6:.0f} MB, {COMPRESS_WORKERS} workers")
+
+    def engine_zip(source: Path, destination: Path) -> None:
+        write_zip(collect_members([source]), destination, OperationProgress())
+
+    def engine_tar_zst(source: Path, destination: Path) -> None:
+        write_tar_zst(collect_members([source]), destination, OperationProgress())
+
+    try:
+        run("zipfile (single thread)", zipfile_archive, root / "world", root / "archive.zip", total_size)
+        run("engine zip", engine_zip, root / "world", root / "archive.zip", total_size)
+        if zstd_available():
+            run("engine tar.zst", engine_tar_zst, root / "world", root / "archive.tar.zst", total_size)
+        else:
+            print("zstandard is not installed, skipping tar.zst")
+    finally:
+        compress_executor.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+         (int(sys.argv[2]) if len(sys.argv) > 2 else 8) * 1024 * 1024,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 200)
@@ -0,0 +1,63 @@
+"""
+Compare shutil.copytree (the previous copy of miniverse folders) with the copy engine on a synthetic world:
+large region files plus many small player and data files. On btrfs / xfs the engine clones files (FICLONE),
+elsewhere it copies them in the kernel (copy_file_range), small files being copied in parallel.
+
+Usage: python -m benchmarks.file_copy [region_files] [region_size_mib] [small_files]
+"""
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from app.core import settings  # noqa: E402
+from app.services.file_copy import copy_tree, copy_executor  # noqa: E402
+
+
+def generate_world(root: Path, region_files: int, region_size: int, small_files: int) -> int:
+    (root / "region").mkdir(parents=True)
+    (root / "playerdata").mkdir()
+    block = os.urandom(1024 * 1024)
+    for i in range(region_files):
+        with open(root / "region" / f"r.{i}.0.mca", "wb") as f:
+            for _ in range(region_size // len(block)):
+                f.write(block)
+    for i in range(small_files):
+        (root / "playerdata" / f"{i:08x}.dat").write_bytes(block[i % 1024:i % 1024 + 4096])
+    return region_files * region_size + small_files * 4096
+
+
+def run(name: str, func, source: Path, destination: Path, total_size: int) -> None:
+    os.sync()
+    start = time.perf_counter()
+    func(source, destination)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed:6.2f}s -> {total_size / elapsed / 1e6:8.1f} MB/s")
+    shutil.rmtree(destination)
+
+
+def main(region_files: int, region_size: int, small_files: int) -> None:
+    root = settings.DATA_PATH / "copy-benchmark"
+    shutil.rmtree(root, ignore_errors=True)
+    total_size = generate_world(root / "world", region_files, region_size, small_files)
+    print(f"{region_files} region files of {region_size // 1024 // 1024} MiB, {small_files} small files, "
+          f"{total_size / 1e6:.0f} MB")
+
+    try:
+        run("shutil.copytree", shutil.copytree, root / "world", root / "copy", total_size)
+        run("copy engine", copy_tree, root / "world", root / "copy", total_size)
+    finally:
+        copy_executor.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 64,
+         (int(sys.argv[2]) if len(sys.argv) > 2 else 8) * 1024 * 1024,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 5000)
@@ -0,0 +1,95 @@
+"""
+Compare the previous extraction of ZIP archives (members extracted one after the other) with the extractor, which
+checks the budget from the central directory then writes small members in parallel, on a synthetic modpack of many
+small config files plus a few jars. Also extracts the same files from a tar.gz and a tar.zst archive.
+
+Usage: python -m benchmarks.file_extract [small_files] [jars]
+"""
+import io
+import os
+import shutil
+import sys
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from app.core import settings  # noqa: E402
+from app.services.file_copy import copy_executor  # noqa: E402
+from app.services.file_executor import OperationProgress  # noqa: E402
+from app.services.file_extract import extract_archive, zstandard  # noqa: E402
+
+
+def generate_archives(root: Path, small_files: int, jars: int) -> int:
+    files = {f"pack/config/{i}.toml": (f"option_{i} = true\n" * 100).encode() for i in range(small_files)}
+    files |= {f"pack/mods/mod-{i}.jar": os.urandom(4 * 1024 * 1024) for i in range(jars)}
+    with zipfile.ZipFile(root / "pack.zip", "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+
+    tar_data = io.BytesIO()
+    with tarfile.open(fileobj=tar_data, mode="w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with tarfile.open(root / "pack.tar.gz", "w:gz") as tar:
+        tar_data.seek(0)
+        with tarfile.open(fileobj=tar_data) as source:
+            for info in source:
+                tar.addfile(info, source.extractfile(info))
+    if zstandard is not None:
+        (root / "pack.tar.zst").write_bytes(zstandard.ZstdCompressor().compress(tar_data.getvalue()))
+    return sum(len(data) for data in files.values())
+
+
+def previous_extract(archive_path: Path, destination: Path) -> None:
+    with zipfile.ZipFile(archive_path) as z:
+        for member in z.infolist():
+            if member.is_dir():
+                continue
+            target = destination / member.filename
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with z.open(member) as src, target.open("wb") as dst:
+                while chunk := src.read(1024 * 1024):
+                    dst.write(chunk)
+
+
+def run(name: str, func, archive_path: Path, destination: Path, total_size: int) -> None:
+    destination.mkdir()
+    start = time.perf_counter()
+    func(archive_path, destination)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed:6.2f}s -> {total_size / elapsed / 1e6:8.1f} MB/s")
+    shutil.rmtree(destination)
+
+
+def main(small_files: int, jars: int) -> None:
+    root = settings.DATA_PATH / "extract-benchmark"
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+    total_size = generate_archives(root, small_files, jars)
+    print(f"{small_files} config files, {jars} jars, {total_size / 1e6:.0f} MB")
+
+    def extractor(archive_path: Path, destination: Path) -> None:
+        extract_archive(archive_path, destination, OperationProgress())
+
+    try:
+        run("previous zip extraction", previous_extract, root / "pack.zip", root / "out", total_size)
+        run("extractor zip", extractor, root / "pack.zip", root / "out", total_size)
+        run("extractor tar.gz", extractor, root / "pack.tar.gz", root / "out", total_size)
+        if zstandard is not None:
+            run("extractor tar.zst", extractor, root / "pack.tar.zst", root / "out", total_size)
+    finally:
+        copy_executor.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,75 @@
+"""
+Compare the previous directory listing (Path.glob then stat() and is_dir() per entry, whole list encoded at once)
+with the scandir listing engine on a synthetic directory, for a full listing and for a first page of 100 entries
+sorted by name (only the page is stat'ed) and by modification time.
+
+Usage: python -m benchmarks.file_listing [entries]
+"""
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from litestar.serialization import encode_json  # noqa: E402
+
+from app.core import settings  # noqa: E402
+from app.schemas.fileinfo import FileInfo, FileSort  # noqa: E402
+from app.services.file_listing import list_directory  # noqa: E402
+
+
+def previous_listing(path: Path, root: Path) -> bytes:
+    files = []
+    for entry in path.glob("*"):
+        stats = entry.stat()
+        is_dir = entry.is_dir()
+        files.append(FileInfo(
+            is_folder=is_dir,
+            path=str(entry.relative_to(root).as_posix()),
+            name=entry.name,
+            created=datetime.fromtimestamp(stats.st_ctime, tz=timezone.utc),
+            updated=datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc),
+            size=stats.st_size if not is_dir else None,
+        ))
+    return encode_json(files)
+
+
+def engine_listing(path: Path, root: Path, **options) -> bytes:
+    return encode_json(list_directory(path, root, **options).files)
+
+
+def run(name: str, func, repeat: int = 3) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(func())
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<36} {min(timings) * 1000:8.1f} ms, {size / 1e6:6.2f} MB")
+
+
+def main(count: int) -> None:
+    root = settings.DATA_PATH / "listing-benchmark"
+    folder = root / "playerdata"
+    shutil.rmtree(root, ignore_errors=True)
+    folder.mkdir(parents=True)
+    for i in range(count):
+        (folder / f"{i:08x}-0000-0000-0000-000000000000.dat").touch()
+    print(f"{count} entries")
+
+    try:
+        run("previous (glob + stat + is_dir)", lambda: previous_listing(folder, root))
+        run("scandir, full listing", lambda: engine_listing(folder, root))
+        run("scandir, first 100 by name", lambda: engine_listing(folder, root, limit=100))
+        run("scandir, first 100 by mtime", lambda: engine_listing(folder, root, sort=FileSort.MTIME, limit=100))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
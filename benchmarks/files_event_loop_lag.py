@@ -0,0 +1,83 @@
+"""
+Measure the event loop lag while copying then deleting a large folder, with the blocking calls made directly from a
+coroutine (as the files controller used to) and through the file executor. A ticker task sleeps 10 ms in a loop and
+records how late it wakes up; with the file executor it should stay close to zero.
+
+Usage: python -m benchmarks.files_event_loop_lag [files] [file_size_kib]
+"""
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from app.core import settings  # noqa: E402
+from app.services.file_executor import run_file_operation, file_executor  # noqa: E402
+
+TICK = 0.01
+
+
+def generate_tree(root: Path, count: int, file_size: int) -> None:
+    data = os.urandom(file_size)
+    for i in range(count):
+        folder = root / f"region-{i // 100}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"r.{i}.mca").write_bytes(data)
+
+
+def copy_and_delete(src: Path, dst: Path) -> None:
+    shutil.copytree(src, dst)
+    shutil.rmtree(dst)
+
+
+async def measure_lag(name: str, operation) -> None:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK)
+    start = time.perf_counter()
+    await operation()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await task
+
+    print(f"{name:<24} {elapsed:6.2f}s, loop lag: max {max(lags) * 1000:8.1f} ms, "
+          f"mean {statistics.mean(lags) * 1000:6.1f} ms over {len(lags)} ticks")
+
+
+async def main(count: int, file_size: int) -> None:
+    root = settings.DATA_PATH / "files-lag-benchmark"
+    shutil.rmtree(root, ignore_errors=True)
+    generate_tree(root / "world", count, file_size)
+
+    async def inline() -> None:
+        copy_and_delete(root / "world", root / "copy")
+
+    async def offloaded() -> None:
+        await run_file_operation("benchmark", copy_and_delete, root / "world", root / "copy")
+
+    try:
+        await measure_lag("blocking in coroutine", inline)
+        await measure_lag("file executor", offloaded)
+    finally:
+        file_executor.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+                     (int(sys.argv[2]) if len(sys.argv) > 2 else 64) * 1024))
@@ -0,0 +1,98 @@
+"""
+Compare the previous linear scans of the Minecraft version list (publish date fallback of compare_versions and the
+min_version filter) with the indexed MinecraftVersionRegistry, on a synthetic manifest of ~1000 versions, then a
+pairwise "supports this game version or newer" filter over the versions of a mod with the batch supporting_versions.
+
+Usage: python -m benchmarks.minecraft_versions [comparisons]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from app.schemas.minecraft import MinecraftVersion  # noqa: E402
+from app.services.minecraft_service import minecraft_versions, compare_versions, supporting_versions, \
+    GameVersionsSupport  # noqa: E402
+
+
+def generate_manifest() -> list[dict]:
+    data = []
+    date = datetime(2011, 11, 18)
+    for minor in range(0, 22):
+        for week in range(1, 27):
+            date += timedelta(days=3)
+            snapshot = f"{11 + minor // 2}w{(minor % 2) * 26 + week:02d}a"
+            data.append({"version": snapshot, "version_type": "snapshot", "date": date.isoformat(), "major": False})
+        for patch in range(0, 8):
+            date += timedelta(days=10)
+            version = f"1.{minor}" if patch == 0 else f"1.{minor}.{patch}"
+            data.append({"version": version, "version_type": "release", "date": date.isoformat(), "major": patch == 0})
+    data.reverse()  # Newest first, as returned by Modrinth
+    return data
+
+
+def previous_compare_by_publish_date(all_versions: list[MinecraftVersion], v1: str, v2: str) -> int | None:
+    v1_date = next((v.date for v in all_versions if v.version == v1), None)
+    v2_date = next((v.date for v in all_versions if v.version == v2), None)
+    if v1_date is None or v2_date is None:
+        return None
+    return (v1_date > v2_date) - (v1_date < v2_date)
+
+
+def previous_min_version_filter(all_versions: list[MinecraftVersion], min_version: str) -> list[MinecraftVersion]:
+    index = next((i for i, v in enumerate(all_versions) if v.version == min_version), None)
+    return all_versions[:index + 1]
+
+
+def pairwise_supporting_or_newer(game_versions_lists: list[list[str]], game_version: str) -> list[int]:
+    return [i for i, game_versions in enumerate(game_versions_lists)
+            if any((compare_versions(v, game_version) or 0) >= 0 for v in game_versions)]
+
+
+def run(name: str, func, pairs: list[tuple[str, str]]) -> None:
+    start = time.perf_counter()
+    for v1, v2 in pairs:
+        func(v1, v2)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<40} {len(pairs)} calls in {elapsed:6.3f}s -> {elapsed / len(pairs) * 1e6:8.2f} us/call")
+
+
+def main(comparisons: int) -> None:
+    data = generate_manifest()
+    minecraft_versions._build(data)
+    all_versions = minecraft_versions.versions
+    names = [v["version"] for v in data]
+    snapshots = [n for n in names if "w" in n]
+    pairs = [(random.choice(snapshots), random.choice(names)) for _ in range(comparisons)]
+    print(f"{len(names)} versions")
+
+    run("previous compare (linear scan)", lambda a, b: previous_compare_by_publish_date(all_versions, a, b), pairs)
+    run("compare_versions (registry)", compare_versions, pairs)
+    run("previous min_version filter", lambda a, _: previous_min_version_filter(all_versions, a), pairs)
+    run("min_version filter (registry)", lambda a, _: all_versions[:minecraft_versions.get_position(a) + 1], pairs)
+
+    # A mod with 300 versions, each supporting a few consecutive releases
+    releases = [n for n in reversed(names) if "w" not in n]
+    game_versions_lists = []
+    for _ in range(300):
+        start = random.randrange(len(releases) - 4)
+        game_versions_lists.append(releases[start:start + random.randint(1, 4)])
+    targets = [(random.choice(releases), "") for _ in range(max(comparisons // 1000, 10))]
+    print(f"{len(game_versions_lists)} mod versions")
+    run("pairwise or newer filter", lambda a, _: pairwise_supporting_or_newer(game_versions_lists, a), targets)
+    run("supporting_versions or newer (batch)",
+        lambda a, _: supporting_versions(game_versions_lists, a, or_newer=True), targets)
+    support = GameVersionsSupport(game_versions_lists)
+    run("GameVersionsSupport or newer (reused)", lambda a, _: support.supporting(a, or_newer=True), targets)
+    run("pairwise exact filter", lambda a, _: [i for i, gv in enumerate(game_versions_lists) if a in gv], targets)
+    run("supporting_versions exact (batch)", lambda a, _: supporting_versions(game_versions_lists, a), targets)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
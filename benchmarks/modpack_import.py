@@ -0,0 +1,92 @@
+"""
+Compare a sequential download of a modpack (one file after the other) with the concurrent modpack importer,
+on a generated 200-file pack served by a local file server. The importer is run twice: with an empty blob store,
+then with the files already in the store (another miniverse installing the same pack).
+
+Usage: python -m benchmarks.modpack_import [files] [file_size_kib] [latency_ms]
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from aiohttp import web
+
+# Always a private data folder: the benchmark empties the blob store, which must not be the one of the host
+BENCHMARK_DATA_PATH = tempfile.mkdtemp(prefix="miniverse-benchmark-")
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ["HOST_DATA_PATH"] = BENCHMARK_DATA_PATH
+os.environ["DATA_PATH"] = BENCHMARK_DATA_PATH
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from app.core import settings  # noqa: E402
+from app.schemas.mods import ModrinthPackFile, ModrinthFileHashes  # noqa: E402
+from app.services.modpack_service import download_modpack_files  # noqa: E402
+from app.services.modrinth_client import modrinth_client  # noqa: E402
+
+
+async def start_file_server(port: int, files: dict[str, bytes], latency: float) -> web.AppRunner:
+    async def serve(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)  # Simulated CDN latency
+        return web.Response(body=files[request.match_info["name"]])
+
+    app = web.Application()
+    app.router.add_get("/files/{name}", serve)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def sequential_download(pack_files: list[ModrinthPackFile], data_path: Path) -> None:
+    async with httpx.AsyncClient() as client:
+        for file in pack_files:
+            response = await client.get(file.downloads[0])
+            response.raise_for_status()
+            target = data_path / file.path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(response.content)
+
+
+async def run(name: str, coroutine, count: int, total_size: int) -> None:
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {count} files in {elapsed:6.2f}s -> {total_size / elapsed / 1e6:8.1f} MB/s")
+
+
+async def main(count: int, file_size: int, latency: float) -> None:
+    port = 8766
+    contents = {f"mod-{i}.jar": os.urandom(file_size) for i in range(count)}
+    pack_files = [
+        ModrinthPackFile(
+            path=f"mods/{name}",
+            hashes=ModrinthFileHashes(sha1=hashlib.sha1(data).hexdigest(), sha512=hashlib.sha512(data).hexdigest()),
+            downloads=[f"http://127.0.0.1:{port}/files/{name}"],
+            file_size=len(data),
+        )
+        for name, data in contents.items()
+    ]
+    total_size = count * file_size
+
+    root = settings.DATA_PATH / "modpack-benchmark"
+    runner = await start_file_server(port, contents, latency)
+    try:
+        await run("sequential download", sequential_download(pack_files, root / "sequential"), count, total_size)
+        await run("modpack importer (cold store)", download_modpack_files(pack_files, root / "cold"), count, total_size)
+        await run("modpack importer (warm store)", download_modpack_files(pack_files, root / "warm"), count, total_size)
+    finally:
+        await modrinth_client.close()
+        await runner.cleanup()
+        shutil.rmtree(BENCHMARK_DATA_PATH, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+                     (int(sys.argv[2]) if len(sys.argv) > 2 else 256) * 1024,
+                     (int(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000))
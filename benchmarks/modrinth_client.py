@@ -0,0 +1,81 @@
+"""
+Compare a fresh httpx client per request (previous behaviour) with the pooled ModrinthClient,
+against a local fake Modrinth server.
+
+Usage: python -m benchmarks.modrinth_client [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from aiohttp import web
+
+os.environ.setdefault("PROXY_SECRET", "benchmark")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-benchmark")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "benchmark")
+
+from app.services.modrinth_client import ModrinthClient  # noqa: E402
+
+PROJECT = {"id": "P7dR8mSH", "slug": "fabric-api", "title": "Fabric API", "versions": ["a" * 8] * 200}
+
+
+async def start_fake_modrinth(port: int) -> web.AppRunner:
+    async def project(_: web.Request) -> web.Response:
+        await asyncio.sleep(0.002)  # Simulated server processing time
+        return web.json_response(PROJECT, headers={
+            "X-Ratelimit-Limit": "300",
+            "X-Ratelimit-Remaining": "299",
+            "X-Ratelimit-Reset": "60",
+        })
+
+    app = web.Application()
+    app.router.add_get("/v2/project/{project_id}", project)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def run(name: str, fetch, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await fetch()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {requests} requests in {elapsed:6.2f}s -> {requests / elapsed:8.1f} req/s")
+
+
+async def main(requests: int, concurrency: int) -> None:
+    port = 8765
+    base_url = f"http://127.0.0.1:{port}/v2"
+    runner = await start_fake_modrinth(port)
+
+    async def fresh_client_fetch():
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{base_url}/project/P7dR8mSH")
+            response.raise_for_status()
+            response.json()
+
+    pooled = ModrinthClient(base_url, max_connections=concurrency, max_retries=0, timeout=10)
+
+    async def pooled_fetch():
+        await pooled.get_json("/project/P7dR8mSH")
+
+    try:
+        await run("fresh client per request", fresh_client_fetch, requests, concurrency)
+        await run("pooled ModrinthClient", pooled_fetch, requests, concurrency)
+    finally:
+        await pooled.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 20))
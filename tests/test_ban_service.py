@@ -0,0 +1,45 @@
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.models import GlobalBan  # noqa: E402
+from app.services import ban_service  # noqa: E402
+from app.services.connexion.WebSocketMiniverseService import WebSocketMiniverseService  # noqa: E402
+
+
+def make_controller(miniverse_id: str, connected: bool = True, fail: bool = False) -> WebSocketMiniverseService:
+    controller = WebSocketMiniverseService(miniverse_id, "ws://localhost", "secret")
+    controller.rpc.server = mock.Mock(connected=connected) if connected else None
+    error = ConnectionError("connection lost")
+    controller.ban_players = mock.AsyncMock(side_effect=error if fail else None, return_value=True)
+    return controller
+
+
+class PropagateGlobalBansTest(unittest.IsolatedAsyncioTestCase):
+    async def propagate(self, controllers: list[WebSocketMiniverseService]) -> None:
+        bans = [GlobalBan(player_id="player-1", player_name="Steve", reason="grief", source="admin")]
+        with (mock.patch.object(ban_service.miniverses_manager, "get_miniverse_controllers",
+                                return_value=controllers),
+              mock.patch.object(ban_service.server_status_store, "get", mock.AsyncMock(return_value=[]))):
+            await ban_service.propagate_global_bans(bans)
+
+    async def test_failing_miniverse_does_not_stop_the_others(self):
+        failing, healthy = make_controller("failing", fail=True), make_controller("healthy")
+        with self.assertLogs(ban_service.logger, "WARNING"):
+            await self.propagate([failing, healthy])
+        failing.ban_players.assert_awaited_once()
+        healthy.ban_players.assert_awaited_once()
+
+    async def test_disconnected_miniverse_is_skipped(self):
+        disconnected = make_controller("disconnected", connected=False)
+        await self.propagate([disconnected])
+        disconnected.ban_players.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.services.file_compress import collect_members, write_tar_zst, write_zip, zstd_available  # noqa: E402
+from app.services.file_executor import OperationProgress  # noqa: E402
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class WriteArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.world = self.root / "world"
+        (self.world / "data").mkdir(parents=True)
+        self.contents = {
+            "world/level.txt": b"level-name=world\n" * 1000,  # Compressible: deflated
+            "world/mods/sodium.jar": os.urandom(4096),  # Known compressed format: stored
+            "world/data/random.bin": os.urandom(64 * 1024),  # Incompressible: stored after trying
+            "world/data/empty.txt": b"",
+            "world/données é.txt": "unicode".encode(),
+        }
+        for name, data in self.contents.items():
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        os.symlink("/etc/passwd", self.world / "link")  # Symlinks are not archived
+        self.progress = OperationProgress()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_zip_reads_back(self):
+        destination = self.root / "world.zip"
+        write_zip(collect_members([self.world]), destination, self.progress)
+
+        with zipfile.ZipFile(destination) as z:
+            self.assertIsNone(z.testzip())
+            self.assertEqual({info.filename: z.read(info) for info in z.infolist()}, self.contents)
+            methods = {info.filename: info.compress_type for info in z.infolist()}
+        self.assertEqual(methods["world/level.txt"], zipfile.ZIP_DEFLATED)
+        self.assertEqual(methods["world/mods/sodium.jar"], zipfile.ZIP_STORED)
+        self.assertEqual(methods["world/data/random.bin"], zipfile.ZIP_STORED)
+        self.assertEqual(self.progress.files_done, len(self.contents))
+        self.assertEqual(self.progress.bytes_done, sum(map(len, self.contents.values())))
+
+    def test_empty_zip_reads_back(self):
+        destination = self.root / "empty.zip"
+        write_zip([], destination, self.progress)
+        with zipfile.ZipFile(destination) as z:
+            self.assertEqual(z.infolist(), [])
+
+    @unittest.skipUnless(zstd_available(), "zstandard is not installed")
+    def test_tar_zst_reads_back(self):
+        destination = self.root / "world.tar.zst"
+        write_tar_zst(collect_members([self.world]), destination, self.progress)
+
+        with (open(destination, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as stream,
+              tarfile.open(fileobj=stream, mode="r|") as tar):
+            contents = {member.name: tar.extractfile(member).read() for member in tar}
+        self.assertEqual(contents, self.contents)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import errno
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.services import file_copy  # noqa: E402
+from app.services.file_copy import copy_file  # noqa: E402
+from app.services.file_executor import OperationProgress  # noqa: E402
+
+
+class CopyFileFallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = Path(self.tmp.name) / "source.bin"
+        self.destination = Path(self.tmp.name) / "destination.bin"
+        self.data = os.urandom(4096)
+        self.source.write_bytes(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_progress_is_not_counted_twice_when_copy_file_range_fails_midway(self):
+        real_copy_file_range = os.copy_file_range
+        calls = 0
+
+        def failing_copy_file_range(src: int, dst: int, count: int) -> int:
+            nonlocal calls
+            calls += 1
+            if calls > 2:
+                raise OSError(errno.EXDEV, "Cross-device link")
+            return real_copy_file_range(src, dst, count)
+
+        progress = OperationProgress()
+        with (mock.patch.object(file_copy, "COPY_CHUNK_SIZE", 1024),
+              mock.patch.object(file_copy.fcntl, "ioctl", side_effect=OSError(errno.EOPNOTSUPP, "Not supported")),
+              mock.patch.object(file_copy.os, "copy_file_range", failing_copy_file_range)):
+            copy_file(self.source, self.destination, progress)
+
+        self.assertEqual(calls, 3)
+        self.assertEqual(self.destination.read_bytes(), self.data)
+        self.assertEqual(progress.bytes_done, len(self.data))
+        self.assertEqual(progress.files_done, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.core import settings  # noqa: E402
+from app.services import file_extract  # noqa: E402
+from app.services.file_executor import OperationProgress  # noqa: E402
+from app.services.file_extract import ArchiveLimitExceeded, extract_archive  # noqa: E402
+
+
+class ExtractTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.destination = self.root / "destination"
+        self.destination.mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_zip(self, members: dict[str, bytes]) -> Path:
+        path = self.root / "archive.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            for name, data in members.items():
+                z.writestr(name, data)
+        return path
+
+    def make_tar(self, members: list[tuple[tarfile.TarInfo, bytes | None]], suffix: str = ".tar.gz") -> Path:
+        path = self.root / f"archive{suffix}"
+        with tarfile.open(path, "w:gz" if suffix == ".tar.gz" else "w") as tar:
+            for info, data in members:
+                if data is not None:
+                    info.size = len(data)
+                tar.addfile(info, io.BytesIO(data) if data is not None else None)
+        return path
+
+    def extract(self, archive: Path) -> None:
+        extract_archive(archive, self.destination, OperationProgress())
+
+    def assertNothingOutside(self) -> None:
+        self.assertEqual(sorted(p.name for p in self.root.iterdir()),
+                         sorted(["destination", *(p.name for p in self.root.glob("archive*"))]))
+
+
+class PathTraversalTest(ExtractTestCase):
+    def test_zip_parent_reference_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.extract(self.make_zip({"../evil.txt": b"evil"}))
+        self.assertNothingOutside()
+
+    def test_zip_absolute_name_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.extract(self.make_zip({"/evil.txt": b"evil"}))
+        self.assertEqual(list(self.destination.iterdir()), [])
+
+    def test_tar_parent_reference_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.extract(self.make_tar([(tarfile.TarInfo("../evil.txt"), b"evil")]))
+        self.assertNothingOutside()
+
+    def test_tar_absolute_name_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.extract(self.make_tar([(tarfile.TarInfo("/evil.txt"), b"evil")]))
+        self.assertEqual(list(self.destination.iterdir()), [])
+
+    def test_tar_symlink_outside_is_rejected(self):
+        for target in ("../outside", "/etc"):
+            link = tarfile.TarInfo("link")
+            link.type = tarfile.SYMTYPE
+            link.linkname = target
+            with self.subTest(target=target), self.assertRaises(tarfile.FilterError):
+                self.extract(self.make_tar([(link, None), (tarfile.TarInfo("link/evil.txt"), b"evil")]))
+            self.assertFalse((self.destination / "link").exists())
+
+    def test_tar_symlink_inside_is_extracted(self):
+        link = tarfile.TarInfo("config/link.toml")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "mod.toml"
+        self.extract(self.make_tar([(tarfile.TarInfo("config/mod.toml"), b"value = 1"), (link, None)]))
+        self.assertEqual((self.destination / "config" / "link.toml").read_bytes(), b"value = 1")
+
+
+class ExtractBudgetTest(ExtractTestCase):
+    def test_zip_over_max_size_is_refused_before_writing(self):
+        archive = self.make_zip({"big.bin": bytes(2 * 1024 * 1024)})
+        with mock.patch.object(settings, "EXTRACT_MAX_SIZE", 1024 * 1024), self.assertRaises(ArchiveLimitExceeded):
+            self.extract(archive)
+        self.assertEqual(list(self.destination.iterdir()), [])
+
+    def test_zip_over_max_entries_is_refused_before_writing(self):
+        archive = self.make_zip({f"file-{i}.txt": b"x" for i in range(11)})
+        with mock.patch.object(settings, "EXTRACT_MAX_ENTRIES", 10), self.assertRaises(ArchiveLimitExceeded):
+            self.extract(archive)
+        self.assertEqual(list(self.destination.iterdir()), [])
+
+    def test_zip_over_max_ratio_is_refused_before_writing(self):
+        archive = self.make_zip({"zeros.bin": bytes(8 * 1024 * 1024)})
+        with mock.patch.object(file_extract, "RATIO_CHECK_MIN_SIZE", 1024), self.assertRaises(ArchiveLimitExceeded):
+            self.extract(archive)
+        self.assertEqual(list(self.destination.iterdir()), [])
+
+    def test_tar_over_max_ratio_stops_while_writing(self):
+        size = 64 * 1024 * 1024
+        archive = self.make_tar([(tarfile.TarInfo("zeros.bin"), bytes(size))])
+        with mock.patch.object(file_extract, "RATIO_CHECK_MIN_SIZE", 1024), self.assertRaises(ArchiveLimitExceeded):
+            self.extract(archive)
+        written = self.destination / "zeros.bin"
+        self.assertLess(written.stat().st_size if written.exists() else 0, size)
+
+    def test_tar_over_max_size_is_refused_from_the_headers(self):
+        archive = self.make_tar([(tarfile.TarInfo("big.bin"), bytes(2 * 1024 * 1024))], suffix=".tar")
+        with mock.patch.object(settings, "EXTRACT_MAX_SIZE", 1024 * 1024), self.assertRaises(ArchiveLimitExceeded):
+            self.extract(archive)
+        self.assertEqual(list(self.destination.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.enums import MiniverseType  # noqa: E402
+from app.managers import ModSearchIndex as search_index_module  # noqa: E402
+from app.managers.ModSearchIndex import ModSearchIndex  # noqa: E402
+from app.schemas import ModrinthSearchResults  # noqa: E402
+from app.schemas.mods import ModSideSupport  # noqa: E402
+
+
+def make_hit(project_id: str, title: str, downloads: int) -> dict:
+    return {
+        "project_id": project_id, "project_type": "mod", "slug": project_id, "author": "author", "title": title,
+        "description": "", "categories": ["fabric"], "display_categories": ["fabric"], "versions": ["1.21.1"],
+        "downloads": downloads, "follows": 0, "icon_url": "", "date_created": "2024-01-01T00:00:00Z",
+        "date_modified": "2024-01-01T00:00:00Z", "latest_version": "1", "license": "MIT",
+        "client_side": "optional", "server_side": "required", "gallery": [], "color": None,
+        "featured_gallery": None,
+    }
+
+
+REMOTE_RESULTS = ModrinthSearchResults(hits=[], offset=0, limit=2, total_hits=42)
+
+
+class ModSearchIndexFallbackTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.index = ModSearchIndex(size=100, sync_interval=3600)
+        self.index._build([make_hit("lithium", "Lithium", 10), make_hit("lithostitched", "Lithostitched", 5),
+                           make_hit("sodium", "Sodium", 20)])
+        patcher = mock.patch.object(search_index_module, "search_modrinth_projects",
+                                    mock.AsyncMock(return_value=REMOTE_RESULTS))
+        self.remote_search = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_local_results_are_served_locally(self):
+        results = await self.index.search("lith", limit=2)
+        self.assertEqual([hit.project_id for hit in results.hits], ["lithium", "lithostitched"])
+        results = await self.index.search("sodium", limit=20)
+        self.assertEqual([hit.project_id for hit in results.hits], ["sodium"])
+        self.remote_search.assert_not_awaited()
+
+    async def test_no_local_results_fall_back_to_modrinth(self):
+        self.assertIs(await self.index.search("unknown", limit=2), REMOTE_RESULTS)
+        facets = self.remote_search.await_args.kwargs["facets"]
+        self.assertEqual(facets.server_side, [ModSideSupport.REQUIRED, ModSideSupport.OPTIONAL])
+
+    async def test_filters_unknown_to_the_index_fall_back_to_modrinth(self):
+        self.assertIs(await self.index.search("lith", limit=2, loader=MiniverseType.FORGE), REMOTE_RESULTS)
+        self.assertIs(await self.index.search("lith", limit=2, game_version="1.8.9"), REMOTE_RESULTS)
+
+    async def test_slow_modrinth_returns_the_local_results(self):
+        async def slow_search(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        self.remote_search.side_effect = slow_search
+        with (mock.patch.object(search_index_module.settings, "MOD_SEARCH_FALLBACK_TIMEOUT", 0.01),
+              self.assertLogs(search_index_module.logger, "WARNING")):
+            results = await self.index.search("unknown", limit=2)
+        self.assertEqual(results.hits, [])
+        self.assertEqual(results.total_hits, 0)
+
+if __name__ == "__main__":
+    unittest.main()
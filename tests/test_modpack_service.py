@@ -0,0 +1,80 @@
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.services import modpack_service  # noqa: E402
+from app.services.modpack_service import extract_modpack_overrides, is_mod_jar  # noqa: E402
+
+
+class SharedBlobWritesTest(unittest.TestCase):
+    """Files linked to a blob must be replaced, not written in place, so the blob and its other links are kept."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.blob = self.root / "blob"
+        self.blob.write_text("blob content")
+        self.data_path = self.root / "data"
+        (self.data_path / "config").mkdir(parents=True)
+        self.linked = self.data_path / "config" / "mod.toml"
+        os.link(self.blob, self.linked)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_overrides_do_not_write_through_links(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as pack:
+            pack.writestr("overrides/config/mod.toml", "override content")
+        with zipfile.ZipFile(buffer) as pack:
+            self.assertEqual(extract_modpack_overrides(pack, self.data_path), 1)
+
+        self.assertEqual(self.linked.read_text(), "override content")
+        self.assertEqual(self.blob.read_text(), "blob content")
+
+    def test_only_mod_jars_are_linked(self):
+        self.assertTrue(is_mod_jar("mods/sodium.jar"))
+        self.assertFalse(is_mod_jar("config/sodium.json"))
+        self.assertFalse(is_mod_jar("mods/sub/sodium.jar"))
+
+
+class CreateModpackModsTest(unittest.IsolatedAsyncioTestCase):
+    async def update_mod(self, installed_name: str, pack_name: str) -> tuple[mock.AsyncMock, mock.AsyncMock]:
+        mod = SimpleNamespace(project_id="project", file_name=installed_name, file_hash="old-hash")
+        miniverse = SimpleNamespace(id="miniverse", mods=[mod])
+        files = [SimpleNamespace(path=f"mods/{pack_name}", hashes=SimpleNamespace(sha512="new-hash"))]
+        version = SimpleNamespace(project_id="project")
+        release_mod_blob, delete_mod_file = mock.AsyncMock(), mock.AsyncMock()
+        with (mock.patch.object(modpack_service, "get_versions_from_hashes",
+                                mock.AsyncMock(return_value={"new-hash": version})),
+              mock.patch.object(modpack_service, "get_projects_details",
+                                mock.AsyncMock(return_value=[SimpleNamespace(id="project")])),
+              mock.patch.object(modpack_service, "apply_mod_version"),
+              mock.patch.object(modpack_service, "release_mod_blob", release_mod_blob),
+              mock.patch.object(modpack_service, "delete_mod_file", delete_mod_file)):
+            await modpack_service.create_modpack_mods(files, miniverse, mock.AsyncMock())
+        return release_mod_blob, delete_mod_file
+
+    async def test_old_blob_is_released_when_the_name_is_kept(self):
+        release_mod_blob, delete_mod_file = await self.update_mod("mod.jar", "mod.jar")
+        self.assertEqual(release_mod_blob.await_args.args[0], "old-hash")
+        delete_mod_file.assert_not_awaited()
+
+    async def test_old_file_is_deleted_when_renamed(self):
+        release_mod_blob, delete_mod_file = await self.update_mod("mod-1.0.jar", "mod-2.0.jar")
+        self.assertEqual(release_mod_blob.await_args.args[0], "old-hash")
+        delete_mod_file.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+import unittest
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+import httpx  # noqa: E402
+from litestar.stores.memory import MemoryStore  # noqa: E402
+
+from app.services.modrinth_client import ModrinthClient  # noqa: E402
+
+BASE_URL = "https://modrinth.test/v2"
+
+
+class ModrinthClientRevalidationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests: list[httpx.Request] = []
+        self.store = MemoryStore()
+        self.client = ModrinthClient(BASE_URL, max_connections=1, max_retries=0, timeout=1, cache_store=self.store)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def use_handler(self, handler) -> None:
+        def record(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return handler(request)
+        self.client._client = httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(record))
+
+    async def store_stale_entry(self, key: str, data, etag: str) -> None:
+        entry = {"etag": etag, "fetched_at": time.time() - 3600, "data": data}
+        await self.store.set(key, json.dumps(entry))
+
+    async def test_not_modified_refreshes_stale_entry(self):
+        self.use_handler(lambda request: httpx.Response(304, headers={"ETag": '"v1"'}))
+        await self.store_stale_entry("/project/sodium", {"slug": "sodium"}, '"v1"')
+
+        data = await self.client.get_json_cached("/project/sodium", ttl=60)
+        self.assertEqual(data, {"slug": "sodium"})
+        await self.client._inflight["/project/sodium"]
+
+        self.assertEqual(self.requests[0].headers["If-None-Match"], '"v1"')
+        entry = json.loads(await self.store.get("/project/sodium"))
+        self.assertEqual(entry["data"], {"slug": "sodium"})
+        self.assertLess(time.time() - entry["fetched_at"], 60)
+
+    async def test_modified_replaces_stale_entry(self):
+        self.use_handler(lambda request: httpx.Response(200, json={"slug": "sodium", "v": 2}, headers={"ETag": '"v2"'}))
+        await self.store_stale_entry("/project/sodium", {"slug": "sodium"}, '"v1"')
+
+        await self.client.get_json_cached("/project/sodium", ttl=60)
+        await self.client._inflight["/project/sodium"]
+
+        entry = json.loads(await self.store.get("/project/sodium"))
+        self.assertEqual(entry, entry | {"etag": '"v2"', "data": {"slug": "sodium", "v": 2}})
+
+    async def test_not_modified_without_validators_is_an_error(self):
+        self.use_handler(lambda request: httpx.Response(304))
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.client.get_json("/project/sodium")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.enums import MiniverseType  # noqa: E402
+from app.schemas import ModVersionType  # noqa: E402
+from app.services import mods_service  # noqa: E402
+from app.services.minecraft_service import minecraft_versions  # noqa: E402
+
+GAME_VERSIONS = ["1.20.1", "1.21.1", "1.21.2", "1.21.3"]
+
+
+def make_version(version_id: str, game_versions: list[str], day: int) -> SimpleNamespace:
+    return SimpleNamespace(id=version_id, game_versions=game_versions, version_type=ModVersionType.RELEASE,
+                           date_published=datetime(2024, 1, day, tzinfo=timezone.utc))
+
+
+class SelectModVersionFallbackTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        minecraft_versions._build([{"version": v, "version_type": "release", "date": f"2024-0{i + 1}-01T00:00:00Z",
+                                    "major": False} for i, v in enumerate(GAME_VERSIONS)])
+        self.addCleanup(minecraft_versions._build, [])
+
+    async def select(self, versions: list[SimpleNamespace], game_version: str) -> str:
+        async def list_project_versions(project_id, loader=None, mc_version=None):
+            return [v for v in versions if mc_version is None or mc_version in v.game_versions]
+
+        with mock.patch.object(mods_service, "list_project_versions", list_project_versions):
+            version = await mods_service.select_mod_version("project", MiniverseType.FABRIC, game_version,
+                                                            retry_with_latest=True)
+        return version.id
+
+    async def test_prefers_a_version_made_for_a_newer_game_version(self):
+        versions = [make_version("for-1.21.1", ["1.21.1"], 1), make_version("for-1.21.3", ["1.21.3"], 2),
+                    make_version("backport-1.20.1", ["1.20.1"], 3)]
+        self.assertEqual(await self.select(versions, "1.21.2"), "for-1.21.3")
+
+    async def test_falls_back_to_the_newest_older_game_version(self):
+        versions = [make_version("for-1.21.1", ["1.21.1"], 1), make_version("backport-1.20.1", ["1.20.1"], 2)]
+        self.assertEqual(await self.select(versions, "1.21.3"), "for-1.21.1")
+
+    async def test_exact_match_is_kept(self):
+        versions = [make_version("for-1.21.2", ["1.21.2"], 1), make_version("for-1.21.3", ["1.21.3"], 2)]
+        self.assertEqual(await self.select(versions, "1.21.2"), "for-1.21.2")
+
+
+class ModsFileHashesTest(unittest.IsolatedAsyncioTestCase):
+    async def test_resolved_hashes_are_saved(self):
+        mods = [SimpleNamespace(id="mod-1", version_id="version-1", file_hash=None),
+                SimpleNamespace(id="mod-2", version_id="version-1", file_hash=None),
+                SimpleNamespace(id="mod-3", version_id="version-2", file_hash="known")]
+        version = SimpleNamespace(id="version-1", files=[])
+        session = mock.AsyncMock()
+        get_session = mock.MagicMock()
+        get_session.return_value.__aenter__.return_value = session
+
+        with (mock.patch.object(mods_service, "get_versions_details", mock.AsyncMock(return_value=[version])),
+              mock.patch.object(mods_service, "get_primary_file",
+                                return_value=SimpleNamespace(hashes=SimpleNamespace(sha512="resolved"))),
+              mock.patch.object(mods_service.session_config, "get_session", get_session)):
+            hashes = await mods_service._get_mods_file_hashes(mods)
+
+        self.assertEqual(hashes, {"mod-1": "resolved", "mod-2": "resolved", "mod-3": "known"})
+        self.assertEqual([mod.file_hash for mod in mods], ["resolved", "resolved", "known"])
+        session.execute.assert_awaited_once()
+        session.commit.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault("PROXY_SECRET", "test")
+os.environ.setdefault("HOST_DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("DATA_PATH", "/tmp/miniverse-test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_PASSWORD", "test")
+
+from app.services import player_session_service  # noqa: E402
+
+
+def make_session(session_id: int, join_ts: datetime) -> SimpleNamespace:
+    return SimpleNamespace(id=session_id, player_id=f"player-{session_id}", miniverse_id="miniverse", join_ts=join_ts)
+
+
+class CloseSessionsPeakTest(unittest.IsolatedAsyncioTestCase):
+    async def test_carried_over_hours_get_a_peak(self):
+        sessions = [make_session(1, datetime(2024, 1, 1, 10, 30)), make_session(2, datetime(2024, 1, 1, 11, 15)),
+                    make_session(3, datetime(2024, 1, 1, 12, 5))]
+        upsert_hourly = mock.AsyncMock()
+        with (mock.patch.object(player_session_service, "_upsert_hourly", upsert_hourly),
+              mock.patch.object(player_session_service, "_upsert_daily", mock.AsyncMock())):
+            await player_session_service._close_sessions(mock.AsyncMock(), sessions[:1], sessions,
+                                                         datetime(2024, 1, 1, 12, 10))
+
+        peaks = {call.args[2].hour: call.kwargs["peak_players"] for call in upsert_hourly.await_args_list}
+        self.assertEqual(peaks, {10: 1, 11: 2, 12: 3})
+
+
+class CountHoursOfDayTest(unittest.TestCase):
+    def test_partial_hours_are_not_counted(self):
+        counts = player_session_service._count_hours_of_day(datetime(2024, 1, 1, 22, 30), datetime(2024, 1, 3, 1))
+        self.assertEqual(counts[23], 2)
+        self.assertEqual(counts[0], 2)
+        self.assertEqual(counts[1], 1)
+        self.assertEqual(counts[22], 1)
+        self.assertEqual(sum(counts), 26)
+
+
+if __name__ == "__main__":
+    unittest.main()